@@ -11,8 +11,9 @@ Features:
 """
 
 import os
-import sqlite3
 import hashlib
+import base64
+import uuid
 import json
 import logging
 from datetime import datetime
@@ -23,9 +24,26 @@ from io import BytesIO
 import time
 import signal
 
-from flask import Flask, request, jsonify, Response, send_file
+from flask import Flask, request, jsonify, Response, send_file, stream_with_context, copy_current_request_context
 from flask_cors import CORS
 
+from utils.db_pool import get_db_pool
+from services.complaint_ingestor import get_complaint_ingestor
+from services.embedding_store import get_embedding_store
+from services.vector_index import get_vector_index
+from services.minhash_index import get_minhash_index
+from services.inference_server import get_inference_client
+from services.classification_cache import get_classification_cache
+from services.voice_job_queue import get_voice_job_queue
+from services.streaming_transcription import get_streaming_manager
+from services.whisper_model_pool import get_whisper_model_pool
+from services.transcription_cache import get_transcription_cache
+from services.dashboard_rollups import get_dashboard_rollups
+from services.response_cache import get_response_cache
+from services.escalation_index import get_escalation_index
+from services.blockchain_anchor import get_blockchain_anchor
+from services.onnx_backend import onnx_enabled, backend_tag, load_zero_shot_pipeline, load_sentence_encoder
+
 # Optional AI imports - graceful degradation
 try:
     from transformers import pipeline
@@ -85,12 +103,24 @@ UPLOAD_FOLDER = 'uploads/audio'
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'm4a', 'flac', 'webm'}
 MAX_AUDIO_SIZE = 10 * 1024 * 1024  # 10 MB
 
+# Voice uploads are transcribed by the worker pool (python -m services.voice_job_queue);
+# set VOICE_JOBS_ASYNC=false to transcribe inside the request instead
+VOICE_JOBS_ASYNC = os.getenv('VOICE_JOBS_ASYNC', 'true').lower() == 'true'
+
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Database configuration
 DB_PATH = 'gramsetu_ai.db'
 
+# Shared per-thread connection pool (WAL mode, one commit per request)
+db_pool = get_db_pool(DB_PATH)
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Commit (or roll back) the request's pending work on the pooled connection"""
+    db_pool.release(exception)
+
 # API version
 API_VERSION = 'v1'
 
@@ -103,6 +133,25 @@ COMPLAINT_CATEGORIES = [
     "Other government services"
 ]
 
+# Zero-shot model; zero_shot_model_version() keys cached classification results
+ZERO_SHOT_MODEL = "valhalla/distilbart-mnli-12-3"
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+
+# Bulk ingestion limits
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 10000))
+BULK_INFERENCE_BATCH_SIZE = int(os.getenv('BULK_INFERENCE_BATCH_SIZE', 32))
+
+# Complaint listing (keyset pages of JSON, or an NDJSON stream)
+COMPLAINTS_PAGE_SIZE = int(os.getenv('COMPLAINTS_PAGE_SIZE', 100))
+COMPLAINTS_MAX_PAGE_SIZE = int(os.getenv('COMPLAINTS_MAX_PAGE_SIZE', 1000))
+COMPLAINTS_STREAM_FETCH_SIZE = 500  # rows per fetchmany while streaming
+
+# Audit trail listing (keyset pages)
+AUDIT_MAX_PAGE_SIZE = int(os.getenv('AUDIT_MAX_PAGE_SIZE', 1000))
+
+# Analytics responses are cached (and ETagged) until a complaint write or this TTL
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 60))
+
 # Invalid context patterns (spam/irrelevant detection)
 INVALID_PATTERNS = [
     "rain not coming", "weather", "cricket", "movie", "food delivery",
@@ -142,11 +191,19 @@ def load_zero_shot_classifier():
     """Lazy load zero-shot classifier on first use"""
     global zero_shot_classifier
     if zero_shot_classifier is None and AI_AVAILABLE:
+        if onnx_enabled():
+            try:
+                print(f"Loading quantized ONNX zero-shot classifier ({ZERO_SHOT_MODEL})...")
+                zero_shot_classifier = load_zero_shot_pipeline(ZERO_SHOT_MODEL)
+                print("✓ Zero-shot classifier loaded (ONNX Runtime)!")
+                return zero_shot_classifier
+            except Exception as e:
+                print(f"Error loading ONNX classifier, using PyTorch: {e}")
         try:
-            print("Loading zero-shot classifier (distilbart-mnli-12-3)...")
+            print(f"Loading zero-shot classifier ({ZERO_SHOT_MODEL})...")
             zero_shot_classifier = pipeline(
                 "zero-shot-classification",
-                model="valhalla/distilbart-mnli-12-3",
+                model=ZERO_SHOT_MODEL,
                 device=-1
             )
             print("✓ Zero-shot classifier loaded!")
@@ -154,13 +211,24 @@ def load_zero_shot_classifier():
             print(f"Error loading classifier: {e}")
     return zero_shot_classifier
 
+# Shared micro-batching inference server (only when INFERENCE_SOCKET is set)
+inference_client = get_inference_client()
+
 def load_sentence_model():
     """Lazy load sentence transformer on first use"""
     global sentence_model
     if sentence_model is None and AI_AVAILABLE:
+        if onnx_enabled():
+            try:
+                print(f"Loading quantized ONNX sentence encoder ({SENTENCE_MODEL})...")
+                sentence_model = load_sentence_encoder(SENTENCE_MODEL)
+                print("✓ Sentence encoder loaded (ONNX Runtime)!")
+                return sentence_model
+            except Exception as e:
+                print(f"Error loading ONNX sentence encoder, using PyTorch: {e}")
         try:
             print("Loading sentence transformer (MiniLM-L6-v2)...")
-            sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
+            sentence_model = SentenceTransformer(SENTENCE_MODEL)
             print("✓ Sentence transformer loaded!")
         except Exception as e:
             print(f"Error loading sentence model: {e}")
@@ -168,7 +236,7 @@ def load_sentence_model():
 
 def init_database():
     """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_pool.connection()
     cursor = conn.cursor()
     
     # Citizens table for CRS tracking
@@ -196,14 +264,26 @@ def init_database():
             evidence TEXT,
             is_duplicate BOOLEAN DEFAULT FALSE,
             is_valid BOOLEAN DEFAULT TRUE,
+            voice_job_id TEXT,
             FOREIGN KEY (citizen_id) REFERENCES citizens (id)
         )
     ''')
+    cursor.execute('PRAGMA table_info(complaints)')
+    if 'voice_job_id' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE complaints ADD COLUMN voice_job_id TEXT')
     
     # Create indexes for better performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_citizen_id ON complaints(citizen_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_hash ON complaints(hash)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON complaints(status)')
+    # A re-claimed voice job finds the complaint it already ingested
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_complaints_voice_job ON complaints(voice_job_id) '
+                   'WHERE voice_job_id IS NOT NULL')
+    # Keyset pagination of the complaint listing, newest first (optionally filtered)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_complaints_timestamp_id ON complaints(timestamp, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_complaints_status_timestamp ON complaints(status, timestamp, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_complaints_category_timestamp ON complaints(category, timestamp, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_complaints_citizen_timestamp ON complaints(citizen_id, timestamp, id)')
     
     # Create field_workers table
     cursor.execute('''
@@ -228,6 +308,7 @@ def init_database():
             FOREIGN KEY (field_worker_id) REFERENCES field_workers (id)
         )
     ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assignments_complaint_id ON assignments(complaint_id)')
     
     # Insert sample field workers if not exist
     cursor.execute('SELECT COUNT(*) FROM field_workers')
@@ -241,7 +322,6 @@ def init_database():
         cursor.executemany('INSERT INTO field_workers (id, name, area) VALUES (?, ?, ?)', sample_workers)
     
     conn.commit()
-    conn.close()
     logger.info("Database initialized successfully!")
 
 def generate_blockchain_hash(text: str, timestamp: str) -> str:
@@ -264,29 +344,68 @@ def validate_complaint_context(text: str) -> Tuple[bool, str]:
     
     return True, "Valid context"
 
+def classify_by_keywords(text: str) -> str:
+    """Fallback classification: simple keyword matching"""
+    text_lower = text.lower()
+    if any(word in text_lower for word in ['water', 'tap', 'supply', 'नल', 'पानी']):
+        return "Water supply issues"
+    elif any(word in text_lower for word in ['electricity', 'power', 'light', 'बिजली']):
+        return "Electricity and power problems"
+    elif any(word in text_lower for word in ['road', 'pothole', 'सड़क']):
+        return "Road and infrastructure"
+    elif any(word in text_lower for word in ['hospital', 'doctor', 'health', 'अस्पताल']):
+        return "Health and medical services"
+    return "Other government services"
+
+def zero_shot_model_version(backend: str) -> str:
+    """Cache version of zero-shot results computed on a backend"""
+    return f"{ZERO_SHOT_MODEL}:{backend}:{'|'.join(COMPLAINT_CATEGORIES)}"
+
+def zero_shot_classify_remote(texts: List[str]) -> List[Dict]:
+    """Run the zero-shot model on the inference server"""
+    results = inference_client.classify(texts, COMPLAINT_CATEGORIES)
+    return [{'category': result['labels'][0]} for result in results]
+
+def zero_shot_classify(texts: List[str]) -> List[Dict]:
+    """Run the zero-shot model in-process"""
+    classifier = load_zero_shot_classifier()  # Lazy load
+    if not classifier:
+        raise RuntimeError("Zero-shot classifier not available")
+    
+    results = classifier(texts, COMPLAINT_CATEGORIES, batch_size=BULK_INFERENCE_BATCH_SIZE)
+    if isinstance(results, dict):
+        results = [results]
+    return [{'category': result['labels'][0]} for result in results]  # Top category
+
 def classify_complaint(text: str) -> str:
     """Classify complaint using zero-shot classification"""
-    classifier = load_zero_shot_classifier()  # Lazy load
+    return classify_complaints_batch([text])[0]
+
+def classify_complaints_batch(texts: List[str]) -> List[str]:
+    """Classify many complaints; cached texts are skipped, misses run as one batch"""
+    if not texts:
+        return []
+    
+    # Results are cached under the backend that actually computes them
+    if inference_client is not None:
+        try:
+            version = zero_shot_model_version(inference_client.get_backend())
+            results = classification_cache.get_or_compute_many(texts, version, zero_shot_classify_remote)
+            return [result['category'] for result in results]
+        except Exception as e:
+            logger.warning(f"Inference server error, classifying in-process: {e}")
     
+    classifier = load_zero_shot_classifier()
     if not classifier:
-        # Fallback: simple keyword matching
-        text_lower = text.lower()
-        if any(word in text_lower for word in ['water', 'tap', 'supply', 'नल', 'पानी']):
-            return "Water supply issues"
-        elif any(word in text_lower for word in ['electricity', 'power', 'light', 'बिजली']):
-            return "Electricity and power problems"
-        elif any(word in text_lower for word in ['road', 'pothole', 'सड़क']):
-            return "Road and infrastructure"
-        elif any(word in text_lower for word in ['hospital', 'doctor', 'health', 'अस्पताल']):
-            return "Health and medical services"
-        return "Other government services"
+        return [classify_by_keywords(text) for text in texts]
     
     try:
-        result = classifier(text, COMPLAINT_CATEGORIES)
-        return result['labels'][0]  # Return top category
+        version = zero_shot_model_version(backend_tag(classifier))
+        results = classification_cache.get_or_compute_many(texts, version, zero_shot_classify)
+        return [result['category'] for result in results]
     except Exception as e:
         print(f"Classification error: {e}")
-        return "Other government services"
+        return [classify_by_keywords(text) for text in texts]
 
 def detect_urgency(text: str) -> str:
     """Detect urgency level based on keywords"""
@@ -297,90 +416,79 @@ def detect_urgency(text: str) -> str:
         return "High"
     return "Medium"
 
-def detect_duplicates(text: str, citizen_id: str) -> Tuple[bool, Optional[int]]:
-    """Detect duplicate complaints using sentence transformers"""
-    s_model = load_sentence_model()  # Lazy load
-    
-    if not s_model or not cosine_similarity:
-        # Fallback: simple text matching
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, text FROM complaints 
-                WHERE citizen_id = ? AND timestamp > datetime('now', '-30 days')
-            ''', (citizen_id,))
-            recent_complaints = cursor.fetchall()
-            conn.close()
-            
-            for complaint_id, complaint_text in recent_complaints:
-                if text.lower() == complaint_text.lower():
-                    return True, complaint_id
-            return False, None
-        except Exception as e:
-            print(f"Duplicate detection error: {e}")
-            return False, None
+def detect_duplicates(text: str, citizen_id: str, vector=None) -> Tuple[bool, Optional[int]]:
+    """Detect duplicate complaints against the citizen's stored sentence embeddings"""
+    try:
+        # vector was encoded before the ingest transaction; history comes
+        # from complaint_embeddings
+        match = embedding_store.find_duplicate(text, citizen_id, vector)
+        if match is not None:
+            return match
+    except Exception as e:
+        print(f"Duplicate detection error: {e}")
     
+    # Fallback: MinHash/LSH near-duplicate lookup (no model needed)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Get recent complaints from same citizen (last 30 days)
-        cursor.execute('''
-            SELECT id, text FROM complaints 
-            WHERE citizen_id = ? AND timestamp > datetime('now', '-30 days')
-        ''', (citizen_id,))
-        
-        recent_complaints = cursor.fetchall()
-        conn.close()
-        
-        if not recent_complaints:
-            return False, None
-        
-        # Encode current complaint
-        current_embedding = s_model.encode([text])
-        
-        # Check similarity with recent complaints
-        for complaint_id, complaint_text in recent_complaints:
-            complaint_embedding = s_model.encode([complaint_text])
-            similarity = cosine_similarity(current_embedding, complaint_embedding)[0][0]
-            
-            if similarity > 0.9:  # High similarity threshold
-                return True, complaint_id
-        
-        return False, None
-        
+        return minhash_index.find_duplicate(text, citizen_id)
     except Exception as e:
         print(f"Duplicate detection error: {e}")
         return False, None
 
-def update_citizen_crs(citizen_id: str, is_valid: bool, is_duplicate: bool):
-    """Update Citizen Rating System score"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get current CRS score
-    cursor.execute('SELECT crs_score FROM citizens WHERE id = ?', (citizen_id,))
-    result = cursor.fetchone()
+def detect_duplicates_batch(texts: List[str], citizen_ids: List[str], vectors=None) -> List[Optional[Tuple[str, int]]]:
+    """
+    Detect duplicates for a whole batch in one pass
     
-    if result:
-        current_score = result[0]
-    else:
-        # Create new citizen with default score
-        current_score = 100
-        cursor.execute('INSERT INTO citizens (id, crs_score) VALUES (?, ?)', (citizen_id, current_score))
-    
-    # Update score based on validation
-    if not is_valid:
-        current_score = max(0, current_score - 10)
-    elif is_duplicate:
-        current_score = max(0, current_score - 5)
-    else:
-        current_score = min(100, current_score + 1)
+    The new texts were encoded before the ingest transaction; each is matched
+    with one dot product against its citizen's stored embeddings and earlier
+    items of the batch.
+    """
+    try:
+        matches = embedding_store.find_duplicates_batch(texts, citizen_ids, vectors)
+        if matches is not None:
+            return matches
+    except Exception as e:
+        print(f"Batch duplicate detection error: {e}")
     
-    cursor.execute('UPDATE citizens SET crs_score = ? WHERE id = ?', (current_score, citizen_id))
-    conn.commit()
-    conn.close()
+    try:
+        return minhash_index.find_duplicates_batch(texts, citizen_ids)
+    except Exception as e:
+        print(f"Batch duplicate detection error: {e}")
+        return complaint_ingestor.find_exact_duplicates(texts, citizen_ids)
+
+def update_citizen_crs(citizen_id: str, is_valid: bool, is_duplicate: bool) -> int:
+    """Update Citizen Rating System score (single-statement upsert)"""
+    return complaint_ingestor.apply_crs_update(citizen_id, is_valid, is_duplicate)
+
+# Persistent complaint embeddings (shares the lazily loaded sentence model)
+embedding_store = get_embedding_store(model_loader=load_sentence_model)
+
+# Shared write path for web, voice, SMS and USSD complaints
+complaint_ingestor = get_complaint_ingestor(
+    duplicate_detector=detect_duplicates,
+    batch_duplicate_detector=detect_duplicates_batch,
+    # Sentence-model inference runs before the ingest transaction opens
+    encoder=embedding_store.prepare
+)
+complaint_ingestor.add_insert_hook(embedding_store.on_complaints_inserted)
+
+# Cross-citizen ANN index over all complaint embeddings
+vector_index = get_vector_index()
+complaint_ingestor.add_insert_hook(vector_index.on_complaints_inserted)
+
+# Model-free near-duplicate index; always maintained on insert, since the
+# sentence model can fail to load even when the AI libraries import
+minhash_index = get_minhash_index()
+complaint_ingestor.add_insert_hook(minhash_index.on_complaints_inserted)
+
+# Dashboard counts, maintained in the ingesting transaction
+dashboard_rollups = get_dashboard_rollups()
+complaint_ingestor.add_insert_hook(dashboard_rollups.on_complaints_inserted)
+
+# Durable queue feeding the voice transcription workers
+voice_job_queue = get_voice_job_queue()
+
+# Whisper results by audio content (shared with the workers through SQLite)
+transcription_cache = get_transcription_cache()
 
 # ============================================
 # BACKEND INTEGRATIONS - Production Ready
@@ -406,49 +514,61 @@ try:
 except:
     logger.warning("Redis not available, using in-memory cache")
 
-# In-memory cache fallback
-in_memory_cache = {}
+# Classification results keyed by normalized text + model version
+classification_cache = get_classification_cache(redis_client=redis_client)
+
+# API response cache (bounded LRU, Redis-shared when configured); complaint
+# writes invalidate the 'complaints' tag
+response_cache = get_response_cache(redis_client=redis_client)
+complaint_ingestor.add_insert_hook(response_cache.on_complaints_inserted)
+
+# Open complaints by SLA deadline, queried from a partial index; breaches are
+# flagged by the scheduler process (services/scheduler)
+escalation_index = get_escalation_index()
+
+# Complaint hashes are anchored one Merkle root per batch; the periodic flush
+# runs in the scheduler process
+blockchain_anchor = get_blockchain_anchor()
+
+def on_complaint_status_changed(conn, old_status: str, new_status: str):
+    """Update derived state for a status change, inside the writing transaction"""
+    dashboard_rollups.on_status_changed(conn, old_status, new_status)
+    response_cache.invalidate(conn, 'complaints')
 
-def cache_response(ttl=10):
+def cache_response(ttl=10, tags=('complaints',)):
     """
     Decorator to cache API responses
+    
+    The serialized body is cached with a strong ETag; a request whose
+    If-None-Match matches gets 304 without running the view or touching
+    SQLite.
+    
     Args:
         ttl: Time to live in seconds
+        tags: Data the response depends on (invalidated by writes)
     """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # Generate cache key
-            cache_key = f"{request.path}:{json.dumps(request.args.to_dict())}"
-            
-            # Try to get from cache
-            if redis_client:
-                try:
-                    cached = redis_client.get(cache_key)
-                    if cached:
-                        logger.debug(f"✓ Cache hit: {cache_key}")
-                        return jsonify(json.loads(cached))
-                except:
-                    pass
-            elif cache_key in in_memory_cache:
-                cached_data, expires_at = in_memory_cache[cache_key]
-                if time.time() < expires_at:
-                    logger.debug(f"✓ Memory cache hit: {cache_key}")
-                    return jsonify(cached_data)
+            cache_key = f"{request.path}:{json.dumps(request.args.to_dict(), sort_keys=True)}"
             
-            # Cache miss - execute function
-            response = f(*args, **kwargs)
-            response_data = response.get_json()
-            
-            # Store in cache
-            if redis_client:
-                try:
-                    redis_client.setex(cache_key, ttl, json.dumps(response_data))
-                except:
-                    pass
-            else:
-                in_memory_cache[cache_key] = (response_data, time.time() + ttl)
+            def compute():
+                response = app.make_response(f(*args, **kwargs))
+                return [response.get_data(as_text=True), response.status_code]
             
+            entry = response_cache.get_or_compute_entry(
+                cache_key, compute, ttl, tags,
+                should_cache=lambda value: value[1] == 200,
+                revalidate=copy_current_request_context
+            )
+            body, status_code = entry['value']
+            response = Response(body, status=status_code, mimetype='application/json')
+            if entry['etag']:
+                # Clients must revalidate, but a matching ETag costs one 304
+                response.set_etag(entry['etag'])
+                response.headers['Cache-Control'] = 'no-cache'
+                response.make_conditional(request)
             return response
         return decorated_function
     return decorator
@@ -570,92 +690,161 @@ def get_fallback_ai_response(query: str, role: str) -> str:
     # Default response
     return role_responses.get('default', "I can help with complaint tracking, analytics, and governance insights. What would you like to know?")
 
-# Blockchain Integration with Mock Fallback
+# Blockchain Integration (Merkle-batched, local chain without API key)
 def log_to_blockchain(complaint_id: str, complaint_data: dict) -> dict:
     """
-    Log complaint to blockchain with automatic mock fallback
+    Queue a complaint hash for the next anchored batch
+    
+    One transaction is sent per batch root (see services/blockchain_anchor);
+    the complaint's inclusion proof is available from get_proof once its
+    batch is anchored.
     """
-    if not os.getenv('THIRDWEB_SECRET_KEY'):
-        logger.info("Using blockchain mock (no API key)")
-        return generate_mock_blockchain_tx(complaint_id, complaint_data)
+    result = blockchain_anchor.submit(complaint_id, complaint_data)
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    result.pop('success')
+    result['timestamp'] = datetime.utcnow().isoformat()
+    return result
     
-    try:
-        from web3 import Web3
-        
-        # Initialize Web3
-        provider_url = os.getenv('WEB3_PROVIDER_URL', 'https://polygon-rpc.com')
-        w3 = Web3(Web3.HTTPProvider(provider_url))
-        
-        # Generate transaction hash
-        tx_data = f"{complaint_id}{json.dumps(complaint_data)}"
-        tx_hash = '0x' + hashlib.sha256(tx_data.encode()).hexdigest()
-        
-        # In production, this would interact with smart contract
-        # For now, simulate successful transaction
-        
-        return {
-            'tx_hash': tx_hash,
-            'block_number': w3.eth.block_number if w3.isConnected() else 45000000,
-            'explorer_url': f"https://polygonscan.com/tx/{tx_hash}",
-            'status': 'confirmed',
-            'gas_used': '21000',
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        
-    except Exception as e:
-        logger.error(f"Blockchain logging failed: {str(e)}")
-        return generate_mock_blockchain_tx(complaint_id, complaint_data)
+    
+# API Endpoints for Integration
+COMPLAINT_LIST_COLUMNS = '''
+    c.id, c.text, c.category, c.urgency, c.citizen_id,
+    c.status, c.timestamp, c.hash, c.is_valid, c.is_duplicate,
+    a.field_worker_id, fw.name as field_worker_name,
+    a.assigned_at, a.resolved_at, a.resolution_notes
+'''
 
-def generate_mock_blockchain_tx(complaint_id: str, complaint_data: dict) -> dict:
-    """
-    Generate deterministic mock transaction
+def encode_complaint_cursor(timestamp: str, complaint_id: int) -> str:
+    """Opaque cursor for the position after (timestamp, id)"""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, complaint_id]).encode()).decode().rstrip('=')
+
+def decode_complaint_cursor(token: str) -> Tuple[str, int]:
     """
-    tx_data = f"{complaint_id}{json.dumps(complaint_data)}"
-    tx_hash = 'MCK-TX-' + hashlib.sha256(tx_data.encode()).hexdigest()[:40]
+    Parse a cursor produced by encode_complaint_cursor
     
-    # Extract complaint ID number
+    Raises:
+        ValueError: If the cursor is malformed
+    """
     try:
-        id_num = int(''.join(filter(str.isdigit, str(complaint_id))))
-    except:
-        id_num = hash(complaint_id) % 1000000
-    
-    return {
-        'tx_hash': tx_hash,
-        'block_number': 45000000 + id_num,
-        'explorer_url': f"https://mock.polygonscan.com/tx/{tx_hash}",
-        'status': 'mocked',
-        'gas_used': '21000',
-        'timestamp': datetime.utcnow().isoformat()
-    }
+        timestamp, complaint_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return str(timestamp), int(complaint_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def complaint_list_filters(args) -> Tuple[List[str], List]:
+    """
+    WHERE clauses (on complaints c) for the listing filters and cursor
     
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    clauses, params = [], []
+    for column, param in (('status', 'status'), ('category', 'category'), ('citizen_id', 'citizen_id')):
+        value = args.get(param)
+        if value:
+            clauses.append(f'c.{column} = ?')
+            params.append(value)
     
-# API Endpoints for Integration
+    token = args.get('cursor')
+    if token:
+        # Rows strictly after the cursor in (timestamp DESC, id DESC) order
+        clauses.append('(c.timestamp, c.id) < (?, ?)')
+        params.extend(decode_complaint_cursor(token))
+    return clauses, params
+
 @app.route(f'/api/{API_VERSION}/complaints', methods=['GET'])
 def get_complaints():
-    """Get all complaints for dashboard"""
+    """
+    List complaints with assignment info, newest first
+    
+    Query parameters:
+        - status, category, citizen_id: (optional) filters
+        - limit: (optional) complaints per page (default COMPLAINTS_PAGE_SIZE)
+        - cursor: (optional) next_cursor of the previous page
+        - format: (optional) 'ndjson' to stream every matching row from the
+          cursor on, one JSON object per line (also chosen by
+          Accept: application/x-ndjson)
+    
+    Returns:
+        JSON page with 'data' and 'pagination' {limit, has_more, next_cursor},
+        or an NDJSON stream
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        clauses, params = complaint_list_filters(request.args)
+        limit = min(max(int(request.args.get('limit', COMPLAINTS_PAGE_SIZE)), 1), COMPLAINTS_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    
+    stream = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    if stream:
+        def generate():
+            cursor = db_pool.connection().cursor()
+            cursor.execute(f'''
+                SELECT {COMPLAINT_LIST_COLUMNS}
+                FROM complaints c
+                LEFT JOIN assignments a ON c.id = a.complaint_id
+                LEFT JOIN field_workers fw ON a.field_worker_id = fw.id
+                {where}
+                ORDER BY c.timestamp DESC, c.id DESC
+            ''', params)
+            
+            streamed = 0
+            while True:
+                rows = cursor.fetchmany(COMPLAINTS_STREAM_FETCH_SIZE)
+                if not rows:
+                    break
+                streamed += len(rows)
+                yield ''.join(json.dumps(dict(row)) + '\n' for row in rows)
+            logger.info(f"Streamed {streamed} complaints")
         
-        # Get all complaints with assignment info
-        cursor.execute('''
-            SELECT 
-                c.id, c.text, c.category, c.urgency, c.citizen_id, 
-                c.status, c.timestamp, c.hash, c.is_valid, c.is_duplicate,
-                a.field_worker_id, fw.name as field_worker_name, 
-                a.assigned_at, a.resolved_at, a.resolution_notes
-            FROM complaints c
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    try:
+        cursor = db_pool.connection().cursor()
+        
+        # Page over complaints first (one extra to detect a next page), then
+        # join, so a complaint's assignments never straddle two pages
+        cursor.execute(f'''
+            SELECT {COMPLAINT_LIST_COLUMNS}
+            FROM (
+                SELECT * FROM complaints c
+                {where}
+                ORDER BY c.timestamp DESC, c.id DESC
+                LIMIT ?
+            ) c
             LEFT JOIN assignments a ON c.id = a.complaint_id
             LEFT JOIN field_workers fw ON a.field_worker_id = fw.id
-            ORDER BY c.timestamp DESC
-        ''')
+            ORDER BY c.timestamp DESC, c.id DESC
+        ''', params + [limit + 1])
         
-        complaints = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        complaints = []
+        complaint_ids = set()
+        has_more = False
+        for row in cursor.fetchall():
+            if row['id'] not in complaint_ids:
+                if len(complaint_ids) == limit:
+                    has_more = True
+                    break
+                complaint_ids.add(row['id'])
+            complaints.append(dict(row))
+        
+        last = complaints[-1] if complaints else None
+        next_cursor = encode_complaint_cursor(last['timestamp'], last['id']) if has_more else None
         
-        logger.info(f"Retrieved {len(complaints)} complaints")
-        return jsonify({"status": "success", "data": complaints})
+        logger.info(f"Retrieved {len(complaint_ids)} complaints")
+        return jsonify({
+            "status": "success",
+            "data": complaints,
+            "pagination": {
+                "limit": limit,
+                "has_more": has_more,
+                "next_cursor": next_cursor
+            }
+        })
     
     except Exception as e:
         logger.error(f"Error retrieving complaints: {str(e)}")
@@ -676,9 +865,6 @@ def submit_complaint():
         # Validate complaint context
         is_valid, validation_message = validate_complaint_context(text)
         
-        # Check for duplicates
-        is_duplicate, duplicate_id = detect_duplicates(text, citizen_id)
-        
         # Generate timestamp and hash
         timestamp = datetime.now().isoformat()
         hash_value = generate_blockchain_hash(text, timestamp)
@@ -689,23 +875,17 @@ def submit_complaint():
         # Detect urgency
         urgency = detect_urgency(text)
         
-        # Update CRS score
-        update_citizen_crs(citizen_id, is_valid, is_duplicate)
-        
-        # Save complaint to database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        # Duplicate check, CRS upsert and insert in one transaction
+        result = complaint_ingestor.ingest(
+            text, citizen_id, category, urgency,
+            is_valid=is_valid, timestamp=timestamp, hash_value=hash_value
+        )
+        if not result['success']:
+            return jsonify({"status": "error", "message": result['error']}), 500
         
-        cursor.execute('''
-            INSERT INTO complaints 
-            (text, category, urgency, citizen_id, hash, is_valid, is_duplicate, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (text, category, urgency, citizen_id, hash_value, is_valid, is_duplicate, 
-              "Invalid" if not is_valid else "Duplicate" if is_duplicate else "Pending"))
-        
-        complaint_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        complaint_id = result['complaint_id']
+        is_duplicate = result['is_duplicate']
+        duplicate_id = result['duplicate_id']
         
         logger.info(f"New complaint submitted: ID={complaint_id}, Citizen={citizen_id}")
         
@@ -727,6 +907,118 @@ def submit_complaint():
         logger.error(f"Error submitting complaint: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def parse_bulk_payload() -> List:
+    """
+    Parse a bulk complaint body
+    
+    Accepts a JSON array, {"complaints": [...]}, or NDJSON (one complaint per
+    line). Unparseable NDJSON lines are kept as error strings so their index
+    is still reported.
+    """
+    content_type = request.content_type or ''
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(f"Invalid JSON line: {e}")
+        return items
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('complaints')
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array, {\"complaints\": [...]} or NDJSON body")
+    return data
+
+def process_bulk_chunk(chunk: List[Tuple[int, Dict]]):
+    """Validate, classify and persist one chunk; yields (index, result) pairs"""
+    texts = [item['text'] for _, item in chunk]
+    
+    validations = [validate_complaint_context(text) for text in texts]
+    categories = classify_complaints_batch(texts)
+    urgencies = [detect_urgency(text) for text in texts]
+    
+    prepared = []
+    for (_, item), (is_valid, _), category, urgency in zip(chunk, validations, categories, urgencies):
+        prepared.append({
+            'text': item['text'],
+            'citizen_id': item['citizen_id'],
+            'category': category,
+            'urgency': urgency,
+            'is_valid': is_valid,
+            'timestamp': item.get('timestamp')
+        })
+    
+    results = complaint_ingestor.ingest_many(prepared, chunk_size=len(prepared))
+    for (index, _), (_, validation_message), result in zip(chunk, validations, results):
+        if result['success']:
+            result['validation_message'] = validation_message
+        yield index, result
+
+@app.route(f'/api/{API_VERSION}/complaints/bulk', methods=['POST'])
+def submit_complaints_bulk():
+    """
+    Bulk complaint ingestion (CSC kiosks, offline syncs, partner imports)
+    
+    Items are validated, classified and de-duplicated in batches and written
+    with executemany, one transaction per chunk. The response is streamed as
+    NDJSON, one line per input item tagged with its input index. Replaying an item with
+    the same text and timestamp returns the stored complaint instead of a
+    new one.
+    """
+    try:
+        items = parse_bulk_payload()
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    if not items:
+        return jsonify({"status": "error", "message": "No complaints supplied"}), 400
+    if len(items) > BULK_MAX_ITEMS:
+        return jsonify({
+            "status": "error",
+            "message": f"Too many complaints (maximum {BULK_MAX_ITEMS} per request)"
+        }), 413
+    
+    def generate():
+        received = 0
+        ingested = 0
+        chunk = []
+        
+        def flush():
+            nonlocal ingested
+            for index, result in process_bulk_chunk(chunk):
+                if result['success']:
+                    ingested += 1
+                    line = {"index": index, "status": "success", "data": result}
+                else:
+                    line = {"index": index, "status": "error", "message": result['error']}
+                yield json.dumps(line) + '\n'
+            chunk.clear()
+        
+        for index, item in enumerate(items):
+            received += 1
+            if isinstance(item, str):
+                yield json.dumps({"index": index, "status": "error", "message": item}) + '\n'
+                continue
+            if not isinstance(item, dict) or not item.get('text') or not item.get('citizen_id'):
+                yield json.dumps({"index": index, "status": "error", "message": "Missing required fields"}) + '\n'
+                continue
+            
+            chunk.append((index, item))
+            if len(chunk) >= complaint_ingestor.BULK_CHUNK_SIZE:
+                yield from flush()
+        
+        if chunk:
+            yield from flush()
+        
+        logger.info(f"Bulk ingestion: {ingested}/{received} complaints ingested")
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route(f'/api/{API_VERSION}/complaints/<int:complaint_id>', methods=['PUT'])
 def update_complaint(complaint_id):
     """Update complaint status (from field worker app)"""
@@ -736,51 +1028,59 @@ def update_complaint(complaint_id):
         if not data:
             return jsonify({"status": "error", "message": "No data provided"}), 400
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Check if complaint exists
-        cursor.execute('SELECT id FROM complaints WHERE id = ?', (complaint_id,))
-        if not cursor.fetchone():
-            conn.close()
-            return jsonify({"status": "error", "message": "Complaint not found"}), 404
-        
-        # Update status if provided
-        if 'status' in data:
-            cursor.execute('UPDATE complaints SET status = ? WHERE id = ?', 
-                          (data['status'], complaint_id))
-        
-        # Handle assignment
-        if 'field_worker_id' in data:
-            # Check if already assigned
-            cursor.execute('SELECT id FROM assignments WHERE complaint_id = ?', (complaint_id,))
-            assignment = cursor.fetchone()
+        # Status, assignment and dashboard rollups change together
+        with db_pool.transaction() as conn:
+            cursor = conn.cursor()
             
-            if assignment:
-                # Update existing assignment
-                cursor.execute('''
-                    UPDATE assignments 
-                    SET field_worker_id = ?, 
-                        resolved_at = CASE WHEN ? = 'Resolved' THEN CURRENT_TIMESTAMP ELSE NULL END,
-                        resolution_notes = ?
-                    WHERE complaint_id = ?
-                ''', (data['field_worker_id'], 
-                      data.get('status', ''), 
-                      data.get('resolution_notes', ''),
-                      complaint_id))
-            else:
-                # Create new assignment
-                cursor.execute('''
-                    INSERT INTO assignments 
-                    (complaint_id, field_worker_id, resolved_at, resolution_notes)
-                    VALUES (?, ?, ?, ?)
-                ''', (complaint_id, 
-                      data['field_worker_id'],
-                      datetime.now().isoformat() if data.get('status') == 'Resolved' else None,
-                      data.get('resolution_notes', '')))
-        
-        conn.commit()
-        conn.close()
+            # Check if complaint exists
+            cursor.execute('SELECT status FROM complaints WHERE id = ?', (complaint_id,))
+            complaint = cursor.fetchone()
+            if not complaint:
+                return jsonify({"status": "error", "message": "Complaint not found"}), 404
+            
+            # Update status if provided
+            if 'status' in data:
+                cursor.execute('UPDATE complaints SET status = ? WHERE id = ?', 
+                              (data['status'], complaint_id))
+                on_complaint_status_changed(conn, complaint['status'], data['status'])
+            
+            # Handle assignment
+            if 'field_worker_id' in data:
+                resolved = data.get('status') == 'Resolved'
+                
+                # Check if already assigned
+                cursor.execute('SELECT field_worker_id, resolved_at FROM assignments WHERE complaint_id = ?',
+                              (complaint_id,))
+                assignment = cursor.fetchone()
+                
+                if assignment:
+                    # Update existing assignment
+                    cursor.execute('''
+                        UPDATE assignments 
+                        SET field_worker_id = ?, 
+                            resolved_at = CASE WHEN ? = 'Resolved' THEN CURRENT_TIMESTAMP ELSE NULL END,
+                            resolution_notes = ?
+                        WHERE complaint_id = ?
+                    ''', (data['field_worker_id'], 
+                          data.get('status', ''), 
+                          data.get('resolution_notes', ''),
+                          complaint_id))
+                    dashboard_rollups.on_assignment_changed(
+                        conn, assignment['field_worker_id'], assignment['resolved_at'] is not None,
+                        data['field_worker_id'], resolved
+                    )
+                else:
+                    # Create new assignment
+                    cursor.execute('''
+                        INSERT INTO assignments 
+                        (complaint_id, field_worker_id, resolved_at, resolution_notes)
+                        VALUES (?, ?, ?, ?)
+                    ''', (complaint_id, 
+                          data['field_worker_id'],
+                          datetime.now().isoformat() if resolved else None,
+                          data.get('resolution_notes', '')))
+                    dashboard_rollups.on_assignment_changed(conn, None, False, data['field_worker_id'], resolved)
+                response_cache.invalidate(conn, 'complaints')
         
         logger.info(f"Complaint {complaint_id} updated: {data}")
         return jsonify({"status": "success"})
@@ -793,13 +1093,10 @@ def update_complaint(complaint_id):
 def get_field_workers():
     """Get all field workers"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         
         cursor.execute('SELECT * FROM field_workers')
         workers = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         
         return jsonify({"status": "success", "data": workers})
     
@@ -825,11 +1122,9 @@ def health_check():
     
     # Check database
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         cursor.execute('SELECT 1')
         cursor.close()
-        conn.close()
         health_status['checks']['database'] = 'ok'
     except Exception as e:
         health_status['checks']['database'] = f'error: {str(e)}'
@@ -845,6 +1140,13 @@ def health_check():
     else:
         health_status['checks']['redis'] = 'not_configured'
     
+    # Classification cache counters
+    health_status['classification_cache'] = classification_cache.get_stats()
+    health_status['transcription_cache'] = transcription_cache.get_stats()
+    health_status['response_cache'] = response_cache.get_stats()
+    health_status['escalation_index'] = escalation_index.get_stats()
+    health_status['blockchain_anchor'] = blockchain_anchor.get_stats()
+    
     # Check external APIs
     health_status['checks']['openai'] = 'mock' if not os.getenv('OPENAI_API_KEY') else 'configured'
     health_status['checks']['thirdweb'] = 'mock' if not os.getenv('THIRDWEB_SECRET_KEY') else 'configured'
@@ -868,11 +1170,7 @@ def get_dashboard():
                 seed_data = json.load(f)
                 return jsonify({"status": "success", "data": seed_data})
         
-        # Real data from database
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
+        # Real data from the rollup tables
         dashboard_data = {
             'total_complaints': 0,
             'resolved': 0,
@@ -881,10 +1179,7 @@ def get_dashboard():
         }
         
         # Get complaint statistics
-        cursor.execute("SELECT COUNT(*) as count, status FROM complaints GROUP BY status")
-        for row in cursor.fetchall():
-            status = row['status']
-            count = row['count']
+        for status, count in dashboard_rollups.get_status_counts().items():
             dashboard_data['total_complaints'] += count
             if status == 'Resolved':
                 dashboard_data['resolved'] = count
@@ -893,8 +1188,6 @@ def get_dashboard():
             elif status == 'In Progress':
                 dashboard_data['in_progress'] = count
         
-        conn.close()
-        
         return jsonify({"status": "success", "data": dashboard_data})
         
     except Exception as e:
@@ -953,61 +1246,49 @@ def blockchain_log():
         logger.error(f"Error logging to blockchain: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/blockchain/proof/<complaint_id>', methods=['GET'])
+def blockchain_proof(complaint_id):
+    """
+    Inclusion proof of a complaint in its anchored batch root
+    """
+    try:
+        proof = blockchain_anchor.get_proof(complaint_id)
+        if not proof['success']:
+            return jsonify({"status": "error", "message": proof['error']}), 404
+        
+        proof.pop('success')
+        return jsonify({
+            'status': 'success',
+            'blockchain': proof
+        })
+        
+    except Exception as e:
+        logger.error(f"Error retrieving blockchain proof: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route(f'/api/{API_VERSION}/dashboard', methods=['GET'])
+@cache_response(ttl=10)
 def get_dashboard_data():
     """Get dashboard statistics for React dashboard"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         # Get complaint statistics
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'Pending' THEN 1 ELSE 0 END) as pending,
-                SUM(CASE WHEN status = 'In Progress' THEN 1 ELSE 0 END) as in_progress,
-                SUM(CASE WHEN status = 'Resolved' THEN 1 ELSE 0 END) as resolved,
-                SUM(CASE WHEN status = 'Invalid' THEN 1 ELSE 0 END) as invalid,
-                SUM(CASE WHEN status = 'Duplicate' THEN 1 ELSE 0 END) as duplicate
-            FROM complaints
-        ''')
-        stats = dict(cursor.fetchone())
+        status_counts = dashboard_rollups.get_status_counts()
+        stats = {'total': dashboard_rollups.get_total()}
+        for key, status in (('pending', 'Pending'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'),
+                            ('invalid', 'Invalid'), ('duplicate', 'Duplicate')):
+            stats[key] = status_counts.get(status, 0)
         
         # Get category distribution
-        cursor.execute('''
-            SELECT category, COUNT(*) as count
-            FROM complaints
-            GROUP BY category
-            ORDER BY count DESC
-        ''')
-        categories = [dict(row) for row in cursor.fetchall()]
+        categories = [
+            {'category': category, 'count': count}
+            for category, count in dashboard_rollups.get_category_counts().items()
+        ]
         
         # Get field worker performance
-        cursor.execute('''
-            SELECT 
-                fw.id, fw.name, fw.area,
-                COUNT(a.id) as assigned_count,
-                SUM(CASE WHEN a.resolved_at IS NOT NULL THEN 1 ELSE 0 END) as resolved_count
-            FROM field_workers fw
-            LEFT JOIN assignments a ON fw.id = a.field_worker_id
-            GROUP BY fw.id
-            ORDER BY resolved_count DESC
-        ''')
-        workers_performance = [dict(row) for row in cursor.fetchall()]
-        
-        # Get complaints requiring escalation (older than 72 hours and not resolved)
-        cursor.execute('''
-            SELECT id, text, category, status, timestamp
-            FROM complaints
-            WHERE 
-                status NOT IN ('Resolved', 'Invalid', 'Duplicate') 
-                AND datetime(timestamp) < datetime('now', '-3 days')
-            ORDER BY timestamp ASC
-        ''')
-        escalations = [dict(row) for row in cursor.fetchall()]
+        workers_performance = dashboard_rollups.get_worker_performance()
         
-        conn.close()
+        # Get complaints requiring escalation (open past the SLA), from the partial index
+        escalations = escalation_index.get_overdue()
         
         return jsonify({
             "status": "success", 
@@ -1015,7 +1296,8 @@ def get_dashboard_data():
                 "stats": stats,
                 "categories": categories,
                 "workers_performance": workers_performance,
-                "escalations": escalations
+                "escalations": escalations,
+                "next_sla_breach": escalation_index.next_breach()
             }
         })
     
@@ -1040,11 +1322,9 @@ if __name__ == '__main__':
 @app.route('/api/v1/complaints', methods=['GET'])
 def get_complaints():
     """Get all complaints for dashboard"""
-    conn = sqlite3.connect('gramsetu_ai.db')
-    cursor = conn.cursor()
+    cursor = db_pool.connection().cursor()
     cursor.execute('SELECT * FROM complaints')
     complaints = cursor.fetchall()
-    conn.close()
     
     # Convert to JSON
     result = []
@@ -1087,16 +1367,14 @@ def create_complaint():
     update_crs_score(citizen_id, is_valid)
     
     # Save to database
-    conn = sqlite3.connect('gramsetu_ai.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO complaints (citizen_id, description, category, status, created_at, hash, urgency)
-        VALUES (?, ?, ?, ?, datetime('now'), ?, ?)
-    ''', (citizen_id, complaint_text, category, 'Pending' if is_valid else 'Invalid', hash_value, urgency))
-    
-    complaint_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with db_pool.transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO complaints (citizen_id, description, category, status, created_at, hash, urgency)
+            VALUES (?, ?, ?, ?, datetime('now'), ?, ?)
+        ''', (citizen_id, complaint_text, category, 'Pending' if is_valid else 'Invalid', hash_value, urgency))
+        
+        complaint_id = cursor.lastrowid
     
     return jsonify({
         'status': 'success',
@@ -1114,16 +1392,15 @@ def update_complaint(complaint_id):
     """Update a complaint status"""
     data = request.json
     
-    conn = sqlite3.connect('gramsetu_ai.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE complaints
-        SET status = ?
-        WHERE id = ?
-    ''', (data.get('status', 'Pending'), complaint_id))
-    
-    conn.commit()
-    conn.close()
+    with db_pool.transaction() as conn:
+        row = conn.execute('SELECT status FROM complaints WHERE id = ?', (complaint_id,)).fetchone()
+        conn.execute('''
+            UPDATE complaints
+            SET status = ?
+            WHERE id = ?
+        ''', (data.get('status', 'Pending'), complaint_id))
+        if row is not None:
+            on_complaint_status_changed(conn, row[0], data.get('status', 'Pending'))
     
     return jsonify({
         'status': 'success',
@@ -1145,9 +1422,6 @@ def submit_complaint():
         # Validate complaint context
         is_valid_context, validation_message = validate_complaint_context(text)
         
-        # Detect duplicates
-        is_duplicate, duplicate_id = detect_duplicates(text, citizen_id)
-        
         # Generate blockchain hash
         timestamp = datetime.now().isoformat()
         complaint_hash = generate_blockchain_hash(text, timestamp)
@@ -1156,27 +1430,21 @@ def submit_complaint():
         category = classify_complaint(text)
         urgency = detect_urgency(text)
         
-        # Determine final validation status
-        is_valid = is_valid_context and not is_duplicate
-        
-        # Update CRS score
-        crs_score = update_citizen_crs(citizen_id, is_valid, is_duplicate)
-        
-        # Store complaint in database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO complaints 
-            (text, category, urgency, citizen_id, crs_score, hash, timestamp, 
-             status, is_duplicate, is_valid)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (text, category, urgency, citizen_id, crs_score, complaint_hash, 
-              timestamp, 'Pending', is_duplicate, is_valid))
+        # Duplicate check, CRS upsert and insert in one transaction; a
+        # duplicate is stored and scored as invalid on this endpoint
+        result = complaint_ingestor.ingest(
+            text, citizen_id, category, urgency,
+            is_valid=is_valid_context, timestamp=timestamp, hash_value=complaint_hash,
+            duplicate_invalidates=True
+        )
+        if not result['success']:
+            return jsonify({'error': f"Internal server error: {result['error']}"}), 500
         
-        complaint_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        complaint_id = result['complaint_id']
+        is_duplicate = result['is_duplicate']
+        duplicate_id = result['duplicate_id']
+        crs_score = result['crs_score']
+        is_valid = result['is_valid']
         
         # Prepare response
         response = {
@@ -1218,34 +1486,31 @@ def update_complaint():
             return jsonify({'error': f'Invalid status. Must be one of: {valid_statuses}'}), 400
         
         # Update complaint in database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Get current complaint data
-        cursor.execute('SELECT citizen_id, is_valid FROM complaints WHERE id = ?', (complaint_id,))
-        result = cursor.fetchone()
-        
-        if not result:
-            conn.close()
-            return jsonify({'error': 'Complaint not found'}), 404
-        
-        citizen_id, is_valid = result
-        
-        # Update complaint
-        cursor.execute('''
-            UPDATE complaints 
-            SET evidence = ?, status = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (evidence, status, complaint_id))
-        
-        # Update CRS based on resolution
-        if status == 'Resolved' and is_valid:
-            update_citizen_crs(citizen_id, True, False)
-        elif status == 'Rejected' and is_valid:
-            update_citizen_crs(citizen_id, False, False)
-        
-        conn.commit()
-        conn.close()
+        with db_pool.transaction() as conn:
+            cursor = conn.cursor()
+            
+            # Get current complaint data
+            cursor.execute('SELECT citizen_id, is_valid, status FROM complaints WHERE id = ?', (complaint_id,))
+            result = cursor.fetchone()
+            
+            if not result:
+                return jsonify({'error': 'Complaint not found'}), 404
+            
+            citizen_id, is_valid, old_status = result
+            
+            # Update complaint
+            cursor.execute('''
+                UPDATE complaints 
+                SET evidence = ?, status = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (evidence, status, complaint_id))
+            on_complaint_status_changed(conn, old_status, status)
+            
+            # Update CRS based on resolution
+            if status == 'Resolved' and is_valid:
+                update_citizen_crs(citizen_id, True, False)
+            elif status == 'Rejected' and is_valid:
+                update_citizen_crs(citizen_id, False, False)
         
         return jsonify({
             'message': 'Complaint updated successfully',
@@ -1260,8 +1525,7 @@ def update_complaint():
 def get_dashboard():
     """Get dashboard data with complaint statistics"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         
         # Get all complaints with pagination
         page = int(request.args.get('page', 1))
@@ -1280,20 +1544,13 @@ def get_dashboard():
         complaints = cursor.fetchall()
         
         # Get statistics
-        cursor.execute('SELECT COUNT(*) FROM complaints')
-        total_complaints = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM complaints WHERE status = "Pending"')
-        pending_complaints = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM complaints WHERE is_duplicate = 1')
-        duplicate_complaints = cursor.fetchone()[0]
+        total_complaints = dashboard_rollups.get_total()
+        pending_complaints = dashboard_rollups.get_status_counts().get('Pending', 0)
+        duplicate_complaints = dashboard_rollups.get_duplicate_count()
         
         cursor.execute('SELECT AVG(crs_score) FROM citizens')
         avg_crs = cursor.fetchone()[0] or 0
         
-        conn.close()
-        
         # Format complaints data
         complaints_data = []
         for complaint in complaints:
@@ -1336,29 +1593,152 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'models_loaded': zero_shot_classifier is not None and sentence_model is not None
+        'models_loaded': zero_shot_classifier is not None and sentence_model is not None,
+        'inference_backend': backend_tag(zero_shot_classifier)
     }), 200
 
 def allowed_audio_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def process_voice_job(job: Dict) -> Dict:
+    """
+    Transcribe, classify and ingest one voice complaint
+    
+    Runs in the voice transcription workers (services.voice_job_queue), or
+    inline when VOICE_JOBS_ASYNC is off.
+    
+    Args:
+        job: Job with citizen_id, language, urgent and the audio as 'audio_path'
+             (queued uploads) or 'audio' (bytes / stream, decoded in memory)
+    
+    Returns:
+        Complaint data for the API response
+    """
+    # Process voice complaint
+    result = load_voice_service().process_voice_complaint(
+        audio_source=job.get('audio', job.get('audio_path')),
+        citizen_id=job['citizen_id'],
+        language=job.get('language'),
+        urgent=job.get('urgent', False),
+        # Long clips fall back to faster Whisper models while a backlog builds up
+        queue_depth=voice_job_queue.queue_depth() if 'id' in job else 0
+    )
+    
+    if not result['success']:
+        raise RuntimeError(result.get('error', 'Voice processing failed'))
+    
+    return register_voice_complaint(result, job['citizen_id'], job_id=job.get('id'))
+
+def load_voice_service():
+    """Lazy load the voice service on first use"""
+    global voice_service
+    if voice_service is None:
+        logger.info("Loading voice service...")
+        voice_service = get_voice_service()
+    return voice_service
+
+def analyze_voice_text(text: str, language: Optional[str] = None) -> Dict:
+    """Category, urgency and keywords of a transcript"""
+    # Classify complaint using multilingual classifier
+    if multilingual_classifier:
+        analysis = multilingual_classifier.analyze_complaint(text, language or 'en')
+        return {
+            'category': analysis['category'],
+            'urgency': analysis['urgency'],
+            'keywords': analysis['keywords']
+        }
+    
+    # Fallback to default classifier
+    return {
+        'category': classify_complaint(text),
+        'urgency': detect_urgency(text),
+        'keywords': []
+    }
+
+def register_voice_complaint(result: Dict, citizen_id: str, analysis: Optional[Dict] = None,
+                             job_id: Optional[str] = None) -> Dict:
+    """
+    Classify (unless already done) and ingest a transcribed voice complaint
+    
+    Args:
+        result: Transcription with text, language and timestamp
+        citizen_id: Citizen filing the complaint
+        analysis: Classification computed earlier (e.g. during an IVR stream)
+        job_id: Voice job ID, stored on the complaint so a job that is run
+                twice ingests one complaint
+    
+    Returns:
+        Complaint data for the API response
+    """
+    # Get complaint text from transcription
+    complaint_text = result['text']
+    detected_language = result['language']
+    
+    analysis = analysis or analyze_voice_text(complaint_text, detected_language)
+    category = analysis['category']
+    urgency = analysis['urgency']
+    keywords = analysis['keywords']
+    
+    # Validate complaint context
+    is_valid_context, validation_message = validate_complaint_context(complaint_text)
+    
+    # Generate blockchain hash
+    complaint_hash = generate_blockchain_hash(complaint_text, result['timestamp'])
+    
+    # Duplicate check, CRS upsert and insert in one transaction
+    ingest_result = complaint_ingestor.ingest(
+        complaint_text, citizen_id, category, urgency,
+        is_valid=is_valid_context, timestamp=result['timestamp'], hash_value=complaint_hash,
+        voice_job_id=job_id
+    )
+    if not ingest_result['success']:
+        raise RuntimeError(ingest_result['error'])
+    
+    complaint_id = ingest_result['complaint_id']
+    is_duplicate = ingest_result['is_duplicate']
+    duplicate_id = ingest_result['duplicate_id']
+    crs_score = ingest_result['crs_score']
+    
+    # Prepare response in requested format (stored values win on a re-run)
+    response_data = {
+        'complaint_id': f"GSAI-{datetime.now().year}-{str(complaint_id).zfill(4)}",
+        'text': complaint_text,
+        'category': ingest_result['category'],
+        'urgency': ingest_result['urgency'],
+        'language': detected_language,
+        'timestamp': ingest_result['timestamp'],
+        'hash': ingest_result['hash'],
+        'is_valid': ingest_result['is_valid'],
+        'is_duplicate': is_duplicate,
+        'crs_score': crs_score,
+        'audio_duration': result.get('audio_duration', 0),
+        'keywords': keywords
+    }
+    
+    if is_duplicate and duplicate_id:
+        response_data['duplicate_of'] = duplicate_id
+    
+    logger.info(f"Voice complaint processed: {response_data['complaint_id']}")
+    return response_data
+
 @app.route(f'/api/{API_VERSION}/voice/upload', methods=['POST'])
 def upload_voice_complaint():
     """
-    Upload and process voice complaint
+    Upload a voice complaint for transcription
     
     Form data:
         - audio: Audio file (WAV, MP3, OGG, M4A, FLAC, WEBM)
         - citizen_id: Citizen ID
         - language: (optional) Language code (hi, ta, gu, etc.)
+        - urgent: (optional) 'true' to jump the queue and use the fastest model
     
     Returns:
-        JSON with complaint data including transcription
+        202 with a job id to poll at /api/v1/voice/jobs/<id>, or 201 with the
+        complaint data when VOICE_JOBS_ASYNC is off; a re-upload of the same
+        recording returns the original job (200 with its result once done)
     """
     try:
-        global voice_service
-        
         # Check if audio file is present
         if 'audio' not in request.files:
             return jsonify({'status': 'error', 'message': 'No audio file provided'}), 400
@@ -1379,128 +1759,63 @@ def upload_voice_complaint():
         # Get form data
         citizen_id = request.form.get('citizen_id')
         language = request.form.get('language', None)
+        urgent = request.form.get('urgent', 'false').lower() == 'true'
         
         if not citizen_id:
             return jsonify({'status': 'error', 'message': 'citizen_id is required'}), 400
         
-        # Save uploaded file temporarily
-        filename = secure_filename(audio_file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{citizen_id}_{timestamp}_{filename}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        
-        # Save file
-        audio_file.save(file_path)
-        logger.info(f"Audio file saved: {file_path}")
-        
-        try:
-            # Initialize voice service if not already loaded
-            if voice_service is None:
-                logger.info("Loading voice service...")
-                voice_service = get_voice_service(model_size='base')
-            
-            # Process voice complaint
-            result = voice_service.process_voice_complaint(
-                file_path=file_path,
-                citizen_id=citizen_id,
-                language=language
-            )
-            
-            if not result['success']:
-                return jsonify({
-                    'status': 'error',
-                    'message': result.get('error', 'Voice processing failed')
-                }), 500
-            
-            # Get complaint text from transcription
-            complaint_text = result['text']
-            detected_language = result['language']
-            
-            # Classify complaint using multilingual classifier
-            if multilingual_classifier:
-                analysis = multilingual_classifier.analyze_complaint(
-                    complaint_text, 
-                    detected_language
-                )
-                category = analysis['category']
-                urgency = analysis['urgency']
-                keywords = analysis['keywords']
-            else:
-                # Fallback to default classifier
-                category = classify_complaint(complaint_text)
-                urgency = detect_urgency(complaint_text)
-                keywords = []
-            
-            # Validate complaint context
-            is_valid_context, validation_message = validate_complaint_context(complaint_text)
+        if VOICE_JOBS_ASYNC:
+            # Save uploaded file (the job owns it until it is processed)
+            audio_bytes = audio_file.read()
+            filename = secure_filename(audio_file.filename)
+            unique_filename = f"{citizen_id}_{uuid.uuid4().hex}_{filename}"
+            file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
+            with open(file_path, 'wb') as f:
+                f.write(audio_bytes)
+            logger.info(f"Audio file saved: {file_path}")
             
-            # Check for duplicates
-            is_duplicate, duplicate_id = detect_duplicates(complaint_text, citizen_id)
+            # App retries re-send the same bytes; they map to the original job
+            audio_hash = transcription_cache.hash_audio(audio_bytes)
+            job = voice_job_queue.enqueue(file_path, citizen_id, language, urgent, audio_hash)
+            if not job['success']:
+                os.remove(file_path)
+                return jsonify({'status': 'error', 'message': job['error']}), 500
             
-            # Generate blockchain hash
-            complaint_hash = generate_blockchain_hash(complaint_text, result['timestamp'])
+            if job.get('duplicate'):
+                os.remove(file_path)
+                existing = voice_job_queue.get(job['job_id'])
+                if existing and existing['status'] == 'done':
+                    return jsonify({
+                        'status': 'success',
+                        'data': existing['result'],
+                        'job_id': job['job_id'],
+                        'deduplicated': True
+                    }), 200
             
-            # Update CRS score
-            crs_score = update_citizen_crs(citizen_id, is_valid_context, is_duplicate)
-            
-            # Determine status
-            if not is_valid_context:
-                status = 'Invalid'
-            elif is_duplicate:
-                status = 'Duplicate'
-            else:
-                status = 'Pending'
-            
-            # Save complaint to database
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO complaints 
-                (text, category, urgency, citizen_id, crs_score, hash, timestamp, 
-                 status, is_duplicate, is_valid)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (complaint_text, category, urgency, citizen_id, crs_score, 
-                  complaint_hash, result['timestamp'], status, is_duplicate, is_valid_context))
-            
-            complaint_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
-            # Prepare response in requested format
-            response_data = {
-                'complaint_id': f"GSAI-{datetime.now().year}-{str(complaint_id).zfill(4)}",
-                'text': complaint_text,
-                'category': category,
-                'urgency': urgency,
-                'language': detected_language,
-                'timestamp': result['timestamp'],
-                'hash': complaint_hash,
-                'is_valid': is_valid_context,
-                'is_duplicate': is_duplicate,
-                'crs_score': crs_score,
-                'audio_duration': result.get('audio_duration', 0),
-                'keywords': keywords
-            }
-            
-            if is_duplicate and duplicate_id:
-                response_data['duplicate_of'] = duplicate_id
-            
-            logger.info(f"Voice complaint processed: {response_data['complaint_id']}")
-            
-            return jsonify({
-                'status': 'success',
-                'data': response_data
-            }), 201
-            
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.info(f"Cleaned up audio file: {file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to remove temp file: {e}")
+            poll_url = f"/api/{API_VERSION}/voice/jobs/{job['job_id']}"
+            response = jsonify({
+                'status': 'accepted',
+                'data': {
+                    'job_id': job['job_id'],
+                    'status': job.get('status', 'queued'),
+                    'poll_url': poll_url,
+                    'deduplicated': bool(job.get('duplicate'))
+                }
+            })
+            response.headers['Location'] = poll_url
+            return response, 202
+        
+        # Inline: decode straight from the request stream, nothing is written to disk
+        response_data = process_voice_job({
+            'audio': audio_file.stream,
+            'citizen_id': citizen_id,
+            'language': language,
+            'urgent': urgent
+        })
+        return jsonify({
+            'status': 'success',
+            'data': response_data
+        }), 201
         
     except Exception as e:
         logger.error(f"Voice complaint upload error: {str(e)}")
@@ -1509,6 +1824,163 @@ def upload_voice_complaint():
             'message': f'Internal server error: {str(e)}'
         }), 500
 
+@app.route(f'/api/{API_VERSION}/voice/jobs/<job_id>', methods=['GET'])
+def get_voice_job(job_id):
+    """
+    Poll a voice transcription job
+    
+    Returns:
+        JSON with the job status; the complaint data is under 'result' once
+        the status is 'done'
+    """
+    try:
+        job = voice_job_queue.get(job_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+        
+        return jsonify({'status': 'success', 'data': job}), 200
+        
+    except Exception as e:
+        logger.error(f"Voice job status error: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Internal server error: {str(e)}'
+        }), 500
+
+# Live IVR streams (rolling Whisper decode, early classification)
+streaming_manager = get_streaming_manager(
+    transcriber_loader=lambda: load_voice_service().transcribe_window,
+    classify_fn=analyze_voice_text
+)
+
+# Bytes handed to a stream per read of the request body
+STREAM_READ_SIZE = 8 * 1024
+
+@app.route(f'/api/{API_VERSION}/voice/streams', methods=['POST'])
+def create_voice_stream():
+    """
+    Open a streaming transcription session for an IVR call
+    
+    JSON body:
+        - citizen_id: Citizen ID
+        - language: (optional) Language code
+        - sample_rate: (optional) Sample rate of the frames, default 8000
+        - encoding: (optional) 'pcm_s16le' (default) or 'mulaw'
+    
+    Returns:
+        201 with the stream id and the URLs to send audio to and finish the call
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        citizen_id = data.get('citizen_id')
+        if not citizen_id:
+            return jsonify({'status': 'error', 'message': 'citizen_id is required'}), 400
+        
+        result = streaming_manager.create(
+            citizen_id,
+            language=data.get('language'),
+            sample_rate=int(data.get('sample_rate', 8000)),
+            encoding=data.get('encoding', 'pcm_s16le')
+        )
+        if not result['success']:
+            return jsonify({'status': 'error', 'message': result['error']}), 503 if result.get('busy') else 400
+        
+        base_url = f"/api/{API_VERSION}/voice/streams/{result['stream_id']}"
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'stream_id': result['stream_id'],
+                'audio_url': f"{base_url}/audio",
+                'finish_url': f"{base_url}/finish"
+            }
+        }), 201
+        
+    except Exception as e:
+        logger.error(f"Voice stream creation error: {str(e)}")
+        return jsonify({'status': 'error', 'message': f'Internal server error: {str(e)}'}), 500
+
+@app.route(f'/api/{API_VERSION}/voice/streams/<stream_id>/audio', methods=['POST'])
+def append_voice_stream(stream_id):
+    """
+    Append audio frames to a stream
+    
+    The raw body is read incrementally, so a client can either POST each
+    chunk separately or keep one chunked-transfer request open for the call.
+    
+    Returns:
+        JSON with the committed and partial transcript so far
+    """
+    try:
+        session = streaming_manager.get(stream_id)
+        if session is None:
+            return jsonify({'status': 'error', 'message': 'Stream not found'}), 404
+        
+        while True:
+            chunk = request.stream.read(STREAM_READ_SIZE)
+            if not chunk:
+                break
+            session.add_chunk(chunk)
+        
+        return jsonify({'status': 'success', 'data': session.snapshot()}), 200
+        
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Voice stream audio error: {str(e)}")
+        return jsonify({'status': 'error', 'message': f'Internal server error: {str(e)}'}), 500
+
+@app.route(f'/api/{API_VERSION}/voice/streams/<stream_id>', methods=['GET'])
+def get_voice_stream(stream_id):
+    """
+    Poll the partial transcript of a stream
+    """
+    session = streaming_manager.get(stream_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': 'Stream not found'}), 404
+    
+    return jsonify({'status': 'success', 'data': session.snapshot()}), 200
+
+@app.route(f'/api/{API_VERSION}/voice/streams/<stream_id>/finish', methods=['POST'])
+def finish_voice_stream(stream_id):
+    """
+    End the call: decode the remaining audio and register the complaint
+    
+    Returns:
+        201 with the complaint data (same shape as a voice upload)
+    """
+    try:
+        session = streaming_manager.get(stream_id)
+        if session is None:
+            return jsonify({'status': 'error', 'message': 'Stream not found'}), 404
+        
+        try:
+            transcription = session.finish()
+        finally:
+            streaming_manager.close(stream_id)
+        
+        if not transcription['text']:
+            return jsonify({'status': 'error', 'message': 'No speech detected in stream'}), 422
+        
+        # Usually classified while the caller was still talking; that analysis
+        # only saw the opening words, so a longer call is classified again
+        # (cheap through the classification cache)
+        analysis = session.wait_for_analysis()
+        if analysis is not None and transcription['text'] != session.analysis_text:
+            analysis = None
+        
+        result = {
+            'text': transcription['text'],
+            'language': transcription['language'],
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'audio_duration': transcription['duration']
+        }
+        response_data = register_voice_complaint(result, session.citizen_id, analysis)
+        return jsonify({'status': 'success', 'data': response_data}), 201
+        
+    except Exception as e:
+        logger.error(f"Voice stream finish error: {str(e)}")
+        return jsonify({'status': 'error', 'message': f'Internal server error: {str(e)}'}), 500
+
 @app.route(f'/api/{API_VERSION}/voice/languages', methods=['GET'])
 def get_supported_languages():
     """
@@ -1522,7 +1994,7 @@ def get_supported_languages():
         
         # Initialize voice service if needed
         if voice_service is None:
-            voice_service = get_voice_service(model_size='base')
+            voice_service = get_voice_service()
         
         languages = voice_service.get_supported_languages()
         
@@ -1566,6 +2038,7 @@ def test_voice_service():
             'data': {
                 'available': True,
                 'model_size': voice_service.model_size,
+                'model_tiers': voice_service.tiers,
                 'supported_formats': list(voice_service.SUPPORTED_FORMATS)
             }
         }), 200
@@ -1577,6 +2050,27 @@ def test_voice_service():
             'message': str(e)
         }), 500
 
+@app.route(f'/api/{API_VERSION}/voice/models', methods=['GET'])
+def get_voice_model_stats():
+    """
+    Whisper model pool: routing settings, loaded models and per-model latency histograms
+    
+    Latency is recorded by every process that transcribes (web and job
+    workers); loaded models are those of the answering process.
+    """
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': get_whisper_model_pool().get_stats()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Voice model stats error: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route(f'/api/{API_VERSION}/sms/complaint', methods=['POST'])
 def submit_sms_complaint():
     """
@@ -2097,17 +2591,22 @@ def verify_audit_trail():
     """
     Verify the integrity of the audit trail
     
+    Query Parameters:
+        full: Also re-verify every checkpointed block (default: false)
+    
     Returns:
         JSON with verification results
     """
     try:
         from services.audit_service import get_audit_service
         
+        full = request.args.get('full', 'false').lower() == 'true'
+        
         # Get audit service
         audit_service = get_audit_service()
         
-        # Verify audit trail
-        result = audit_service.verify_audit_trail()
+        # Verify audit trail (events after the last checkpoint unless full)
+        result = audit_service.verify_audit_trail(full=full)
         
         if result['success']:
             return jsonify({
@@ -2127,32 +2626,83 @@ def verify_audit_trail():
             'message': f'Internal server error: {str(e)}'
         }), 500
 
+@app.route(f'/api/{API_VERSION}/audit/proof/<int:event_id>', methods=['GET'])
+def get_audit_inclusion_proof(event_id):
+    """
+    Merkle inclusion proof for one audit event
+    
+    Returns:
+        JSON with the proof (event -> block root -> audit root)
+    """
+    try:
+        from services.audit_service import get_audit_service
+        
+        # Get audit service
+        audit_service = get_audit_service()
+        
+        result = audit_service.get_inclusion_proof(event_id)
+        
+        if result['success']:
+            return jsonify({
+                'status': 'success',
+                'data': result
+            }), 200
+        else:
+            return jsonify({
+                'status': 'error',
+                'message': result['error']
+            }), 404
+            
+    except Exception as e:
+        logger.error(f"Audit inclusion proof error: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Internal server error: {str(e)}'
+        }), 500
+
 @app.route(f'/api/{API_VERSION}/audit/trail', methods=['GET'])
 def get_audit_trail_events():
     """
-    Get audit trail
+    Get audit trail, newest first
     
     Query Parameters:
         entity_type: Type of entity (optional)
         entity_id: ID of entity (optional)
-        limit: Maximum number of events (default: 100)
+        actor_id: ID of the actor (optional)
+        event_type: Type of event (optional)
+        since, until: ISO timestamp range, until exclusive (optional)
+        limit: Maximum number of events (default: 100, at most AUDIT_MAX_PAGE_SIZE)
+        cursor: next_cursor of the previous page (optional)
     
     Returns:
-        JSON with audit trail
+        JSON with audit trail and next_cursor
     """
     try:
-        from services.audit_service import get_audit_service
+        from services.audit_service import get_audit_service, decode_audit_cursor
         
         # Get parameters
         entity_type = request.args.get('entity_type')
         entity_id = request.args.get('entity_id')
-        limit = int(request.args.get('limit', 100))
+        limit = min(max(int(request.args.get('limit', 100)), 1), AUDIT_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                decode_audit_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
         
         # Get audit service
         audit_service = get_audit_service()
         
         # Get audit trail
-        result = audit_service.get_audit_trail(entity_type, entity_id, limit)
+        result = audit_service.get_audit_trail(
+            entity_type, entity_id, limit,
+            actor_id=request.args.get('actor_id'),
+            event_type=request.args.get('event_type'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            cursor=cursor
+        )
         
         if result['success']:
             return jsonify({
@@ -2173,6 +2723,7 @@ def get_audit_trail_events():
         }), 500
 
 @app.route(f'/api/{API_VERSION}/analytics/trends', methods=['GET'])
+@cache_response(ttl=ANALYTICS_CACHE_TTL)
 def get_complaint_trends():
     """
     Get complaint trends over time
@@ -2214,6 +2765,7 @@ def get_complaint_trends():
         }), 500
 
 @app.route(f'/api/{API_VERSION}/analytics/categories', methods=['GET'])
+@cache_response(ttl=ANALYTICS_CACHE_TTL)
 def get_category_analysis():
     """
     Get detailed category analysis
@@ -2249,6 +2801,7 @@ def get_category_analysis():
         }), 500
 
 @app.route(f'/api/{API_VERSION}/analytics/heatmap', methods=['GET'])
+@cache_response(ttl=ANALYTICS_CACHE_TTL)
 def get_heatmap_data():
     """
     Get heatmap data for complaint hotspots
@@ -2285,6 +2838,7 @@ def get_heatmap_data():
         }), 500
 
 @app.route(f'/api/{API_VERSION}/analytics/sentiment', methods=['GET'])
+@cache_response(ttl=ANALYTICS_CACHE_TTL)
 def get_sentiment_analysis():
     """
     Get sentiment analysis of complaints
@@ -2320,6 +2874,7 @@ def get_sentiment_analysis():
         }), 500
 
 @app.route(f'/api/{API_VERSION}/analytics/resources', methods=['GET'])
+@cache_response(ttl=ANALYTICS_CACHE_TTL)
 def get_resource_allocation_insights():
     """
     Get insights for resource allocation
@@ -2355,6 +2910,7 @@ def get_resource_allocation_insights():
         }), 500
 
 @app.route(f'/api/{API_VERSION}/analytics/predict', methods=['GET'])
+@cache_response(ttl=ANALYTICS_CACHE_TTL)
 def predict_complaint_volume():
     """
     Predict complaint volume
@@ -2422,14 +2978,12 @@ def predict_complaint_volume():
 def get_citizen_info(citizen_id):
     """Get citizen information and CRS score"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         
         cursor.execute('SELECT * FROM citizens WHERE id = ?', (citizen_id,))
         citizen = cursor.fetchone()
         
         if not citizen:
-            conn.close()
             return jsonify({'error': 'Citizen not found'}), 404
         
         # Get complaint history
@@ -2442,7 +2996,6 @@ def get_citizen_info(citizen_id):
         ''', (citizen_id,))
         
         complaints = cursor.fetchall()
-        conn.close()
         
         return jsonify({
             'citizen_id': citizen[0],
@@ -2510,18 +3063,13 @@ def export_pdf():
         elements.append(Spacer(1, 0.3*inch))
         
         # Get dashboard data
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         
         # Summary statistics
-        cursor.execute("SELECT COUNT(*) FROM complaints")
-        total = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM complaints WHERE status = 'Resolved'")
-        resolved = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM complaints WHERE status = 'Pending'")
-        pending = cursor.fetchone()[0]
+        total = dashboard_rollups.get_total()
+        status_counts = dashboard_rollups.get_status_counts()
+        resolved = status_counts.get('Resolved', 0)
+        pending = status_counts.get('Pending', 0)
         
         # KPI Table
         kpi_data = [
@@ -2580,7 +3128,6 @@ def export_pdf():
         ]))
         
         elements.append(complaints_table)
-        conn.close()
         
         # Footer
         elements.append(Spacer(1, 1*inch))
@@ -2643,8 +3190,7 @@ def export_excel():
             cell.alignment = Alignment(horizontal='center')
         
         # Get data
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         
         cursor.execute("""
             SELECT id, category, status, urgency, timestamp, is_valid, is_duplicate 
@@ -2663,8 +3209,6 @@ def export_excel():
                 'Yes' if row[6] else 'No'
             ])
         
-        conn.close()
-        
         # Auto-adjust column widths
         for column in ws.columns:
             max_length = 0
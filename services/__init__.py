@@ -2,10 +2,70 @@
 GramSetu AI - Services Module
 """
 
-from .voice_complaint_service import VoiceComplaintService, get_voice_service
-from .multilingual_classifier import MultilingualComplaintClassifier, get_classifier
+from .complaint_ingestor import ComplaintIngestor, get_complaint_ingestor
+from .embedding_store import EmbeddingStore, get_embedding_store
+from .vector_index import VectorIndex, get_vector_index
+from .minhash_index import MinHashIndex, get_minhash_index
+from .inference_server import InferenceClient, get_inference_client
+from .classification_cache import ClassificationCache, get_classification_cache
+from .voice_job_queue import VoiceJobQueue, get_voice_job_queue
+from .streaming_transcription import StreamingTranscriptionManager, get_streaming_manager
+from .whisper_model_pool import WhisperModelPool, get_whisper_model_pool
+from .transcription_cache import TranscriptionCache, get_transcription_cache
+from .dashboard_rollups import DashboardRollups, get_dashboard_rollups
+from .response_cache import ResponseCache, get_response_cache
+from .escalation_index import EscalationIndex, get_escalation_index
+from .audit_verifier import AuditVerifier, get_audit_verifier
+from .blockchain_anchor import BlockchainAnchor, get_blockchain_anchor
+from .onnx_backend import OnnxSentenceEncoder, load_sentence_encoder, load_zero_shot_pipeline
+from .scheduler import Scheduler, build_scheduler
+
+# Voice/NLP services need the optional ML stack (whisper, transformers)
+try:
+    from .voice_complaint_service import VoiceComplaintService, get_voice_service
+    from .multilingual_classifier import MultilingualComplaintClassifier, get_classifier
+except ImportError:
+    VoiceComplaintService = None
+    get_voice_service = None
+    MultilingualComplaintClassifier = None
+    get_classifier = None
 
 __all__ = [
+    'ComplaintIngestor',
+    'get_complaint_ingestor',
+    'EmbeddingStore',
+    'get_embedding_store',
+    'VectorIndex',
+    'get_vector_index',
+    'MinHashIndex',
+    'get_minhash_index',
+    'InferenceClient',
+    'get_inference_client',
+    'ClassificationCache',
+    'get_classification_cache',
+    'VoiceJobQueue',
+    'get_voice_job_queue',
+    'StreamingTranscriptionManager',
+    'get_streaming_manager',
+    'WhisperModelPool',
+    'get_whisper_model_pool',
+    'TranscriptionCache',
+    'get_transcription_cache',
+    'DashboardRollups',
+    'get_dashboard_rollups',
+    'ResponseCache',
+    'get_response_cache',
+    'EscalationIndex',
+    'get_escalation_index',
+    'AuditVerifier',
+    'get_audit_verifier',
+    'BlockchainAnchor',
+    'get_blockchain_anchor',
+    'OnnxSentenceEncoder',
+    'load_sentence_encoder',
+    'load_zero_shot_pipeline',
+    'Scheduler',
+    'build_scheduler',
     'VoiceComplaintService',
     'get_voice_service',
     'MultilingualComplaintClassifier',
@@ -11,10 +11,10 @@ Features:
 """
 
 import logging
-import sqlite3
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from utils.db_pool import get_db_pool
 from collections import defaultdict
 import re
 
@@ -42,6 +42,7 @@ class AnalyticsService:
     def __init__(self):
         """Initialize the analytics service"""
         logger.info("Initializing AnalyticsService")
+        self.db_pool = get_db_pool(DB_PATH)
     
     def get_complaint_trends(self, days: int = 30) -> Dict:
         """
@@ -54,7 +55,7 @@ class AnalyticsService:
             Dictionary with trend data
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             # Calculate date range
@@ -85,8 +86,6 @@ class AnalyticsService:
                     'in_progress': row[4]
                 })
             
-            conn.close()
-            
             return {
                 'success': True,
                 'data': daily_data,
@@ -108,7 +107,7 @@ class AnalyticsService:
             Dictionary with category analysis
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             # Get category distribution with additional metrics
@@ -136,8 +135,6 @@ class AnalyticsService:
                     'last_complaint': row[5]
                 })
             
-            conn.close()
-            
             return {
                 'success': True,
                 'data': categories
@@ -160,7 +157,7 @@ class AnalyticsService:
             Dictionary with heatmap data
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             # For demo purposes, we'll create mock heatmap data
@@ -192,8 +189,6 @@ class AnalyticsService:
                         'category': category
                     })
             
-            conn.close()
-            
             return {
                 'success': True,
                 'data': heatmap_points,
@@ -215,7 +210,7 @@ class AnalyticsService:
             Dictionary with sentiment analysis
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             # Get recent complaints for sentiment analysis
@@ -228,7 +223,6 @@ class AnalyticsService:
             ''')
             
             complaints = cursor.fetchall()
-            conn.close()
             
             # Perform sentiment analysis
             sentiment_data = defaultdict(lambda: {'positive': 0, 'negative': 0, 'neutral': 0})
@@ -284,7 +278,7 @@ class AnalyticsService:
             Dictionary with resource allocation insights
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             # Get field worker performance and workload
@@ -343,8 +337,6 @@ class AnalyticsService:
                     'avg_resolution_hours': round(row[2], 2) if row[2] else None
                 })
             
-            conn.close()
-            
             return {
                 'success': True,
                 'data': {
@@ -5,17 +5,30 @@ Tamper-proof logging and audit trail management
 Features:
 - Immutable audit trail using append-only logging
 - Cryptographic hashing for integrity verification
-- Merkle tree implementation for efficient verification
+- Merkle checkpoints over fixed-size blocks of events: verification only
+  re-hashes events after the last checkpoint
+- O(log n) inclusion proofs (event -> block root -> root over all checkpoints)
+- Single writer thread with group commit: concurrent events are chained
+  serially and batched into one transaction every few milliseconds
+- Keyset-paginated trail queries (entity, actor, event type, time range)
+  over composite (filter, timestamp, id) indexes
 - Digital signatures for officer actions
 - Time-stamping for chronological integrity
 """
 
+import atexit
+import base64
 import logging
-import sqlite3
 import hashlib
 import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from utils.db_pool import get_db_pool
 import hmac
 
 logger = logging.getLogger(__name__)
@@ -23,6 +36,230 @@ logger = logging.getLogger(__name__)
 # Database path (should match app.py)
 DB_PATH = 'gramsetu_ai.db'
 
+# Audit settings (overridable through the environment)
+AUDIT_CHECKPOINT_BLOCK_SIZE = int(os.environ.get('AUDIT_CHECKPOINT_BLOCK_SIZE', 1024))  # events per Merkle checkpoint
+AUDIT_GROUP_COMMIT = os.environ.get('AUDIT_GROUP_COMMIT', 'true').lower() == 'true'
+AUDIT_GROUP_COMMIT_MS = float(os.environ.get('AUDIT_GROUP_COMMIT_MS', 5))  # batching window
+AUDIT_GROUP_COMMIT_MAX_BATCH = int(os.environ.get('AUDIT_GROUP_COMMIT_MAX_BATCH', 500))
+AUDIT_WRITE_TIMEOUT_SECONDS = float(os.environ.get('AUDIT_WRITE_TIMEOUT_SECONDS', 10))
+
+# Columns needed to recompute an event hash
+EVENT_HASH_COLUMNS = '''id, event_type, entity_type, entity_id, action, actor_id,
+                        actor_role, timestamp, data, hash, previous_hash'''
+
+
+def hash_event(event_data: Dict) -> str:
+    """SHA256 of an event's canonical JSON (sorted keys, no whitespace)"""
+    event_json = json.dumps(event_data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(event_json.encode()).hexdigest()
+
+
+def event_hash_from_row(event) -> str:
+    """
+    Recompute the hash of a stored event
+    
+    Args:
+        event: Row (or dict) with the EVENT_HASH_COLUMNS
+    
+    Returns:
+        SHA256 hash the event should have
+    """
+    return hash_event({
+        'event_type': event['event_type'],
+        'entity_type': event['entity_type'],
+        'entity_id': event['entity_id'],
+        'action': event['action'],
+        'actor_id': event['actor_id'],
+        'actor_role': event['actor_role'],
+        'timestamp': event['timestamp'],
+        'data': json.loads(event['data']) if event['data'] else {},
+        'previous_hash': event['previous_hash']
+    })
+
+
+def encode_audit_cursor(timestamp: str, event_id: int) -> str:
+    """Opaque cursor for the position after (timestamp, id)"""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, event_id]).encode()).decode().rstrip('=')
+
+
+def decode_audit_cursor(token: str) -> Tuple[str, int]:
+    """
+    Parse a cursor produced by encode_audit_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, event_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return str(timestamp), int(event_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _leaf_hash(event_hash: str) -> bytes:
+    """Merkle leaf for an event hash (0x00 prefix, RFC 6962 style)"""
+    return hashlib.sha256(b'\x00' + bytes.fromhex(event_hash)).digest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    """Merkle interior node (0x01 prefix, so leaves cannot pose as nodes)"""
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+def merkle_root(leaves: List[bytes]) -> bytes:
+    """
+    Root of a Merkle tree; an unpaired last node is promoted unchanged
+
+    Args:
+        leaves: Leaf hashes
+
+    Returns:
+        Root hash (SHA256 of nothing for an empty tree)
+    """
+    if not leaves:
+        return hashlib.sha256(b'').digest()
+    level = list(leaves)
+    while len(level) > 1:
+        level = [_node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+    return level[0]
+
+
+def merkle_path(leaves: List[bytes], index: int) -> List[Dict]:
+    """
+    Audit path from a leaf to the root
+
+    Args:
+        leaves: Leaf hashes
+        index: Position of the leaf
+
+    Returns:
+        Sibling hashes bottom-up, each with its side ('left' or 'right')
+    """
+    path = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append({'position': 'left' if sibling < index else 'right', 'hash': level[sibling].hex()})
+        level = [_node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        index //= 2
+    return path
+
+
+def apply_merkle_path(leaf: bytes, path: List[Dict]) -> bytes:
+    """Fold an audit path onto a leaf, giving the root it proves membership in"""
+    node = leaf
+    for step in path:
+        sibling = bytes.fromhex(step['hash'])
+        node = _node_hash(sibling, node) if step['position'] == 'left' else _node_hash(node, sibling)
+    return node
+
+
+class _PendingEvent:
+    """One event waiting for the writer thread"""
+    
+    def __init__(self, event_data: Dict):
+        for field in ('event_type', 'entity_type', 'entity_id', 'action', 'actor_id'):
+            if field not in event_data:
+                raise KeyError(field)
+        self.event_data = event_data
+        # Serialize in the caller, so a bad payload fails only its own event
+        self.data_json = json.dumps(event_data.get('data', {}))
+        self.future: Future = Future()
+
+
+class AuditAppender:
+    """
+    Single writer for the audit trail
+    
+    The writer thread takes the first queued event, keeps collecting events
+    until the batch is full or the latency window has passed, then chains and
+    inserts the whole batch in one transaction. Callers get their result
+    through a Future.
+    """
+    
+    def __init__(self, service: 'AuditService', max_batch_size: int = AUDIT_GROUP_COMMIT_MAX_BATCH,
+                 max_latency_ms: float = AUDIT_GROUP_COMMIT_MS):
+        """
+        Initialize the appender and start its thread
+        
+        Args:
+            service: AuditService whose table is appended to
+            max_batch_size: Maximum events per transaction
+            max_latency_ms: Maximum time the first event waits for company
+        """
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self._queue: 'queue.Queue[Optional[_PendingEvent]]' = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {'events': 0, 'batches': 0}
+        self._thread = threading.Thread(target=self._run, name='audit-appender', daemon=True)
+        self._thread.start()
+        # Flush queued events on interpreter exit
+        atexit.register(self.close)
+    
+    def submit(self, event: _PendingEvent):
+        """Queue an event for the next batch"""
+        self._queue.put(event)
+    
+    def close(self, timeout: float = AUDIT_WRITE_TIMEOUT_SECONDS):
+        """Write everything queued so far and stop the thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+    
+    def _run(self):
+        """Writer loop"""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_latency
+            
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+            
+            try:
+                self.service._append_batch(batch)
+            except Exception as e:
+                # Checkpointing failed after the commit; the events are written
+                logger.error(f"Audit appender error: {str(e)}")
+            finally:
+                for event in batch:
+                    if not event.future.done():
+                        event.future.set_result({'success': False, 'error': 'Audit append failed'})
+            
+            with self._stats_lock:
+                self.stats['events'] += len(batch)
+                self.stats['batches'] += 1
+        
+        self.service.db_pool.release()
+    
+    def get_stats(self) -> Dict:
+        """Group commit counters, including the average batch size"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['enabled'] = True
+        stats['avg_batch_size'] = stats['events'] / stats['batches'] if stats['batches'] else 0.0
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+
 class AuditService:
     """
     Service class for audit trail management
@@ -31,41 +268,62 @@ class AuditService:
     def __init__(self):
         """Initialize the audit service"""
         logger.info("Initializing AuditService")
+        self.db_pool = get_db_pool(DB_PATH)
+        self._appender = None
+        self._appender_lock = threading.Lock()
         self._ensure_audit_tables_exist()
     
     def _ensure_audit_tables_exist(self):
         """Ensure required audit database tables exist"""
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            # Create audit trail table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS audit_trail (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_type TEXT NOT NULL,
-                    entity_type TEXT NOT NULL,
-                    entity_id TEXT NOT NULL,
-                    action TEXT NOT NULL,
-                    actor_id TEXT NOT NULL,
-                    actor_role TEXT,
-                    timestamp TEXT NOT NULL,
-                    data TEXT,  -- JSON data about the event
-                    hash TEXT UNIQUE NOT NULL,  -- SHA256 hash of the event
-                    previous_hash TEXT,  -- Hash of previous event (blockchain-like)
-                    signature TEXT,  -- Digital signature for officer actions
-                    signature_algorithm TEXT,
-                    is_verified BOOLEAN DEFAULT FALSE
-                )
-            ''')
-            
-            # Create index for faster queries
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_entity ON audit_trail(entity_type, entity_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_actor ON audit_trail(actor_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_trail(timestamp)')
-            
-            conn.commit()
-            conn.close()
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Create audit trail table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS audit_trail (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        event_type TEXT NOT NULL,
+                        entity_type TEXT NOT NULL,
+                        entity_id TEXT NOT NULL,
+                        action TEXT NOT NULL,
+                        actor_id TEXT NOT NULL,
+                        actor_role TEXT,
+                        timestamp TEXT NOT NULL,
+                        data TEXT,  -- JSON data about the event
+                        hash TEXT UNIQUE NOT NULL,  -- SHA256 hash of the event
+                        previous_hash TEXT,  -- Hash of previous event (blockchain-like)
+                        signature TEXT,  -- Digital signature for officer actions
+                        signature_algorithm TEXT,
+                        is_verified BOOLEAN DEFAULT FALSE
+                    )
+                ''')
+                
+                # Create index for faster queries: each filter of get_audit_trail
+                # is followed by its (timestamp, id) sort key
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_entity_timestamp ON audit_trail(entity_type, entity_id, timestamp, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_actor_timestamp ON audit_trail(actor_id, timestamp, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_event_type_timestamp ON audit_trail(event_type, timestamp, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_trail(timestamp)')
+                # Superseded by the composite indexes above (prefixes of them)
+                cursor.execute('DROP INDEX IF EXISTS idx_audit_entity')
+                cursor.execute('DROP INDEX IF EXISTS idx_audit_actor')
+                
+                # Merkle checkpoints: one row per verified block of events
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS audit_checkpoints (
+                        block_index INTEGER PRIMARY KEY,
+                        first_id INTEGER NOT NULL,
+                        last_id INTEGER NOT NULL,
+                        event_count INTEGER NOT NULL,
+                        total_events INTEGER NOT NULL,  -- events up to and including this block
+                        merkle_root TEXT NOT NULL,
+                        last_hash TEXT NOT NULL,  -- chain head at the end of the block
+                        created_at TEXT NOT NULL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_checkpoints_last_id ON audit_checkpoints(last_id)')
+                
             logger.info("Audit tables ensured")
             
         except Exception as e:
@@ -76,6 +334,9 @@ class AuditService:
         """
         Log an audit event
         
+        The event is appended by the single writer thread (see AuditAppender),
+        batched with other concurrent events into one transaction.
+        
         Args:
             event_data: Dictionary with event information
                 - event_type: Type of event (complaint, assignment, resolution, etc.)
@@ -90,64 +351,12 @@ class AuditService:
             Dictionary with log result
         """
         try:
-            # Get previous hash for blockchain-like linking
-            previous_hash = self._get_latest_hash()
-            
-            # Generate timestamp
-            timestamp = datetime.utcnow().isoformat() + 'Z'
-            
-            # Create event data for hashing
-            event_for_hash = {
-                'event_type': event_data['event_type'],
-                'entity_type': event_data['entity_type'],
-                'entity_id': event_data['entity_id'],
-                'action': event_data['action'],
-                'actor_id': event_data['actor_id'],
-                'actor_role': event_data.get('actor_role'),
-                'timestamp': timestamp,
-                'data': event_data.get('data', {}),
-                'previous_hash': previous_hash
-            }
+            future = self.log_event_async(event_data)
+            result = future.result(timeout=AUDIT_WRITE_TIMEOUT_SECONDS)
             
-            # Generate hash
-            event_hash = self._generate_event_hash(event_for_hash)
-            
-            # Insert into database
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO audit_trail 
-                (event_type, entity_type, entity_id, action, actor_id, actor_role, 
-                 timestamp, data, hash, previous_hash, signature, signature_algorithm)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                event_data['event_type'],
-                event_data['entity_type'],
-                event_data['entity_id'],
-                event_data['action'],
-                event_data['actor_id'],
-                event_data.get('actor_role'),
-                timestamp,
-                json.dumps(event_data.get('data', {})),
-                event_hash,
-                previous_hash,
-                event_data.get('signature'),
-                event_data.get('signature_algorithm')
-            ))
-            
-            audit_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"Audit event logged: {event_data['event_type']} - {event_data['action']}")
-            
-            return {
-                'success': True,
-                'audit_id': audit_id,
-                'hash': event_hash,
-                'timestamp': timestamp
-            }
+            if result['success']:
+                logger.info(f"Audit event logged: {event_data['event_type']} - {event_data['action']}")
+            return result
             
         except Exception as e:
             logger.error(f"Audit event logging error: {str(e)}")
@@ -156,76 +365,196 @@ class AuditService:
                 'error': str(e)
             }
     
-    def verify_audit_trail(self) -> Dict:
+    def log_event_async(self, event_data: Dict) -> Future:
         """
-        Verify the integrity of the audit trail
+        Queue an audit event without waiting for its commit
+        
+        Args:
+            event_data: Event information (see log_event)
         
         Returns:
-            Dictionary with verification results
+            Future resolving to the log_event result dictionary
+        
+        Raises:
+            KeyError: If a required field is missing
+            TypeError: If data is not JSON serializable
+        """
+        event = _PendingEvent(event_data)
+        if not AUDIT_GROUP_COMMIT:
+            self._append_batch([event])
+            return event.future
+        
+        with self._appender_lock:
+            if self._appender is None:
+                self._appender = AuditAppender(self)
+        self._appender.submit(event)
+        return event.future
+    
+    def _append_batch(self, events: List['_PendingEvent']):
+        """
+        Chain and insert events in one transaction, resolving their futures
+        
+        Falls back to one transaction per event if the batch fails, so one bad
+        event cannot fail the others.
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            results = self._insert_chained(events)
+        except Exception as e:
+            if len(events) == 1:
+                logger.error(f"Audit append error: {str(e)}")
+                events[0].future.set_result({'success': False, 'error': str(e)})
+                return
+            logger.warning(f"Audit batch append failed, retrying events one by one: {str(e)}")
+            for event in events:
+                self._append_batch([event])
+            return
+        
+        for event, result in zip(events, results):
+            event.future.set_result(result)
+        
+        # Seal the next block once enough events have accumulated
+        if results[-1]['audit_id'] >= self._next_checkpoint_id():
+            self.create_checkpoints()
+    
+    def _insert_chained(self, events: List['_PendingEvent']) -> List[Dict]:
+        """Assign previous_hash serially and insert the events (one transaction)"""
+        results = []
+        with self.db_pool.transaction() as conn:
             cursor = conn.cursor()
             
-            # Get all events ordered by ID
+            # Read the chain head under the write lock, so other processes
+            # cannot link to the same previous event
+            previous_hash = self._get_latest_hash()
+            
+            for event in events:
+                event_data = event.event_data
+                timestamp = datetime.utcnow().isoformat() + 'Z'
+                
+                # Create event data for hashing
+                event_for_hash = {
+                    'event_type': event_data['event_type'],
+                    'entity_type': event_data['entity_type'],
+                    'entity_id': event_data['entity_id'],
+                    'action': event_data['action'],
+                    'actor_id': event_data['actor_id'],
+                    'actor_role': event_data.get('actor_role'),
+                    'timestamp': timestamp,
+                    # Hash what will be read back, so verification matches
+                    'data': json.loads(event.data_json),
+                    'previous_hash': previous_hash
+                }
+                
+                # Generate hash
+                event_hash = self._generate_event_hash(event_for_hash)
+                
+                cursor.execute('''
+                    INSERT INTO audit_trail 
+                    (event_type, entity_type, entity_id, action, actor_id, actor_role, 
+                     timestamp, data, hash, previous_hash, signature, signature_algorithm)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    event_data['event_type'],
+                    event_data['entity_type'],
+                    event_data['entity_id'],
+                    event_data['action'],
+                    event_data['actor_id'],
+                    event_data.get('actor_role'),
+                    timestamp,
+                    event.data_json,
+                    event_hash,
+                    previous_hash,
+                    event_data.get('signature'),
+                    event_data.get('signature_algorithm')
+                ))
+                
+                results.append({
+                    'success': True,
+                    'audit_id': cursor.lastrowid,
+                    'hash': event_hash,
+                    'timestamp': timestamp
+                })
+                previous_hash = event_hash
+        
+        return results
+    
+    def get_appender_stats(self) -> Dict:
+        """
+        Group commit counters
+        
+        Returns:
+            Dictionary with events, batches, average batch size and queue depth
+        """
+        if self._appender is None:
+            return {'enabled': AUDIT_GROUP_COMMIT, 'events': 0, 'batches': 0}
+        return self._appender.get_stats()
+    
+    def verify_audit_trail(self, full: bool = False) -> Dict:
+        """
+        Verify the integrity of the audit trail
+        
+        Events covered by a checkpoint were verified when it was sealed; only
+        the events after the last checkpoint are re-hashed (and complete
+        blocks among them are sealed). Both event hashes and previous_hash
+        links are checked.
+        
+        Args:
+            full: Also re-verify every checkpointed block against its stored root
+        
+        Returns:
+            Dictionary with verification results
+        """
+        try:
+            cursor = self.db_pool.connection().cursor()
             cursor.execute('''
-                SELECT id, event_type, entity_type, entity_id, action, actor_id, 
-                       actor_role, timestamp, data, hash, previous_hash
-                FROM audit_trail 
-                ORDER BY id ASC
+                SELECT block_index, first_id, last_id, total_events, merkle_root, last_hash
+                FROM audit_checkpoints ORDER BY block_index
             ''')
+            checkpoints = cursor.fetchall()
             
-            events = cursor.fetchall()
-            conn.close()
-            
-            if not events:
+            tampered_events = []
+            broken_links = []
+            tampered_checkpoints = []
+            
+            if full:
+                previous_hash = None
+                for checkpoint in checkpoints:
+                    events = self._read_events(checkpoint['first_id'], checkpoint['last_id'])
+                    result = self._verify_events(events, previous_hash)
+                    tampered_events.extend(result['tampered'])
+                    broken_links.extend(result['broken_links'])
+                    root = merkle_root([_leaf_hash(event['hash']) for event in events]).hex()
+                    if root != checkpoint['merkle_root'] or result['last_hash'] != checkpoint['last_hash']:
+                        tampered_checkpoints.append(checkpoint['block_index'])
+                    previous_hash = checkpoint['last_hash']
+            
+            tail = self._verify_tail(seal=not (tampered_events or broken_links or tampered_checkpoints))
+            tampered_events.extend(tail['tampered'])
+            broken_links.extend(tail['broken_links'])
+            
+            checkpointed = checkpoints[-1]['total_events'] if checkpoints else 0
+            total_events = checkpointed + tail['events']
+            if total_events == 0:
                 return {
                     'success': True,
                     'verified': True,
                     'message': 'No audit events to verify'
                 }
             
-            # Verify each event
-            verified_count = 0
-            tampered_events = []
-            
-            for i, event in enumerate(events):
-                # Create event data for hashing
-                event_for_hash = {
-                    'event_type': event[1],
-                    'entity_type': event[2],
-                    'entity_id': event[3],
-                    'action': event[4],
-                    'actor_id': event[5],
-                    'actor_role': event[6],
-                    'timestamp': event[7],
-                    'data': json.loads(event[8]) if event[8] else {},
-                    'previous_hash': event[10]
-                }
-                
-                # Generate hash
-                calculated_hash = self._generate_event_hash(event_for_hash)
-                
-                # Compare with stored hash
-                if calculated_hash == event[9]:
-                    verified_count += 1
-                else:
-                    tampered_events.append({
-                        'id': event[0],
-                        'event_type': event[1],
-                        'timestamp': event[7]
-                    })
-            
-            is_verified = len(tampered_events) == 0
-            verification_rate = verified_count / len(events) if events else 1.0
+            verified_count = total_events - len(tampered_events)
+            is_verified = not (tampered_events or broken_links or tampered_checkpoints)
             
             return {
                 'success': True,
                 'verified': is_verified,
-                'verification_rate': verification_rate,
-                'total_events': len(events),
+                'verification_rate': verified_count / total_events,
+                'total_events': total_events,
                 'verified_events': verified_count,
+                'rehashed_events': tail['events'] + (checkpointed if full else 0),
+                'verified_from_id': checkpoints[-1]['last_id'] + 1 if checkpoints and not full else 1,
                 'tampered_events': tampered_events,
+                'broken_links': broken_links,
+                'tampered_checkpoints': tampered_checkpoints,
+                'checkpoints': len(checkpoints) + tail['sealed'],
                 'timestamp': datetime.utcnow().isoformat() + 'Z'
             }
             
@@ -236,53 +565,249 @@ class AuditService:
                 'error': str(e)
             }
     
+    def create_checkpoints(self) -> Dict:
+        """
+        Verify the events after the last checkpoint and seal every complete block
+        
+        Returns:
+            Dictionary with the number of checkpoints created
+        """
+        try:
+            tail = self._verify_tail(seal=True)
+            return {
+                'success': True,
+                'created': tail['sealed'],
+                'verified': not (tail['tampered'] or tail['broken_links'])
+            }
+        
+        except Exception as e:
+            logger.error(f"Audit checkpoint error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def get_inclusion_proof(self, event_id: int) -> Dict:
+        """
+        Merkle inclusion proof for one checkpointed event
+        
+        The proof has two O(log n) paths: event leaf -> block root, and
+        block root -> root over all checkpoint roots (audit_root).
+        
+        Args:
+            event_id: Audit event ID
+        
+        Returns:
+            Dictionary with the proof (see verify_inclusion_proof)
+        """
+        try:
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute(f'SELECT {EVENT_HASH_COLUMNS} FROM audit_trail WHERE id = ?', (event_id,))
+            event = cursor.fetchone()
+            if event is None:
+                return {'success': False, 'error': 'Audit event not found'}
+            
+            cursor.execute('''
+                SELECT block_index, first_id, last_id, merkle_root FROM audit_checkpoints
+                WHERE last_id >= ? ORDER BY last_id LIMIT 1
+            ''', (event_id,))
+            checkpoint = cursor.fetchone()
+            if checkpoint is None or checkpoint['first_id'] > event_id:
+                return {'success': False, 'error': 'Audit event is not checkpointed yet'}
+            
+            cursor.execute('''
+                SELECT id, hash FROM audit_trail WHERE id BETWEEN ? AND ? ORDER BY id
+            ''', (checkpoint['first_id'], checkpoint['last_id']))
+            block = cursor.fetchall()
+            leaves = [_leaf_hash(row['hash']) for row in block]
+            index = next(i for i, row in enumerate(block) if row['id'] == event_id)
+            if merkle_root(leaves).hex() != checkpoint['merkle_root']:
+                return {'success': False, 'error': 'Block has been altered since its checkpoint'}
+            
+            cursor.execute('SELECT merkle_root FROM audit_checkpoints ORDER BY block_index')
+            block_roots = [_leaf_hash(row[0]) for row in cursor.fetchall()]
+            
+            return {
+                'success': True,
+                'event_id': event_id,
+                'event_hash': event['hash'],
+                # The stored hash must also match the event's content
+                'event_hash_valid': self._event_hash_from_row(event) == event['hash'],
+                'block_index': checkpoint['block_index'],
+                'leaf_index': index,
+                'block_path': merkle_path(leaves, index),
+                'block_root': checkpoint['merkle_root'],
+                'checkpoint_path': merkle_path(block_roots, checkpoint['block_index']),
+                'audit_root': merkle_root(block_roots).hex(),
+                'checkpoint_count': len(block_roots)
+            }
+        
+        except Exception as e:
+            logger.error(f"Audit inclusion proof error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def verify_inclusion_proof(proof: Dict) -> bool:
+        """
+        Check a proof from get_inclusion_proof (needs no database access)
+        
+        Args:
+            proof: Inclusion proof
+        
+        Returns:
+            True if the event hash is in the block and the block in the audit root
+        """
+        block_root = apply_merkle_path(_leaf_hash(proof['event_hash']), proof['block_path'])
+        if block_root.hex() != proof['block_root']:
+            return False
+        audit_root = apply_merkle_path(_leaf_hash(proof['block_root']), proof['checkpoint_path'])
+        return audit_root.hex() == proof['audit_root']
+    
+    def _read_events(self, first_id: int, last_id: Optional[int] = None, limit: int = -1) -> List:
+        """Events with first_id <= id (<= last_id), in id order"""
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute(f'''
+            SELECT {EVENT_HASH_COLUMNS} FROM audit_trail
+            WHERE id >= ? AND id <= ?
+            ORDER BY id
+            LIMIT ?
+        ''', (first_id, last_id if last_id is not None else 2 ** 63 - 1, limit))
+        return cursor.fetchall()
+    
+    def _verify_events(self, events: List, previous_hash: Optional[str]) -> Dict:
+        """Re-hash events and check each links to the one before it"""
+        tampered = []
+        broken_links = []
+        for event in events:
+            if self._event_hash_from_row(event) != event['hash']:
+                tampered.append({'id': event['id'], 'event_type': event['event_type'], 'timestamp': event['timestamp']})
+            if event['previous_hash'] != previous_hash:
+                broken_links.append({'id': event['id'], 'expected_previous_hash': previous_hash,
+                                     'previous_hash': event['previous_hash']})
+            previous_hash = event['hash']
+        return {'tampered': tampered, 'broken_links': broken_links, 'last_hash': previous_hash}
+    
+    def _verify_tail(self, seal: bool) -> Dict:
+        """Verify events after the last checkpoint block by block, sealing complete clean blocks"""
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT block_index, last_id, total_events, last_hash FROM audit_checkpoints
+            ORDER BY block_index DESC LIMIT 1
+        ''')
+        last = cursor.fetchone()
+        block_index = last['block_index'] + 1 if last else 0
+        next_id = last['last_id'] + 1 if last else 1
+        total = last['total_events'] if last else 0
+        previous_hash = last['last_hash'] if last else None
+        
+        tail = {'tampered': [], 'broken_links': [], 'events': 0, 'sealed': 0}
+        while True:
+            events = self._read_events(next_id, limit=AUDIT_CHECKPOINT_BLOCK_SIZE)
+            if not events:
+                break
+            result = self._verify_events(events, previous_hash)
+            tail['tampered'].extend(result['tampered'])
+            tail['broken_links'].extend(result['broken_links'])
+            tail['events'] += len(events)
+            
+            clean = not (tail['tampered'] or tail['broken_links'])
+            if seal and clean and len(events) == AUDIT_CHECKPOINT_BLOCK_SIZE:
+                total += len(events)
+                with self.db_pool.transaction() as conn:
+                    # Another process may have sealed the same block already
+                    conn.execute('''
+                        INSERT OR IGNORE INTO audit_checkpoints
+                        (block_index, first_id, last_id, event_count, total_events, merkle_root, last_hash, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (block_index, events[0]['id'], events[-1]['id'], len(events), total,
+                          merkle_root([_leaf_hash(event['hash']) for event in events]).hex(),
+                          result['last_hash'], datetime.utcnow().isoformat() + 'Z'))
+                block_index += 1
+                tail['events'] -= len(events)
+                tail['sealed'] += 1
+                logger.info(f"Audit checkpoint sealed: block {block_index - 1} (events {events[0]['id']}-{events[-1]['id']})")
+            
+            previous_hash = result['last_hash']
+            next_id = events[-1]['id'] + 1
+        
+        self._checkpoint_due_id = next_id + AUDIT_CHECKPOINT_BLOCK_SIZE - 1 if tail['events'] == 0 else None
+        return tail
+    
+    def _next_checkpoint_id(self) -> int:
+        """Event ID at which the next block is probably complete"""
+        if getattr(self, '_checkpoint_due_id', None) is None:
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute('SELECT MAX(last_id) FROM audit_checkpoints')
+            last_id = cursor.fetchone()[0] or 0
+            self._checkpoint_due_id = last_id + AUDIT_CHECKPOINT_BLOCK_SIZE
+        return self._checkpoint_due_id
+    
+    def _event_hash_from_row(self, event) -> str:
+        """Recompute the hash of a stored event"""
+        return event_hash_from_row(event)
+    
     def get_audit_trail(self, entity_type: Optional[str] = None, entity_id: Optional[str] = None, 
-                       limit: int = 100) -> Dict:
+                       limit: int = 100, actor_id: Optional[str] = None, event_type: Optional[str] = None,
+                       since: Optional[str] = None, until: Optional[str] = None,
+                       cursor: Optional[str] = None) -> Dict:
         """
-        Get audit trail for a specific entity or all events
+        Get audit trail for a specific entity or all events, newest first
+        
+        Pages are keyset-paginated on (timestamp, id): each filter has a
+        composite index ending in (timestamp, id), so a page costs O(limit)
+        however long the history is.
         
         Args:
             entity_type: Type of entity (optional)
             entity_id: ID of entity (optional)
             limit: Maximum number of events to return
+            actor_id: Only events by this actor (optional)
+            event_type: Only events of this type (optional)
+            since: Only events at or after this ISO timestamp (optional)
+            until: Only events before this ISO timestamp (optional)
+            cursor: next_cursor of the previous page (optional)
             
         Returns:
-            Dictionary with audit trail
+            Dictionary with audit trail and the cursor of the next page
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
+            conn = self.db_pool.connection()
+            db_cursor = conn.cursor()
             
             # Build query based on parameters
-            if entity_type and entity_id:
-                cursor.execute('''
-                    SELECT id, event_type, entity_type, entity_id, action, actor_id, 
-                           actor_role, timestamp, data, hash, previous_hash, signature
-                    FROM audit_trail 
-                    WHERE entity_type = ? AND entity_id = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (entity_type, entity_id, limit))
-            elif entity_type:
-                cursor.execute('''
-                    SELECT id, event_type, entity_type, entity_id, action, actor_id, 
-                           actor_role, timestamp, data, hash, previous_hash, signature
-                    FROM audit_trail 
-                    WHERE entity_type = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (entity_type, limit))
-            else:
-                cursor.execute('''
-                    SELECT id, event_type, entity_type, entity_id, action, actor_id, 
-                           actor_role, timestamp, data, hash, previous_hash, signature
-                    FROM audit_trail 
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (limit,))
+            clauses, params = [], []
+            for column, value in (('entity_type', entity_type), ('entity_id', entity_id),
+                                  ('actor_id', actor_id), ('event_type', event_type)):
+                if value:
+                    clauses.append(f'{column} = ?')
+                    params.append(value)
+            if since:
+                clauses.append('timestamp >= ?')
+                params.append(since)
+            if until:
+                clauses.append('timestamp < ?')
+                params.append(until)
+            if cursor:
+                # Rows strictly after the cursor in (timestamp DESC, id DESC) order
+                clauses.append('(timestamp, id) < (?, ?)')
+                params.extend(decode_audit_cursor(cursor))
+            
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+            db_cursor.execute(f'''
+                SELECT id, event_type, entity_type, entity_id, action, actor_id, 
+                       actor_role, timestamp, data, hash, previous_hash, signature
+                FROM audit_trail 
+                {where}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            ''', params + [limit + 1])
             
-            events = cursor.fetchall()
-            conn.close()
+            events = db_cursor.fetchall()
+            has_more = len(events) > limit
+            events = events[:limit]
             
             # Format events
             formatted_events = []
@@ -305,7 +830,9 @@ class AuditService:
             return {
                 'success': True,
                 'events': formatted_events,
-                'count': len(formatted_events)
+                'count': len(formatted_events),
+                'has_more': has_more,
+                'next_cursor': encode_audit_cursor(events[-1][7], events[-1][0]) if has_more else None
             }
             
         except Exception as e:
@@ -351,7 +878,7 @@ class AuditService:
     def _get_latest_hash(self) -> Optional[str]:
         """Get the hash of the latest audit event"""
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -361,7 +888,6 @@ class AuditService:
             ''')
             
             result = cursor.fetchone()
-            conn.close()
             
             return result[0] if result else None
             
@@ -379,9 +905,7 @@ class AuditService:
         Returns:
             SHA256 hash of the event
         """
-        # Sort keys for consistent hashing
-        event_json = json.dumps(event_data, sort_keys=True, separators=(',', ':'))
-        return hashlib.sha256(event_json.encode()).hexdigest()
+        return hash_event(event_data)
 
 # Singleton instance
 _audit_service_instance = None
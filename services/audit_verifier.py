@@ -0,0 +1,378 @@
+"""
+GramSetu AI - Audit Verifier
+Parallel, resumable full re-verification of the audit trail
+
+Features:
+- Partitions audit_trail by id range (groups of whole checkpoint blocks,
+  then the un-checkpointed tail) and re-hashes partitions across a process pool
+- Checks every event hash, every previous_hash link (inside partitions and at
+  partition boundaries) and every checkpoint Merkle root
+- Streams rows with fetchmany, so memory stays flat on millions of events
+- Progress is recorded per partition; an interrupted run resumes where it stopped
+- Reports throughput in events per second
+
+Usage:
+    python -m services.audit_verifier --workers 8
+    python -m services.audit_verifier --resume
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+from utils.db_pool import get_db_pool
+from services.audit_service import EVENT_HASH_COLUMNS, _leaf_hash, event_hash_from_row, merkle_root
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Verifier settings (overridable through the environment)
+AUDIT_VERIFY_WORKERS = int(os.environ.get('AUDIT_VERIFY_WORKERS', os.cpu_count() or 1))
+AUDIT_VERIFY_PARTITION_EVENTS = int(os.environ.get('AUDIT_VERIFY_PARTITION_EVENTS', 50000))
+AUDIT_VERIFY_FETCH_SIZE = 2000
+
+# Problems kept per partition (counts are always exact)
+MAX_REPORTED = 100
+
+
+def verify_partition(db_path: str, first_id: int, last_id: int, blocks: List[List]) -> Dict:
+    """
+    Re-hash one id range (runs in a worker process)
+
+    Args:
+        db_path: SQLite database path
+        first_id: First event id of the range
+        last_id: Last event id of the range
+        blocks: [block_index, first_id, last_id, merkle_root] of the checkpoints
+                inside the range, in order
+
+    Returns:
+        Dictionary with event count, problems, and the hashes at both ends
+        (for the boundary link check)
+    """
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    conn.row_factory = sqlite3.Row
+    result = {
+        'events': 0, 'tampered': [], 'tampered_count': 0, 'broken_links': [], 'broken_link_count': 0,
+        'tampered_checkpoints': [], 'first_previous_hash': None, 'last_hash': None
+    }
+    started = time.monotonic()
+    try:
+        cursor = conn.execute(f'''
+            SELECT {EVENT_HASH_COLUMNS} FROM audit_trail
+            WHERE id BETWEEN ? AND ?
+            ORDER BY id
+        ''', (first_id, last_id))
+
+        block_iter = iter(blocks)
+        block = next(block_iter, None)
+        leaves: List[bytes] = []
+        previous_hash = None
+
+        while True:
+            rows = cursor.fetchmany(AUDIT_VERIFY_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                if result['events'] == 0:
+                    result['first_previous_hash'] = row['previous_hash']
+                elif row['previous_hash'] != previous_hash:
+                    result['broken_link_count'] += 1
+                    if len(result['broken_links']) < MAX_REPORTED:
+                        result['broken_links'].append(row['id'])
+                if event_hash_from_row(row) != row['hash']:
+                    result['tampered_count'] += 1
+                    if len(result['tampered']) < MAX_REPORTED:
+                        result['tampered'].append(row['id'])
+                previous_hash = row['hash']
+                result['events'] += 1
+
+                # Checkpoint roots cover the stored hashes of their block
+                while block is not None and row['id'] > block[2]:
+                    if merkle_root(leaves).hex() != block[3]:
+                        result['tampered_checkpoints'].append(block[0])
+                    leaves = []
+                    block = next(block_iter, None)
+                if block is not None and row['id'] >= block[1]:
+                    leaves.append(_leaf_hash(row['hash']))
+
+        while block is not None:
+            if merkle_root(leaves).hex() != block[3]:
+                result['tampered_checkpoints'].append(block[0])
+            leaves = []
+            block = next(block_iter, None)
+
+        result['last_hash'] = previous_hash
+    finally:
+        conn.close()
+
+    result['seconds'] = time.monotonic() - started
+    return result
+
+
+class AuditVerifier:
+    """
+    Full-chain audit verification job with per-partition progress
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        """
+        Initialize the verifier
+
+        Args:
+            db_path: SQLite database path (opened read-only by the workers)
+        """
+        logger.info("Initializing AuditVerifier")
+        self.db_path = db_path
+        self.db_pool = get_db_pool(db_path)
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the run and partition progress tables exist"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS audit_verification_runs (
+                        run_id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL,  -- running, verified, failed
+                        max_id INTEGER NOT NULL,  -- events after this are left to the next run
+                        started_at TEXT NOT NULL,
+                        finished_at TEXT,
+                        report TEXT  -- JSON report of a finished run
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS audit_verification_partitions (
+                        run_id TEXT NOT NULL,
+                        first_id INTEGER NOT NULL,
+                        last_id INTEGER NOT NULL,
+                        blocks TEXT NOT NULL,  -- JSON checkpoint blocks inside the range
+                        result TEXT,  -- JSON verify_partition() result, NULL while pending
+                        PRIMARY KEY (run_id, first_id)
+                    )
+                ''')
+            logger.info("Audit verification tables ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring audit verification tables: {str(e)}")
+
+    def _plan(self, run_id: str, partition_events: int) -> int:
+        """Record the partitions of a new run; returns the highest event id covered"""
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM audit_trail')
+        max_id = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT block_index, first_id, last_id, event_count, merkle_root
+            FROM audit_checkpoints ORDER BY block_index
+        ''')
+        checkpoints = cursor.fetchall()
+
+        partitions = []
+        group: List[List] = []
+        count = 0
+        for block_index, first_id, last_id, event_count, root in checkpoints:
+            group.append([block_index, first_id, last_id, root])
+            count += event_count
+            if count >= partition_events:
+                partitions.append((group[0][1], group[-1][2], group))
+                group, count = [], 0
+        if group:
+            partitions.append((group[0][1], group[-1][2], group))
+
+        # Tail after the last checkpoint, by id range
+        next_id = checkpoints[-1][2] + 1 if checkpoints else 1
+        while next_id <= max_id:
+            last_id = min(next_id + partition_events - 1, max_id)
+            partitions.append((next_id, last_id, []))
+            next_id = last_id + 1
+
+        with self.db_pool.transaction() as conn:
+            conn.execute('''
+                INSERT INTO audit_verification_runs (run_id, status, max_id, started_at)
+                VALUES (?, 'running', ?, ?)
+            ''', (run_id, max_id, datetime.utcnow().isoformat() + 'Z'))
+            conn.executemany('''
+                INSERT INTO audit_verification_partitions (run_id, first_id, last_id, blocks)
+                VALUES (?, ?, ?, ?)
+            ''', [(run_id, first_id, last_id, json.dumps(blocks)) for first_id, last_id, blocks in partitions])
+        return max_id
+
+    def run(self, workers: int = AUDIT_VERIFY_WORKERS, resume: bool = False,
+            partition_events: int = AUDIT_VERIFY_PARTITION_EVENTS) -> Dict:
+        """
+        Verify every audit event
+
+        Args:
+            workers: Worker processes
+            resume: Continue the latest unfinished run instead of starting one
+            partition_events: Target events per partition
+
+        Returns:
+            Verification report (see _report)
+        """
+        try:
+            cursor = self.db_pool.connection().cursor()
+            run_id = None
+            if resume:
+                cursor.execute('''
+                    SELECT run_id FROM audit_verification_runs
+                    WHERE status = 'running' ORDER BY started_at DESC LIMIT 1
+                ''')
+                row = cursor.fetchone()
+                run_id = row[0] if row else None
+            resumed = run_id is not None
+            if run_id is None:
+                run_id = uuid.uuid4().hex
+                self._plan(run_id, partition_events)
+
+            cursor.execute('''
+                SELECT first_id, last_id, blocks FROM audit_verification_partitions
+                WHERE run_id = ? AND result IS NULL ORDER BY first_id
+            ''', (run_id,))
+            pending = cursor.fetchall()
+            logger.info(f"Audit verification {run_id}: {len(pending)} partition(s) to verify with {workers} worker(s)")
+
+            started = time.monotonic()
+            events = 0
+            with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+                futures = {
+                    pool.submit(verify_partition, self.db_path, first_id, last_id, json.loads(blocks)): first_id
+                    for first_id, last_id, blocks in pending
+                }
+                for future in as_completed(futures):
+                    result = future.result()
+                    events += result['events']
+                    with self.db_pool.transaction() as conn:
+                        conn.execute('''
+                            UPDATE audit_verification_partitions SET result = ?
+                            WHERE run_id = ? AND first_id = ?
+                        ''', (json.dumps(result), run_id, futures[future]))
+            seconds = time.monotonic() - started
+
+            report = self._report(run_id)
+            report['resumed'] = resumed
+            report['events_this_session'] = events
+            report['seconds'] = round(seconds, 3)
+            report['events_per_second'] = round(events / seconds, 1) if seconds > 0 else 0.0
+
+            with self.db_pool.transaction() as conn:
+                conn.execute('''
+                    UPDATE audit_verification_runs SET status = ?, finished_at = ?, report = ?
+                    WHERE run_id = ?
+                ''', ('verified' if report['verified'] else 'failed',
+                      datetime.utcnow().isoformat() + 'Z', json.dumps(report), run_id))
+
+            logger.info(f"Audit verification {run_id}: {report['total_events']} events, "
+                        f"verified={report['verified']}, {report['events_per_second']} events/s")
+            return report
+
+        except Exception as e:
+            logger.error(f"Audit verification error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def _report(self, run_id: str) -> Dict:
+        """Combine the partition results of a run, checking links at partition boundaries"""
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT first_id, result FROM audit_verification_partitions
+            WHERE run_id = ? ORDER BY first_id
+        ''', (run_id,))
+
+        report = {
+            'success': True, 'run_id': run_id, 'total_events': 0, 'partitions': 0,
+            'tampered_events': [], 'tampered_count': 0, 'broken_links': [], 'broken_link_count': 0,
+            'tampered_checkpoints': []
+        }
+        previous_hash = None
+        for first_id, result_json in cursor.fetchall():
+            result = json.loads(result_json)
+            if result['events'] and result['first_previous_hash'] != previous_hash:
+                report['broken_link_count'] += 1
+                report['broken_links'].append({'partition_first_id': first_id,
+                                               'expected_previous_hash': previous_hash,
+                                               'previous_hash': result['first_previous_hash']})
+            if result['events']:
+                previous_hash = result['last_hash']
+
+            report['partitions'] += 1
+            report['total_events'] += result['events']
+            report['tampered_count'] += result['tampered_count']
+            report['tampered_events'].extend(result['tampered'])
+            report['broken_link_count'] += result['broken_link_count']
+            report['broken_links'].extend({'id': event_id} for event_id in result['broken_links'])
+            report['tampered_checkpoints'].extend(result['tampered_checkpoints'])
+
+        report['verified'] = not (report['tampered_count'] or report['broken_link_count']
+                                  or report['tampered_checkpoints'])
+        return report
+
+    def get_run(self, run_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Status of a run (the latest if run_id is None)
+
+        Returns:
+            Dictionary with status, progress and the report of a finished run
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT run_id, status, max_id, started_at, finished_at, report FROM audit_verification_runs
+            WHERE run_id = COALESCE(?, run_id) ORDER BY started_at DESC LIMIT 1
+        ''', (run_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute('''
+            SELECT COUNT(*), COUNT(result) FROM audit_verification_partitions WHERE run_id = ?
+        ''', (row['run_id'],))
+        total, done = cursor.fetchone()
+        return {
+            'run_id': row['run_id'], 'status': row['status'], 'max_id': row['max_id'],
+            'started_at': row['started_at'], 'finished_at': row['finished_at'],
+            'partitions': total, 'partitions_done': done,
+            'report': json.loads(row['report']) if row['report'] else None
+        }
+
+# Singleton instance
+_audit_verifier_instance = None
+
+def get_audit_verifier() -> AuditVerifier:
+    """
+    Get singleton instance of AuditVerifier
+
+    Returns:
+        AuditVerifier instance
+    """
+    global _audit_verifier_instance
+
+    if _audit_verifier_instance is None:
+        _audit_verifier_instance = AuditVerifier()
+
+    return _audit_verifier_instance
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GramSetu full audit trail verification')
+    parser.add_argument('--workers', type=int, default=AUDIT_VERIFY_WORKERS, help='worker processes')
+    parser.add_argument('--partition-events', type=int, default=AUDIT_VERIFY_PARTITION_EVENTS,
+                        help='target events per partition')
+    parser.add_argument('--resume', action='store_true', help='continue the latest unfinished run')
+    parser.add_argument('--db', default=DB_PATH, help='SQLite database path')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    verifier = AuditVerifier(args.db)
+    report = verifier.run(args.workers, args.resume, args.partition_events)
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report.get('verified') else 1)
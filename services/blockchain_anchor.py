@@ -0,0 +1,488 @@
+"""
+GramSetu AI - Blockchain Anchor
+Merkle-batched anchoring of complaint hashes
+
+Features:
+- Complaint hashes accumulate as pending leaves; the scheduler process
+  seals a batch every ANCHOR_INTERVAL_SECONDS, or sooner once
+  ANCHOR_BATCH_SIZE leaves are pending (checked every ANCHOR_POLL_SECONDS).
+  Requests only insert their leaf
+- One chain transaction per batch (its Merkle root), so anchoring cost grows
+  with batches instead of complaints
+- Each complaint keeps its inclusion proof (leaf -> anchored root)
+- Web3 chain when THIRDWEB_SECRET_KEY is set (one client per process; the
+  transaction is still simulated), otherwise a local stand-in chain in
+  SQLite, which is also the fallback when the Web3 client errors
+- Each batch is claimed in the database before it is sent, so concurrent
+  flushes in any number of processes anchor every root exactly once
+- Failed anchors, and claims left by a crashed process, are retried on a
+  later flush
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from utils.db_pool import get_db_pool
+from services.audit_service import _leaf_hash, apply_merkle_path, merkle_path, merkle_root
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Anchoring settings (overridable through the environment)
+ANCHOR_BATCH_SIZE = int(os.environ.get('ANCHOR_BATCH_SIZE', 256))  # leaves that force a flush
+ANCHOR_MAX_BATCH_SIZE = int(os.environ.get('ANCHOR_MAX_BATCH_SIZE', 4096))  # leaves per root
+ANCHOR_INTERVAL_SECONDS = float(os.environ.get('ANCHOR_INTERVAL_SECONDS', 60))
+ANCHOR_POLL_SECONDS = float(os.environ.get('ANCHOR_POLL_SECONDS', 5))  # batch size check
+ANCHOR_CLAIM_TIMEOUT_SECONDS = float(os.environ.get('ANCHOR_CLAIM_TIMEOUT_SECONDS', 300))  # then re-anchored
+
+
+def complaint_leaf_hash(complaint_id: str, complaint_data: Dict) -> str:
+    """Hex SHA256 of a complaint ID and its data (sorted keys)"""
+    payload = f"{complaint_id}{json.dumps(complaint_data, sort_keys=True)}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LocalChain:
+    """
+    Stand-in chain: an append-only table of hash-linked blocks, one per root
+    """
+
+    status = 'mocked'
+
+    def __init__(self, db_pool):
+        """
+        Initialize the chain
+
+        Args:
+            db_pool: Pool of the database holding local_chain_blocks
+        """
+        self.db_pool = db_pool
+        with self.db_pool.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS local_chain_blocks (
+                    block_number INTEGER PRIMARY KEY,
+                    tx_hash TEXT UNIQUE NOT NULL,
+                    merkle_root TEXT NOT NULL,
+                    previous_block_hash TEXT,
+                    timestamp TEXT NOT NULL
+                )
+            ''')
+
+    def anchor(self, root: str) -> Dict:
+        """
+        Append a block holding root
+
+        Args:
+            root: Hex Merkle root
+
+        Returns:
+            Dictionary with tx_hash, block_number and explorer_url
+        """
+        timestamp = datetime.utcnow().isoformat()
+        with self.db_pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT block_number, tx_hash FROM local_chain_blocks ORDER BY block_number DESC LIMIT 1')
+            head = cursor.fetchone()
+            block_number = head[0] + 1 if head else 45000000
+            previous = head[1] if head else None
+            tx_hash = 'MCK-TX-' + hashlib.sha256(f"{previous}{root}{timestamp}".encode()).hexdigest()[:40]
+            cursor.execute('''
+                INSERT INTO local_chain_blocks (block_number, tx_hash, merkle_root, previous_block_hash, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (block_number, tx_hash, root, previous, timestamp))
+        return {
+            'tx_hash': tx_hash,
+            'block_number': block_number,
+            'explorer_url': f"https://mock.polygonscan.com/tx/{tx_hash}"
+        }
+
+
+class Web3Chain:
+    """
+    Polygon through Web3, with one client for the process
+    """
+
+    # No transaction is sent yet (see anchor()), so nothing is confirmed
+    status = 'simulated'
+
+    def __init__(self, provider_url: str, fallback: LocalChain):
+        """
+        Initialize the client
+
+        Args:
+            provider_url: JSON-RPC endpoint
+            fallback: Chain used when the Web3 client errors
+        """
+        from web3 import Web3
+        self.w3 = Web3(Web3.HTTPProvider(provider_url))
+        self.fallback = fallback
+
+    def anchor(self, root: str) -> Dict:
+        """
+        Anchor root
+
+        Args:
+            root: Hex Merkle root
+
+        Returns:
+            Dictionary with tx_hash, block_number, explorer_url and status
+        """
+        try:
+            # In production, this would call the anchoring contract with root;
+            # for now the transaction is simulated
+            tx_hash = '0x' + hashlib.sha256(root.encode()).hexdigest()
+            block_number = self.w3.eth.block_number if self.w3.is_connected() else 45000000
+        except Exception as e:
+            logger.error(f"Web3 anchoring failed, using the local chain: {str(e)}")
+            return dict(self.fallback.anchor(root), status=self.fallback.status)
+
+        return {
+            'tx_hash': tx_hash,
+            'block_number': block_number,
+            'status': self.status,
+            'explorer_url': f"https://polygonscan.com/tx/{tx_hash}"
+        }
+
+
+
+# Batch statuses that carry a transaction ('confirmed' is kept for batches
+# recorded before simulated Web3 anchors were labelled as such)
+ANCHORED_STATUSES = (LocalChain.status, Web3Chain.status, 'confirmed')
+
+class BlockchainAnchor:
+    """
+    Batches complaint hashes into Merkle roots and anchors one root per batch
+    """
+
+    def __init__(self, chain=None, batch_size: int = ANCHOR_BATCH_SIZE):
+        """
+        Initialize the anchor
+
+        Args:
+            chain: Object with anchor(root) and a status label; anchor() may
+                   return its own 'status' (default: Web3Chain when
+                   THIRDWEB_SECRET_KEY is set, else LocalChain)
+            batch_size: Pending leaves that trigger an early flush (see flush_due)
+        """
+        logger.info("Initializing BlockchainAnchor")
+        self.db_pool = get_db_pool(DB_PATH)
+        self.batch_size = batch_size
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._ensure_tables_exist()
+        self.chain = chain or self._default_chain()
+
+    def _default_chain(self):
+        """Web3 when configured and importable, otherwise the local chain"""
+        if os.getenv('THIRDWEB_SECRET_KEY'):
+            try:
+                return Web3Chain(os.getenv('WEB3_PROVIDER_URL', 'https://polygon-rpc.com'),
+                                 LocalChain(self.db_pool))
+            except Exception as e:
+                logger.error(f"Web3 unavailable, anchoring to the local chain: {str(e)}")
+        else:
+            logger.info("Using local anchoring chain (no API key)")
+        return LocalChain(self.db_pool)
+
+    def _ensure_tables_exist(self):
+        """Ensure the batch and leaf tables exist"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS anchor_batches (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        merkle_root TEXT NOT NULL,
+                        leaf_count INTEGER NOT NULL,
+                        status TEXT NOT NULL,  -- pending, anchoring, simulated, mocked, failed
+                        tx_hash TEXT,
+                        block_number INTEGER,
+                        explorer_url TEXT,
+                        error TEXT,
+                        created_at TEXT NOT NULL,
+                        claimed_at TEXT,
+                        anchored_at TEXT
+                    )
+                ''')
+                cursor.execute('PRAGMA table_info(anchor_batches)')
+                if 'claimed_at' not in {row[1] for row in cursor.fetchall()}:
+                    cursor.execute('ALTER TABLE anchor_batches ADD COLUMN claimed_at TEXT')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS anchor_leaves (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        complaint_id TEXT NOT NULL,
+                        leaf_hash TEXT NOT NULL,
+                        batch_id INTEGER,  -- NULL while pending
+                        leaf_index INTEGER,
+                        proof TEXT,  -- JSON audit path to the batch root
+                        created_at TEXT NOT NULL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_anchor_leaves_complaint ON anchor_leaves(complaint_id, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_anchor_leaves_pending ON anchor_leaves(id) WHERE batch_id IS NULL')
+                # Replaced by an index that also covers claimed batches
+                cursor.execute('DROP INDEX IF EXISTS idx_anchor_batches_unanchored')
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_anchor_batches_open ON anchor_batches(id) WHERE status IN ('pending', 'failed', 'anchoring')")
+            logger.info("Anchor tables ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring anchor tables: {str(e)}")
+
+    def submit(self, complaint_id: str, complaint_data: Dict) -> Dict:
+        """
+        Queue a complaint hash for the next anchored batch
+
+        Only the leaf is written; sealing and the chain call happen in the
+        scheduler process (flush_due), never on the request path.
+
+        Args:
+            complaint_id: Complaint ID
+            complaint_data: Data to commit to (JSON serializable)
+
+        Returns:
+            Dictionary with the leaf hash and pending status
+        """
+        try:
+            leaf_hash = complaint_leaf_hash(complaint_id, complaint_data)
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO anchor_leaves (complaint_id, leaf_hash, created_at)
+                    VALUES (?, ?, ?)
+                ''', (str(complaint_id), leaf_hash, datetime.utcnow().isoformat()))
+                cursor.execute('SELECT COUNT(*) FROM anchor_leaves WHERE batch_id IS NULL')
+                pending = cursor.fetchone()[0]
+
+            return {
+                'success': True,
+                'complaint_id': complaint_id,
+                'leaf_hash': leaf_hash,
+                'status': 'pending',
+                'pending_leaves': pending
+            }
+
+        except Exception as e:
+            logger.error(f"Anchor submit error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def flush_due(self) -> Dict:
+        """
+        Flush if ANCHOR_INTERVAL_SECONDS have passed since the last flush or
+        batch_size leaves are pending (the scheduler's anchor_flush job)
+
+        Returns:
+            flush() result, or {'success': True, 'flushed': False} when not due
+        """
+        if time.monotonic() - self._last_flush < ANCHOR_INTERVAL_SECONDS:
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute('SELECT COUNT(*) FROM anchor_leaves WHERE batch_id IS NULL')
+            if cursor.fetchone()[0] < self.batch_size:
+                return {'success': True, 'flushed': False}
+        return self.flush()
+
+    def flush(self) -> Dict:
+        """
+        Seal pending leaves into batches and anchor every unanchored batch
+
+        Every batch is claimed first; a batch claimed by another flush (in
+        this or any other process) is skipped.
+
+        Returns:
+            Dictionary with the number of batches sealed and anchored
+        """
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            sealed = 0
+            while self._seal_batch():
+                sealed += 1
+
+            anchored = 0
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute("SELECT id, merkle_root FROM anchor_batches WHERE status IN ('pending', 'failed', 'anchoring') ORDER BY id")
+            for batch_id, root in cursor.fetchall():
+                claim = self._claim_batch(batch_id)
+                if claim is not None:
+                    anchored += self._anchor_batch(batch_id, root, claim)
+
+        return {'success': True, 'sealed': sealed, 'anchored': anchored}
+
+    def _seal_batch(self) -> bool:
+        """Turn up to ANCHOR_MAX_BATCH_SIZE pending leaves into a batch with proofs"""
+        with self.db_pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, leaf_hash FROM anchor_leaves
+                WHERE batch_id IS NULL ORDER BY id LIMIT ?
+            ''', (ANCHOR_MAX_BATCH_SIZE,))
+            rows = cursor.fetchall()
+            if not rows:
+                return False
+
+            leaves = [_leaf_hash(row[1]) for row in rows]
+            cursor.execute('''
+                INSERT INTO anchor_batches (merkle_root, leaf_count, status, created_at)
+                VALUES (?, ?, 'pending', ?)
+            ''', (merkle_root(leaves).hex(), len(leaves), datetime.utcnow().isoformat()))
+            batch_id = cursor.lastrowid
+            cursor.executemany('''
+                UPDATE anchor_leaves SET batch_id = ?, leaf_index = ?, proof = ? WHERE id = ?
+            ''', [(batch_id, index, json.dumps(merkle_path(leaves, index)), row[0])
+                  for index, row in enumerate(rows)])
+        return True
+
+    def _claim_batch(self, batch_id: int) -> Optional[str]:
+        """
+        Take ownership of a batch before sending it
+
+        Pending and failed batches can be claimed, and so can batches whose
+        claim is older than ANCHOR_CLAIM_TIMEOUT_SECONDS (the flush that took
+        them died).
+
+        Args:
+            batch_id: Batch ID
+
+        Returns:
+            The claim timestamp (the ownership token), or None if another
+            flush owns the batch or it is anchored already
+        """
+        now = datetime.utcnow()
+        claimed_at = now.isoformat()
+        stale = (now - timedelta(seconds=ANCHOR_CLAIM_TIMEOUT_SECONDS)).isoformat()
+        with self.db_pool.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE anchor_batches SET status = 'anchoring', claimed_at = ?
+                WHERE id = ? AND (status IN ('pending', 'failed')
+                                  OR (status = 'anchoring' AND claimed_at < ?))
+            ''', (claimed_at, batch_id, stale))
+            return claimed_at if cursor.rowcount == 1 else None
+
+    def _anchor_batch(self, batch_id: int, root: str, claimed_at: str) -> int:
+        """Send one claimed batch root to the chain (outside any transaction); 1 if anchored"""
+        try:
+            tx = self.chain.anchor(root)
+        except Exception as e:
+            logger.error(f"Anchoring batch {batch_id} failed: {str(e)}")
+            with self.db_pool.transaction() as conn:
+                conn.execute('''
+                    UPDATE anchor_batches SET status = 'failed', error = ?
+                    WHERE id = ? AND status = 'anchoring' AND claimed_at = ?
+                ''', (str(e), batch_id, claimed_at))
+            return 0
+
+        with self.db_pool.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE anchor_batches
+                SET status = ?, tx_hash = ?, block_number = ?, explorer_url = ?, error = NULL, anchored_at = ?
+                WHERE id = ? AND status = 'anchoring' AND claimed_at = ?
+            ''', (tx.get('status', self.chain.status), tx['tx_hash'], tx['block_number'], tx['explorer_url'],
+                  datetime.utcnow().isoformat(), batch_id, claimed_at))
+            if cursor.rowcount != 1:
+                # The claim expired and another flush took the batch over
+                logger.warning(f"Lost the claim on batch {batch_id}; tx {tx['tx_hash']} not recorded")
+                return 0
+        logger.info(f"Anchored batch {batch_id} in tx {tx['tx_hash']}")
+        return 1
+
+    def get_proof(self, complaint_id: str) -> Dict:
+        """
+        Inclusion proof of a complaint's latest hash in its anchored root
+
+        Args:
+            complaint_id: Complaint ID
+
+        Returns:
+            Dictionary with leaf hash, audit path, Merkle root and transaction,
+            or status 'pending' while the batch is not anchored yet
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT l.leaf_hash, l.leaf_index, l.proof, l.batch_id, b.merkle_root, b.leaf_count,
+                   b.status, b.tx_hash, b.block_number, b.explorer_url, b.anchored_at
+            FROM anchor_leaves l
+            LEFT JOIN anchor_batches b ON b.id = l.batch_id
+            WHERE l.complaint_id = ?
+            ORDER BY l.id DESC LIMIT 1
+        ''', (str(complaint_id),))
+        row = cursor.fetchone()
+        if row is None:
+            return {'success': False, 'error': 'Complaint has not been submitted for anchoring'}
+        if row['status'] not in ANCHORED_STATUSES:
+            return {'success': True, 'complaint_id': complaint_id, 'leaf_hash': row['leaf_hash'],
+                    'status': row['status'] or 'pending'}
+
+        return {
+            'success': True,
+            'complaint_id': complaint_id,
+            'leaf_hash': row['leaf_hash'],
+            'leaf_index': row['leaf_index'],
+            'proof': json.loads(row['proof']),
+            'batch_id': row['batch_id'],
+            'merkle_root': row['merkle_root'],
+            'leaf_count': row['leaf_count'],
+            'status': row['status'],
+            'tx_hash': row['tx_hash'],
+            'block_number': row['block_number'],
+            'explorer_url': row['explorer_url'],
+            'timestamp': row['anchored_at']
+        }
+
+    @staticmethod
+    def verify_proof(proof: Dict) -> bool:
+        """
+        Check a proof from get_proof (needs no database access)
+
+        Args:
+            proof: Anchored inclusion proof
+
+        Returns:
+            True if the leaf hash folds up to the anchored Merkle root
+        """
+        return apply_merkle_path(_leaf_hash(proof['leaf_hash']), proof['proof']).hex() == proof['merkle_root']
+
+    def get_stats(self) -> Dict:
+        """
+        Anchoring counters
+
+        Returns:
+            Dictionary with pending leaves, batches by status and leaves per transaction
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('SELECT COUNT(*) FROM anchor_leaves WHERE batch_id IS NULL')
+        pending = cursor.fetchone()[0]
+        cursor.execute('SELECT status, COUNT(*), SUM(leaf_count) FROM anchor_batches GROUP BY status')
+        batches = {row[0]: {'batches': row[1], 'leaves': row[2]} for row in cursor.fetchall()}
+        anchored = [batches[status] for status in ANCHORED_STATUSES if status in batches]
+        transactions = sum(item['batches'] for item in anchored)
+        return {
+            'pending_leaves': pending,
+            'batches': batches,
+            'leaves_per_transaction': sum(item['leaves'] for item in anchored) / transactions if transactions else 0.0,
+            'chain': type(self.chain).__name__
+        }
+
+# Singleton instance
+_blockchain_anchor_instance = None
+
+def get_blockchain_anchor() -> BlockchainAnchor:
+    """
+    Get singleton instance of BlockchainAnchor
+
+    Returns:
+        BlockchainAnchor instance
+    """
+    global _blockchain_anchor_instance
+
+    if _blockchain_anchor_instance is None:
+        _blockchain_anchor_instance = BlockchainAnchor()
+
+    return _blockchain_anchor_instance
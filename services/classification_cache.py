@@ -0,0 +1,400 @@
+"""
+GramSetu AI - Classification Result Cache
+Avoids re-running the transformer on repeated complaint texts
+
+Features:
+- Key: SHA256 of model version + normalized text (case, whitespace, digits)
+- Bounded in-process LRU tier
+- Optional Redis tier (shared by all workers) and persistent SQLite tier
+- Lower-tier hits are promoted to the faster tiers
+- Batch lookups and writes: one SQLite query/transaction and one Redis
+  round trip per batch
+- SQLite tier evicted by age and by entry count (least recently used first)
+- Hit/miss counters per tier
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Cache settings (overridable through the environment)
+CLASSIFICATION_CACHE_SIZE = int(os.environ.get('CLASSIFICATION_CACHE_SIZE', 10000))
+CLASSIFICATION_CACHE_REDIS_TTL = int(os.environ.get('CLASSIFICATION_CACHE_REDIS_TTL', 7 * 24 * 3600))
+CLASSIFICATION_CACHE_SQLITE = os.environ.get('CLASSIFICATION_CACHE_SQLITE', 'true').lower() == 'true'
+CLASSIFICATION_CACHE_SQLITE_MAX_ENTRIES = int(os.environ.get('CLASSIFICATION_CACHE_SQLITE_MAX_ENTRIES', 200000))
+CLASSIFICATION_CACHE_MAX_AGE_DAYS = int(os.environ.get('CLASSIFICATION_CACHE_MAX_AGE_DAYS', 90))
+
+
+class ClassificationCache:
+    """
+    Multi-tier cache of classification results
+    """
+
+    REDIS_KEY_PREFIX = 'gramsetu:classification:'
+
+    # Run SQLite eviction after this many inserted rows
+    EVICT_EVERY = 500
+
+    # Keys per SQLite IN (...) lookup
+    SQLITE_BATCH_SIZE = 500
+
+    def __init__(self, max_entries: int = CLASSIFICATION_CACHE_SIZE, redis_client=None,
+                 use_sqlite: bool = CLASSIFICATION_CACHE_SQLITE,
+                 sqlite_max_entries: int = CLASSIFICATION_CACHE_SQLITE_MAX_ENTRIES,
+                 max_age_days: int = CLASSIFICATION_CACHE_MAX_AGE_DAYS):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum entries in the in-process tier
+            redis_client: Optional Redis client for the shared tier
+            use_sqlite: Whether to keep results in the persistent SQLite tier
+            sqlite_max_entries: Maximum entries in the SQLite tier
+            max_age_days: SQLite entries not used for this long are dropped
+        """
+        logger.info("Initializing ClassificationCache")
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.use_sqlite = use_sqlite
+        self.sqlite_max_entries = sqlite_max_entries
+        self.max_age_days = max_age_days
+        self.db_pool = get_db_pool(DB_PATH)
+        self._memory: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'redis_hits': 0, 'sqlite_hits': 0, 'misses': 0,
+                       'evictions': 0, 'sqlite_evictions': 0}
+        self._inserts = 0
+
+        if self.use_sqlite:
+            self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the persistent cache table exists"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS classification_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        model_version TEXT NOT NULL,
+                        result TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_used_at TIMESTAMP
+                    )
+                ''')
+
+                cursor.execute('PRAGMA table_info(classification_cache)')
+                if 'last_used_at' not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute('ALTER TABLE classification_cache ADD COLUMN last_used_at TIMESTAMP')
+                    cursor.execute("UPDATE classification_cache SET last_used_at = replace(created_at, ' ', 'T')")
+
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_classification_cache_last_used
+                    ON classification_cache(last_used_at)
+                ''')
+            logger.info("Classification cache table ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring classification cache table: {str(e)}")
+            self.use_sqlite = False
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalize text so near-verbatim repeats share a key
+
+        Ward, sector and house numbers do not change the category, so every
+        digit run is collapsed to a single '0'.
+        """
+        text = unicodedata.normalize('NFKC', text).lower()
+        text = re.sub(r'\d+', '0', text)
+        return ' '.join(text.split())
+
+    def make_key(self, text: str, model_version: str) -> str:
+        """Cache key for a text under a model version"""
+        data = f"{model_version}\x00{self.normalize(text)}"
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get(self, text: str, model_version: str) -> Optional[Dict]:
+        """
+        Look up a cached result
+
+        Args:
+            text: Complaint text
+            model_version: Model (and label set) identifier
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        return self._get_by_key(self.make_key(text, model_version))
+
+    def _get_by_key(self, key: str) -> Optional[Dict]:
+        return self._get_many_by_keys([key])[0]
+
+    def _get_many_by_keys(self, keys: List[str]) -> List[Optional[Dict]]:
+        """Look up keys tier by tier; each lower tier is queried once for all remaining misses"""
+        results: List[Optional[Dict]] = [None] * len(keys)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                result = self._memory.get(key)
+                if result is not None:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    results[i] = result
+
+        remaining = [i for i, result in enumerate(results) if result is None]
+        if remaining and self.redis_client is not None:
+            try:
+                cached = self.redis_client.mget([self.REDIS_KEY_PREFIX + keys[i] for i in remaining])
+                hits = 0
+                for i, value in zip(remaining, cached):
+                    if value:
+                        results[i] = json.loads(value)
+                        self._remember(keys[i], results[i])
+                        hits += 1
+                with self._lock:
+                    self._stats['redis_hits'] += hits
+            except Exception as e:
+                logger.debug(f"Classification cache Redis error: {str(e)}")
+            remaining = [i for i in remaining if results[i] is None]
+
+        if remaining and self.use_sqlite:
+            try:
+                wanted = list({keys[i] for i in remaining})
+                found: Dict[str, Dict] = {}
+                cursor = self.db_pool.connection().cursor()
+                for start in range(0, len(wanted), self.SQLITE_BATCH_SIZE):
+                    batch = wanted[start:start + self.SQLITE_BATCH_SIZE]
+                    cursor.execute(
+                        f"SELECT cache_key, result FROM classification_cache "
+                        f"WHERE cache_key IN ({', '.join('?' * len(batch))})", batch
+                    )
+                    found.update((row[0], json.loads(row[1])) for row in cursor.fetchall())
+
+                if found:
+                    self._set_redis_many(list(found.items()))
+                    for key, result in found.items():
+                        self._remember(key, result)
+                hits = 0
+                for i in remaining:
+                    results[i] = found.get(keys[i])
+                    hits += results[i] is not None
+                with self._lock:
+                    self._stats['sqlite_hits'] += hits
+            except Exception as e:
+                logger.debug(f"Classification cache SQLite error: {str(e)}")
+            else:
+                if found:
+                    self._touch(list(found))
+
+        with self._lock:
+            self._stats['misses'] += sum(1 for result in results if result is None)
+        return results
+
+    def set(self, text: str, model_version: str, result: Dict):
+        """
+        Store a result in every tier
+
+        Args:
+            text: Complaint text
+            model_version: Model (and label set) identifier
+            result: JSON-serializable classification result
+        """
+        self._set_many([(self.make_key(text, model_version), result)], model_version)
+
+    def _set_many(self, entries: List[Tuple[str, Dict]], model_version: str):
+        """Store (key, result) pairs with one Redis pipeline and one SQLite transaction"""
+        for key, result in entries:
+            self._remember(key, result)
+        self._set_redis_many(entries)
+
+        if not self.use_sqlite or not entries:
+            return
+
+        now = datetime.utcnow().isoformat()
+        try:
+            with self.db_pool.transaction() as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO classification_cache
+                    (cache_key, model_version, result, last_used_at)
+                    VALUES (?, ?, ?, ?)
+                ''', [(key, model_version, json.dumps(result), now) for key, result in entries])
+        except Exception as e:
+            logger.debug(f"Classification cache SQLite error: {str(e)}")
+            return
+
+        with self._lock:
+            before = self._inserts
+            self._inserts += len(entries)
+            evict = self._inserts // self.EVICT_EVERY > before // self.EVICT_EVERY
+        if evict:
+            self.evict()
+
+    def _touch(self, keys: List[str]):
+        """Mark SQLite entries as used, in one transaction (best effort: a busy database skips it)"""
+        now = datetime.utcnow().isoformat()
+        try:
+            with self.db_pool.transaction() as conn:
+                conn.executemany('UPDATE classification_cache SET last_used_at = ? WHERE cache_key = ?',
+                                 [(now, key) for key in keys])
+        except Exception as e:
+            logger.debug(f"Classification cache touch skipped: {str(e)}")
+
+    def evict(self) -> int:
+        """
+        Drop SQLite entries unused for max_age_days, then the least recently
+        used beyond sqlite_max_entries
+
+        Returns:
+            Number of entries removed
+        """
+        if not self.use_sqlite:
+            return 0
+
+        cutoff = (datetime.utcnow() - timedelta(days=self.max_age_days)).isoformat()
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM classification_cache WHERE last_used_at < ?', (cutoff,))
+                removed = cursor.rowcount
+
+                cursor.execute('''
+                    DELETE FROM classification_cache WHERE rowid IN (
+                        SELECT rowid FROM classification_cache
+                        ORDER BY last_used_at DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                ''', (self.sqlite_max_entries,))
+                removed += cursor.rowcount
+
+        except Exception as e:
+            logger.warning(f"Classification cache eviction error: {str(e)}")
+            return 0
+
+        if removed:
+            logger.info(f"Evicted {removed} classification cache entries")
+            with self._lock:
+                self._stats['sqlite_evictions'] += removed
+        return removed
+
+    def get_or_compute(self, text: str, model_version: str, compute: Callable[[str], Dict]) -> Dict:
+        """
+        Return the cached result or compute and cache it
+
+        Args:
+            text: Complaint text
+            model_version: Model (and label set) identifier
+            compute: Called with the text on a miss
+
+        Returns:
+            Classification result
+        """
+        result = self.get(text, model_version)
+        if result is None:
+            result = compute(text)
+            self.set(text, model_version, result)
+        return result
+
+    def get_or_compute_many(self, texts: List[str], model_version: str,
+                            compute_many: Callable[[List[str]], List[Dict]]) -> List[Dict]:
+        """
+        Batch version of get_or_compute: misses are computed in one call
+
+        Args:
+            texts: Complaint texts
+            model_version: Model (and label set) identifier
+            compute_many: Called with the distinct missed texts
+
+        Returns:
+            One classification result per text
+        """
+        keys = [self.make_key(text, model_version) for text in texts]
+        results = self._get_many_by_keys(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text, result in zip(keys, texts, results):
+            if result is None and key not in missing:
+                missing[key] = text
+
+        if missing:
+            computed = dict(zip(missing.keys(), compute_many(list(missing.values()))))
+            self._set_many(list(computed.items()), model_version)
+            results = [result if result is not None else computed[key] for key, result in zip(keys, results)]
+
+        return results
+
+    def _remember(self, key: str, result: Dict):
+        """Insert into the in-process LRU tier"""
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _set_redis_many(self, entries: List[Tuple[str, Dict]]):
+        if self.redis_client is None or not entries:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, result in entries:
+                pipe.setex(self.REDIS_KEY_PREFIX + key, CLASSIFICATION_CACHE_REDIS_TTL, json.dumps(result))
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Classification cache Redis error: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """
+        Cache counters
+
+        Returns:
+            Dictionary with hits per tier, misses, hit rate and size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['redis_hits'] + stats['sqlite_hits']
+        lookups = hits + stats['misses']
+        stats['hits'] = hits
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['sqlite_max_entries'] = self.sqlite_max_entries
+        stats['redis'] = self.redis_client is not None
+        stats['sqlite'] = self.use_sqlite
+        return stats
+
+# Singleton instance
+_classification_cache_instance = None
+
+def get_classification_cache(redis_client=None) -> ClassificationCache:
+    """
+    Get singleton instance of ClassificationCache
+
+    Args:
+        redis_client: Optional Redis client to install on the shared instance
+
+    Returns:
+        ClassificationCache instance
+    """
+    global _classification_cache_instance
+
+    if _classification_cache_instance is None:
+        _classification_cache_instance = ClassificationCache(redis_client=redis_client)
+    elif redis_client is not None:
+        _classification_cache_instance.redis_client = redis_client
+
+    return _classification_cache_instance
@@ -0,0 +1,596 @@
+"""
+GramSetu AI - Complaint Ingestion Pipeline
+Single-transaction write path shared by web, voice, SMS and USSD complaints
+
+Features:
+- Duplicate lookup, CRS upsert and complaint insert in one transaction
+- One commit (one fsync) per complaint
+- CRS can no longer drift when the complaint insert fails
+- Pluggable duplicate detector (sentence embeddings in app.py, exact match fallback)
+- Bulk ingestion: batched duplicate lookup, CRS upserts and executemany inserts
+  in chunked transactions, idempotent on replayed (text, timestamp) hashes
+- Insert hooks so derived data (embeddings, indexes) is written in the same transaction
+- Encoder run before the transaction, so model inference never holds the write lock
+- Idempotent on the hash: re-ingesting a stored hash returns the stored complaint
+  (and on the voice job ID, for a voice job that is run twice)
+"""
+
+import logging
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Encoder signature: (texts, citizen_ids) -> one vector per text, or None.
+# Runs before the ingest transaction; its vectors are passed to the duplicate
+# detectors and insert hooks.
+Encoder = Callable[[List[str], List[str]], Optional[Sequence]]
+
+# Duplicate detector signature: (text, citizen_id, vector) -> (is_duplicate, duplicate_id)
+DuplicateDetector = Callable[[str, str, Optional[object]], Tuple[bool, Optional[int]]]
+
+# Batch duplicate detector signature: (texts, citizen_ids, vectors) -> one match per item.
+# A match is None, ('complaint', complaint_id) or ('batch', earlier_item_index).
+BatchDuplicateDetector = Callable[[List[str], List[str], Optional[List]], List[Optional[Tuple[str, int]]]]
+
+# Insert hook signature: (conn, complaints) -> None. Each complaint is a dict with
+# id, text, citizen_id, category, urgency, status, timestamp, is_duplicate and
+# vector (from the encoder, None without one).
+InsertHook = Callable[[sqlite3.Connection, List[Dict]], None]
+
+
+class ComplaintIngestor:
+    """
+    Pipeline object that persists a classified complaint atomically
+    """
+
+    # CRS (Citizen Rating System) settings
+    CRS_DEFAULT_SCORE = 100
+    CRS_MAX_SCORE = 100
+    CRS_MIN_SCORE = 0
+    CRS_PENALTY_INVALID = 10
+    CRS_PENALTY_DUPLICATE = 5
+    CRS_REWARD_VALID = 1
+
+    # Duplicate lookback window for the exact-match fallback
+    DUPLICATE_CHECK_DAYS = 30
+
+    # Rows written per bulk transaction (also bounds SQL IN (...) list sizes)
+    BULK_CHUNK_SIZE = 500
+
+    def __init__(self, duplicate_detector: Optional[DuplicateDetector] = None,
+                 batch_duplicate_detector: Optional[BatchDuplicateDetector] = None,
+                 encoder: Optional[Encoder] = None):
+        """
+        Initialize the ingestor
+
+        Args:
+            duplicate_detector: Callable used for the duplicate lookup. It runs on
+                                the pooled connection, inside the ingest transaction.
+            batch_duplicate_detector: Callable used by ingest_many for one-pass
+                                      duplicate lookup over a whole chunk.
+            encoder: Callable computing complaint vectors before the transaction
+        """
+        logger.info("Initializing ComplaintIngestor")
+        self.db_pool = get_db_pool(DB_PATH)
+        self.duplicate_detector = duplicate_detector or self._find_exact_duplicate
+        self.batch_duplicate_detector = batch_duplicate_detector or self.find_exact_duplicates
+        self.encoder = encoder
+        self.insert_hooks: List[InsertHook] = []
+
+    def add_insert_hook(self, hook: InsertHook):
+        """
+        Register a callable run after every insert, inside the ingest transaction
+
+        Args:
+            hook: Callable receiving the connection and the inserted complaints
+        """
+        if hook not in self.insert_hooks:
+            self.insert_hooks.append(hook)
+
+    def _encode(self, texts: List[str], citizen_ids: List[str]) -> List[Optional[object]]:
+        """Vectors for texts, computed outside any transaction (None each without an encoder)"""
+        vectors = None
+        if self.encoder is not None:
+            try:
+                vectors = self.encoder(texts, citizen_ids)
+            except Exception as e:
+                logger.warning(f"Complaint encoder error: {str(e)}")
+        return list(vectors) if vectors is not None else [None] * len(texts)
+
+    def _run_insert_hooks(self, conn: sqlite3.Connection, complaints: List[Dict]):
+        """Run registered insert hooks; a failing hook rolls back the insert"""
+        for hook in self.insert_hooks:
+            hook(conn, complaints)
+
+    def ingest(self, text: str, citizen_id: str, category: str, urgency: str,
+               is_valid: bool = True, timestamp: Optional[str] = None,
+               hash_value: Optional[str] = None, duplicate_invalidates: bool = False,
+               voice_job_id: Optional[str] = None) -> Dict:
+        """
+        Run duplicate lookup, CRS upsert and complaint insert as one transaction
+
+        If a complaint with the same hash (a retried request) or the same
+        voice job ID (a re-claimed job, whose transcript and timestamp may
+        differ) is already stored, it is returned with 'already_ingested' set
+        and nothing is written.
+
+        Args:
+            text: Complaint text
+            citizen_id: Citizen ID
+            category: Complaint category (already classified)
+            urgency: Urgency level (already detected)
+            is_valid: Whether the complaint passed context validation
+            timestamp: Complaint timestamp (defaults to now)
+            hash_value: Blockchain hash (defaults to SHA256 of text + timestamp)
+            duplicate_invalidates: Store a duplicate as invalid, charge it the
+                                   invalid penalty and keep status 'Pending'
+                                   (the /submit_complaint contract)
+            voice_job_id: Voice job the complaint was transcribed by
+
+        Returns:
+            Dictionary with ingestion results
+        """
+        try:
+            if timestamp is None:
+                timestamp = datetime.now().isoformat()
+            if hash_value is None:
+                hash_value = self._generate_hash(text, timestamp)
+
+            # Model inference happens before the write lock is taken
+            vector = self._encode([text], [citizen_id])[0]
+
+            with self.db_pool.transaction() as conn:
+                existing = self._find_by_hash(conn, hash_value)
+                if existing is None and voice_job_id is not None:
+                    existing = self._find_stored(conn, 'voice_job_id = ?', voice_job_id)
+                if existing is not None:
+                    logger.info(f"Complaint already ingested: ID={existing['complaint_id']}")
+                    return existing
+
+                is_duplicate, duplicate_id = self.duplicate_detector(text, citizen_id, vector)
+
+                if duplicate_invalidates:
+                    is_valid = is_valid and not is_duplicate
+
+                crs_score = self.apply_crs_update(citizen_id, is_valid, is_duplicate)
+
+                if duplicate_invalidates:
+                    status = 'Pending'
+                elif not is_valid:
+                    status = 'Invalid'
+                elif is_duplicate:
+                    status = 'Duplicate'
+                else:
+                    status = 'Pending'
+
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO complaints
+                    (text, category, urgency, citizen_id, crs_score, hash, timestamp,
+                     status, is_duplicate, is_valid, voice_job_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (text, category, urgency, citizen_id, crs_score, hash_value,
+                      timestamp, status, is_duplicate, is_valid, voice_job_id))
+
+                complaint_id = cursor.lastrowid
+
+                self._run_insert_hooks(conn, [{
+                    'id': complaint_id,
+                    'text': text,
+                    'citizen_id': citizen_id,
+                    'category': category,
+                    'urgency': urgency,
+                    'status': status,
+                    'timestamp': timestamp,
+                    'is_duplicate': is_duplicate,
+                    'vector': vector
+                }])
+
+            logger.info(f"Complaint ingested: ID={complaint_id}, Citizen={citizen_id}, Status={status}")
+
+            return {
+                'success': True,
+                'complaint_id': complaint_id,
+                'category': category,
+                'urgency': urgency,
+                'status': status,
+                'crs_score': crs_score,
+                'hash': hash_value,
+                'timestamp': timestamp,
+                'is_valid': is_valid,
+                'is_duplicate': is_duplicate,
+                'duplicate_id': duplicate_id
+            }
+
+        except Exception as e:
+            logger.error(f"Complaint ingestion error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def ingest_many(self, items: List[Dict], chunk_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Ingest many complaints, one transaction per chunk
+
+        Each item is a dictionary with text, citizen_id, category, urgency and
+        optionally is_valid, timestamp and hash. Items whose hash is already
+        stored (a replayed offline sync) are reported as already ingested
+        instead of failing the chunk.
+
+        Args:
+            items: Classified complaints to persist
+            chunk_size: Rows per transaction (defaults to BULK_CHUNK_SIZE)
+
+        Yields:
+            One result dictionary per item, in input order
+        """
+        chunk_size = chunk_size or self.BULK_CHUNK_SIZE
+
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                results = self._ingest_chunk(chunk)
+            except Exception as e:
+                logger.error(f"Bulk ingestion chunk error: {str(e)}")
+                results = [{'success': False, 'error': str(e)} for _ in chunk]
+
+            for result in results:
+                yield result
+
+    def _ingest_chunk(self, chunk: List[Dict]) -> List[Dict]:
+        """
+        Persist one chunk of complaints in a single transaction
+
+        Args:
+            chunk: Classified complaints
+
+        Returns:
+            List of per-item results
+        """
+        rows = []
+        for item in chunk:
+            timestamp = item.get('timestamp') or datetime.now().isoformat()
+            rows.append({
+                'text': item['text'],
+                'citizen_id': item['citizen_id'],
+                'category': item['category'],
+                'urgency': item['urgency'],
+                'is_valid': item.get('is_valid', True),
+                'timestamp': timestamp,
+                'hash': item.get('hash') or self._generate_hash(item['text'], timestamp)
+            })
+
+        results: List[Optional[Dict]] = [None] * len(rows)
+
+        # Model inference happens before the write lock is taken
+        vectors = self._encode([row['text'] for row in rows], [row['citizen_id'] for row in rows])
+
+        with self.db_pool.transaction() as conn:
+            cursor = conn.cursor()
+
+            # Replayed items (hash already stored, or repeated within the chunk)
+            hashes = [row['hash'] for row in rows]
+            existing = self._select_in(cursor, 'SELECT hash, id FROM complaints WHERE hash IN ({})', hashes)
+            existing_ids = {row[0]: row[1] for row in existing}
+
+            pending = []
+            seen_hashes = set()
+            for i, row in enumerate(rows):
+                if row['hash'] in existing_ids or row['hash'] in seen_hashes:
+                    results[i] = {
+                        'success': True,
+                        'already_ingested': True,
+                        'complaint_id': existing_ids.get(row['hash']),
+                        'hash': row['hash']
+                    }
+                else:
+                    seen_hashes.add(row['hash'])
+                    pending.append(i)
+
+            if pending:
+                # One-pass duplicate lookup against the DB and within the chunk
+                matches = self.batch_duplicate_detector(
+                    [rows[i]['text'] for i in pending],
+                    [rows[i]['citizen_id'] for i in pending],
+                    [vectors[i] for i in pending] if vectors[0] is not None else None
+                )
+
+                # Current CRS scores, then sequential updates in memory
+                citizen_ids = list({rows[i]['citizen_id'] for i in pending})
+                scores = {
+                    row[0]: row[1] for row in self._select_in(
+                        cursor, 'SELECT id, crs_score FROM citizens WHERE id IN ({})', citizen_ids
+                    )
+                }
+
+                for position, i in enumerate(pending):
+                    row = rows[i]
+                    match = matches[position]
+                    row['is_duplicate'] = match is not None
+                    row['duplicate_ref'] = match
+
+                    score = scores.get(row['citizen_id'], self.CRS_DEFAULT_SCORE)
+                    score += self._crs_delta(row['is_valid'], row['is_duplicate'])
+                    score = max(self.CRS_MIN_SCORE, min(self.CRS_MAX_SCORE, score))
+                    scores[row['citizen_id']] = score
+                    row['crs_score'] = score
+
+                    if not row['is_valid']:
+                        row['status'] = 'Invalid'
+                    elif row['is_duplicate']:
+                        row['status'] = 'Duplicate'
+                    else:
+                        row['status'] = 'Pending'
+
+                cursor.executemany('''
+                    INSERT INTO citizens (id, crs_score)
+                    VALUES (?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        crs_score = excluded.crs_score,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', [(citizen_id, scores[citizen_id]) for citizen_id in citizen_ids])
+
+                cursor.executemany('''
+                    INSERT INTO complaints
+                    (text, category, urgency, citizen_id, crs_score, hash, timestamp,
+                     status, is_duplicate, is_valid)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(rows[i]['text'], rows[i]['category'], rows[i]['urgency'], rows[i]['citizen_id'],
+                       rows[i]['crs_score'], rows[i]['hash'], rows[i]['timestamp'], rows[i]['status'],
+                       rows[i]['is_duplicate'], rows[i]['is_valid']) for i in pending])
+
+                inserted = self._select_in(
+                    cursor, 'SELECT hash, id FROM complaints WHERE hash IN ({})',
+                    [rows[i]['hash'] for i in pending]
+                )
+                inserted_ids = {row[0]: row[1] for row in inserted}
+
+                self._run_insert_hooks(conn, [{
+                    'id': inserted_ids[rows[i]['hash']],
+                    'text': rows[i]['text'],
+                    'citizen_id': rows[i]['citizen_id'],
+                    'category': rows[i]['category'],
+                    'urgency': rows[i]['urgency'],
+                    'status': rows[i]['status'],
+                    'timestamp': rows[i]['timestamp'],
+                    'is_duplicate': rows[i]['is_duplicate'],
+                    'vector': vectors[i]
+                } for i in pending])
+
+                for position, i in enumerate(pending):
+                    row = rows[i]
+                    duplicate_id = None
+                    if row['duplicate_ref'] is not None:
+                        kind, ref = row['duplicate_ref']
+                        duplicate_id = ref if kind == 'complaint' else inserted_ids[rows[pending[ref]]['hash']]
+
+                    results[i] = {
+                        'success': True,
+                        'complaint_id': inserted_ids[row['hash']],
+                        'category': row['category'],
+                        'urgency': row['urgency'],
+                        'status': row['status'],
+                        'crs_score': row['crs_score'],
+                        'hash': row['hash'],
+                        'timestamp': row['timestamp'],
+                        'is_valid': row['is_valid'],
+                        'is_duplicate': row['is_duplicate'],
+                        'duplicate_id': duplicate_id
+                    }
+
+        # Replays repeated within the chunk point at the row inserted above
+        for i, result in enumerate(results):
+            if result.get('already_ingested') and result['complaint_id'] is None:
+                result['complaint_id'] = next(
+                    r['complaint_id'] for r in results
+                    if r.get('hash') == result['hash'] and not r.get('already_ingested')
+                )
+
+        logger.info(f"Bulk chunk ingested: {len(rows)} items, {len(pending)} new")
+        return results
+
+    def _find_by_hash(self, conn: sqlite3.Connection, hash_value: str) -> Optional[Dict]:
+        """Ingestion result of an already stored complaint, or None"""
+        return self._find_stored(conn, 'hash = ?', hash_value)
+
+    def _find_stored(self, conn: sqlite3.Connection, condition: str, value) -> Optional[Dict]:
+        """Ingestion result of the stored complaint matching condition, or None"""
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, category, urgency, status, crs_score, timestamp, is_valid, is_duplicate, hash
+            FROM complaints WHERE {condition}
+        ''', (value,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        return {
+            'success': True,
+            'already_ingested': True,
+            'complaint_id': row[0],
+            'category': row[1],
+            'urgency': row[2],
+            'status': row[3],
+            'crs_score': row[4],
+            'hash': row[8],
+            'timestamp': row[5],
+            'is_valid': bool(row[6]),
+            'is_duplicate': bool(row[7]),
+            'duplicate_id': None
+        }
+
+    def find_exact_duplicates(self, texts: List[str], citizen_ids: List[str],
+                              vectors: Optional[List] = None) -> List[Optional[Tuple[str, int]]]:
+        """
+        Batch fallback duplicate lookup: case-insensitive exact match
+
+        Checks recent complaints of all citizens in one query, then earlier
+        items of the same batch.
+
+        Args:
+            texts: Complaint texts
+            citizen_ids: Citizen ID for each text
+            vectors: Unused (encoder output)
+
+        Returns:
+            One match per item: None, ('complaint', id) or ('batch', index)
+        """
+        cursor = self.db_pool.connection().cursor()
+        recent = self._select_in(
+            cursor,
+            f"SELECT id, citizen_id, text FROM complaints "
+            f"WHERE timestamp > datetime('now', '-{self.DUPLICATE_CHECK_DAYS} days') AND citizen_id IN ({{}})",
+            list(set(citizen_ids))
+        )
+
+        known: Dict[Tuple[str, str], Tuple[str, int]] = {}
+        for complaint_id, citizen_id, text in recent:
+            known.setdefault((citizen_id, text.lower()), ('complaint', complaint_id))
+
+        matches = []
+        for i, (text, citizen_id) in enumerate(zip(texts, citizen_ids)):
+            key = (citizen_id, text.lower())
+            matches.append(known.get(key))
+            known.setdefault(key, ('batch', i))
+        return matches
+
+    def _select_in(self, cursor, query: str, values: List) -> List:
+        """
+        Run a query with an IN (...) placeholder list
+
+        Args:
+            cursor: Database cursor
+            query: SQL with a single '{}' where the placeholders go
+            values: Values for the IN list
+
+        Returns:
+            Fetched rows
+        """
+        if not values:
+            return []
+        cursor.execute(query.format(', '.join('?' * len(values))), values)
+        return cursor.fetchall()
+
+    def _crs_delta(self, is_valid: bool, is_duplicate: bool) -> int:
+        """
+        CRS change for one complaint
+
+        Args:
+            is_valid: Whether the complaint was valid
+            is_duplicate: Whether the complaint was a duplicate
+
+        Returns:
+            Score delta
+        """
+        if not is_valid:
+            return -self.CRS_PENALTY_INVALID
+        if is_duplicate:
+            return -self.CRS_PENALTY_DUPLICATE
+        return self.CRS_REWARD_VALID
+
+    def apply_crs_update(self, citizen_id: str, is_valid: bool, is_duplicate: bool) -> int:
+        """
+        Upsert the citizen's CRS score in a single statement
+
+        Joins the caller's transaction when there is one.
+
+        Args:
+            citizen_id: Citizen ID
+            is_valid: Whether the complaint was valid
+            is_duplicate: Whether the complaint was a duplicate
+
+        Returns:
+            Updated CRS score
+        """
+        delta = self._crs_delta(is_valid, is_duplicate)
+
+        with self.db_pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO citizens (id, crs_score)
+                VALUES (?, MAX(?, MIN(?, ? + ?)))
+                ON CONFLICT(id) DO UPDATE SET
+                    crs_score = MAX(?, MIN(?, citizens.crs_score + ?)),
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (citizen_id,
+                  self.CRS_MIN_SCORE, self.CRS_MAX_SCORE, self.CRS_DEFAULT_SCORE, delta,
+                  self.CRS_MIN_SCORE, self.CRS_MAX_SCORE, delta))
+
+            cursor.execute('SELECT crs_score FROM citizens WHERE id = ?', (citizen_id,))
+            return cursor.fetchone()[0]
+
+    def _find_exact_duplicate(self, text: str, citizen_id: str,
+                              vector: Optional[object] = None) -> Tuple[bool, Optional[int]]:
+        """
+        Fallback duplicate lookup: case-insensitive exact match on recent complaints
+
+        Args:
+            text: Complaint text
+            citizen_id: Citizen ID
+            vector: Unused (encoder output)
+
+        Returns:
+            Tuple of (is_duplicate, duplicate_id)
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT id FROM complaints
+            WHERE citizen_id = ? AND timestamp > datetime('now', ?) AND lower(text) = lower(?)
+            LIMIT 1
+        ''', (citizen_id, f'-{self.DUPLICATE_CHECK_DAYS} days', text))
+
+        row = cursor.fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def _generate_hash(self, text: str, timestamp: str) -> str:
+        """
+        Generate SHA256 hash for blockchain simulation
+
+        Args:
+            text: Complaint text
+            timestamp: Timestamp
+
+        Returns:
+            Hash string
+        """
+        data = f"{text}{timestamp}"
+        return hashlib.sha256(data.encode()).hexdigest()
+
+# Singleton instance
+_complaint_ingestor_instance = None
+
+def get_complaint_ingestor(duplicate_detector: Optional[DuplicateDetector] = None,
+                           batch_duplicate_detector: Optional[BatchDuplicateDetector] = None,
+                           encoder: Optional[Encoder] = None) -> ComplaintIngestor:
+    """
+    Get singleton instance of ComplaintIngestor
+
+    Args:
+        duplicate_detector: Optional detector to install on the shared instance
+        batch_duplicate_detector: Optional batch detector to install on the shared instance
+        encoder: Optional encoder to install on the shared instance
+
+    Returns:
+        ComplaintIngestor instance
+    """
+    global _complaint_ingestor_instance
+
+    if _complaint_ingestor_instance is None:
+        _complaint_ingestor_instance = ComplaintIngestor(duplicate_detector, batch_duplicate_detector, encoder)
+    else:
+        if duplicate_detector is not None:
+            _complaint_ingestor_instance.duplicate_detector = duplicate_detector
+        if batch_duplicate_detector is not None:
+            _complaint_ingestor_instance.batch_duplicate_detector = batch_duplicate_detector
+        if encoder is not None:
+            _complaint_ingestor_instance.encoder = encoder
+
+    return _complaint_ingestor_instance
@@ -10,9 +10,9 @@ Features:
 """
 
 import logging
-import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional
+from utils.db_pool import get_db_pool
 import hashlib
 import secrets
 
@@ -29,69 +29,68 @@ class CSCAgentService:
     def __init__(self):
         """Initialize the CSC/Agent service"""
         logger.info("Initializing CSCAgentService")
+        self.db_pool = get_db_pool(DB_PATH)
         self._ensure_tables_exist()
     
     def _ensure_tables_exist(self):
         """Ensure required database tables exist"""
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            # Create CSC table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS cscs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    location TEXT NOT NULL,
-                    district TEXT NOT NULL,
-                    state TEXT NOT NULL,
-                    pincode TEXT,
-                    contact_person TEXT,
-                    phone TEXT,
-                    email TEXT,
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create agents table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS agents (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    csc_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    phone TEXT NOT NULL,
-                    email TEXT,
-                    employee_id TEXT UNIQUE,
-                    password_hash TEXT NOT NULL,
-                    role TEXT DEFAULT 'agent',
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (csc_id) REFERENCES cscs (id)
-                )
-            ''')
-            
-            # Create kiosk_sessions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS kiosk_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    csc_id INTEGER NOT NULL,
-                    agent_id INTEGER,
-                    session_token TEXT UNIQUE,
-                    ip_address TEXT,
-                    user_agent TEXT,
-                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    ended_at TIMESTAMP,
-                    status TEXT DEFAULT 'active',
-                    FOREIGN KEY (csc_id) REFERENCES cscs (id),
-                    FOREIGN KEY (agent_id) REFERENCES agents (id)
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Create CSC table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS cscs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        location TEXT NOT NULL,
+                        district TEXT NOT NULL,
+                        state TEXT NOT NULL,
+                        pincode TEXT,
+                        contact_person TEXT,
+                        phone TEXT,
+                        email TEXT,
+                        status TEXT DEFAULT 'active',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                
+                # Create agents table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS agents (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        csc_id INTEGER NOT NULL,
+                        name TEXT NOT NULL,
+                        phone TEXT NOT NULL,
+                        email TEXT,
+                        employee_id TEXT UNIQUE,
+                        password_hash TEXT NOT NULL,
+                        role TEXT DEFAULT 'agent',
+                        status TEXT DEFAULT 'active',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (csc_id) REFERENCES cscs (id)
+                    )
+                ''')
+                
+                # Create kiosk_sessions table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS kiosk_sessions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        csc_id INTEGER NOT NULL,
+                        agent_id INTEGER,
+                        session_token TEXT UNIQUE,
+                        ip_address TEXT,
+                        user_agent TEXT,
+                        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        ended_at TIMESTAMP,
+                        status TEXT DEFAULT 'active',
+                        FOREIGN KEY (csc_id) REFERENCES cscs (id),
+                        FOREIGN KEY (agent_id) REFERENCES agents (id)
+                    )
+                ''')
+                
             logger.info("CSC/Agent tables ensured")
             
         except Exception as e:
@@ -109,27 +108,25 @@ class CSCAgentService:
             Dictionary with registration results
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO cscs 
-                (name, location, district, state, pincode, contact_person, phone, email)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                csc_data.get('name'),
-                csc_data.get('location'),
-                csc_data.get('district'),
-                csc_data.get('state'),
-                csc_data.get('pincode'),
-                csc_data.get('contact_person'),
-                csc_data.get('phone'),
-                csc_data.get('email')
-            ))
-            
-            csc_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO cscs 
+                    (name, location, district, state, pincode, contact_person, phone, email)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    csc_data.get('name'),
+                    csc_data.get('location'),
+                    csc_data.get('district'),
+                    csc_data.get('state'),
+                    csc_data.get('pincode'),
+                    csc_data.get('contact_person'),
+                    csc_data.get('phone'),
+                    csc_data.get('email')
+                ))
+                
+                csc_id = cursor.lastrowid
             
             logger.info(f"CSC registered with ID: {csc_id}")
             return {
@@ -159,26 +156,24 @@ class CSCAgentService:
             # Hash password
             password_hash = self._hash_password(agent_data.get('password', ''))
             
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO agents 
-                (csc_id, name, phone, email, employee_id, password_hash, role)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                agent_data.get('csc_id'),
-                agent_data.get('name'),
-                agent_data.get('phone'),
-                agent_data.get('email'),
-                agent_data.get('employee_id'),
-                password_hash,
-                agent_data.get('role', 'agent')
-            ))
-            
-            agent_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO agents 
+                    (csc_id, name, phone, email, employee_id, password_hash, role)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    agent_data.get('csc_id'),
+                    agent_data.get('name'),
+                    agent_data.get('phone'),
+                    agent_data.get('email'),
+                    agent_data.get('employee_id'),
+                    password_hash,
+                    agent_data.get('role', 'agent')
+                ))
+                
+                agent_id = cursor.lastrowid
             
             logger.info(f"Agent registered with ID: {agent_id}")
             return {
@@ -206,7 +201,7 @@ class CSCAgentService:
             Dictionary with authentication results
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -216,7 +211,6 @@ class CSCAgentService:
             ''', (employee_id,))
             
             agent = cursor.fetchone()
-            conn.close()
             
             if not agent:
                 return {
@@ -275,18 +269,16 @@ class CSCAgentService:
             # Generate session token
             session_token = secrets.token_urlsafe(32)
             
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO kiosk_sessions 
-                (csc_id, agent_id, session_token, ip_address, user_agent)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (csc_id, agent_id, session_token, ip_address, user_agent))
-            
-            session_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO kiosk_sessions 
+                    (csc_id, agent_id, session_token, ip_address, user_agent)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (csc_id, agent_id, session_token, ip_address, user_agent))
+                
+                session_id = cursor.lastrowid
             
             logger.info(f"Kiosk session started: {session_id}")
             return {
@@ -314,7 +306,7 @@ class CSCAgentService:
             Dictionary with CSC information
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -324,7 +316,6 @@ class CSCAgentService:
             ''', (csc_id,))
             
             csc = cursor.fetchone()
-            conn.close()
             
             if not csc:
                 return {
@@ -368,7 +359,7 @@ class CSCAgentService:
             Dictionary with agents list
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -378,7 +369,6 @@ class CSCAgentService:
             ''', (csc_id,))
             
             agents = cursor.fetchall()
-            conn.close()
             
             agents_list = []
             for agent in agents:
@@ -0,0 +1,306 @@
+"""
+GramSetu AI - Dashboard Rollups
+Materialized complaint counts, maintained incrementally
+
+Features:
+- Counts by status, category, urgency and day, plus duplicates and total
+- Per-field-worker assigned and resolved counts
+- Updated in the same transaction as complaint inserts (insert hook),
+  status changes and assignment changes, so they never drift from a
+  committed write
+- Dashboards read O(categories) rows instead of scanning complaints
+- Full rebuild for backfill and repair (python -m services.dashboard_rollups --rebuild)
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import Dict, List, Optional
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+
+class DashboardRollups:
+    """
+    Incrementally maintained aggregates over complaints and assignments
+    """
+
+    # Complaint dimensions kept in complaint_rollups
+    DIMENSIONS = ('total', 'status', 'category', 'urgency', 'day', 'duplicate')
+
+    def __init__(self):
+        """Initialize the rollups, backfilling them on first use"""
+        logger.info("Initializing DashboardRollups")
+        self.db_pool = get_db_pool(DB_PATH)
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the rollup tables exist and are populated"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS complaint_rollups (
+                        dimension TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        count INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (dimension, key)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS worker_rollups (
+                        field_worker_id TEXT PRIMARY KEY,
+                        assigned_count INTEGER NOT NULL DEFAULT 0,
+                        resolved_count INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+
+                # First run against an existing database: backfill
+                cursor.execute("SELECT 1 FROM complaint_rollups WHERE dimension = 'total'")
+                if cursor.fetchone() is None:
+                    self._rebuild(conn)
+            logger.info("Dashboard rollup tables ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring dashboard rollup tables: {str(e)}")
+
+    @staticmethod
+    def _complaint_keys(complaint: Dict) -> List[tuple]:
+        """(dimension, key) pairs a complaint counts towards"""
+        keys = [
+            ('total', ''),
+            ('status', complaint.get('status') or ''),
+            ('category', complaint.get('category') or ''),
+            ('urgency', complaint.get('urgency') or ''),
+            ('day', str(complaint.get('timestamp') or '')[:10])
+        ]
+        if complaint.get('is_duplicate'):
+            keys.append(('duplicate', ''))
+        return keys
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, deltas: Dict[tuple, int]):
+        """Apply count deltas per (dimension, key)"""
+        conn.executemany('''
+            INSERT INTO complaint_rollups (dimension, key, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(dimension, key) DO UPDATE SET count = count + excluded.count
+        ''', [(dimension, key, delta) for (dimension, key), delta in deltas.items() if delta])
+
+    def on_complaints_inserted(self, conn: sqlite3.Connection, complaints: List[Dict]):
+        """
+        Insert hook for ComplaintIngestor: count new complaints
+
+        Args:
+            conn: Connection of the ingesting transaction
+            complaints: Inserted complaints (id, status, category, urgency,
+                        timestamp, is_duplicate)
+        """
+        deltas: Dict[tuple, int] = {}
+        for complaint in complaints:
+            for key in self._complaint_keys(complaint):
+                deltas[key] = deltas.get(key, 0) + 1
+        self._bump(conn, deltas)
+
+    def on_status_changed(self, conn: sqlite3.Connection, old_status: Optional[str], new_status: Optional[str]):
+        """
+        Move one complaint between status counts
+
+        Args:
+            conn: Connection of the updating transaction
+            old_status: Status before the update
+            new_status: Status after the update
+        """
+        if old_status == new_status:
+            return
+        self._bump(conn, {('status', old_status or ''): -1, ('status', new_status or ''): 1})
+
+    def on_assignment_changed(self, conn: sqlite3.Connection,
+                              old_worker: Optional[str], old_resolved: bool,
+                              new_worker: Optional[str], new_resolved: bool):
+        """
+        Move one assignment between worker counts
+
+        Args:
+            conn: Connection of the updating transaction
+            old_worker: Assigned worker before the change (None if unassigned)
+            old_resolved: Whether the assignment was resolved before
+            new_worker: Assigned worker after the change
+            new_resolved: Whether the assignment is resolved after
+        """
+        deltas: Dict[str, List[int]] = {}
+        if old_worker is not None:
+            delta = deltas.setdefault(old_worker, [0, 0])
+            delta[0] -= 1
+            delta[1] -= int(bool(old_resolved))
+        if new_worker is not None:
+            delta = deltas.setdefault(new_worker, [0, 0])
+            delta[0] += 1
+            delta[1] += int(bool(new_resolved))
+
+        conn.executemany('''
+            INSERT INTO worker_rollups (field_worker_id, assigned_count, resolved_count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(field_worker_id) DO UPDATE SET
+                assigned_count = assigned_count + excluded.assigned_count,
+                resolved_count = resolved_count + excluded.resolved_count
+        ''', [(worker, assigned, resolved) for worker, (assigned, resolved) in deltas.items()
+              if assigned or resolved])
+
+    def _rebuild(self, conn: sqlite3.Connection):
+        """Recompute every rollup from the base tables (inside a transaction)"""
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM complaint_rollups')
+        cursor.execute('DELETE FROM worker_rollups')
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('complaints', 'assignments')")
+        tables = {row[0] for row in cursor.fetchall()}
+
+        if 'complaints' in tables:
+            cursor.execute('''
+                INSERT INTO complaint_rollups (dimension, key, count)
+                SELECT 'total', '', COUNT(*) FROM complaints
+                UNION ALL
+                SELECT 'status', COALESCE(status, ''), COUNT(*) FROM complaints GROUP BY 2
+                UNION ALL
+                SELECT 'category', COALESCE(category, ''), COUNT(*) FROM complaints GROUP BY 2
+                UNION ALL
+                SELECT 'urgency', COALESCE(urgency, ''), COUNT(*) FROM complaints GROUP BY 2
+                UNION ALL
+                SELECT 'day', substr(COALESCE(timestamp, ''), 1, 10), COUNT(*) FROM complaints GROUP BY 2
+                UNION ALL
+                SELECT 'duplicate', '', COUNT(*) FROM complaints WHERE is_duplicate = 1
+            ''')
+
+        if 'assignments' in tables:
+            cursor.execute('''
+                INSERT INTO worker_rollups (field_worker_id, assigned_count, resolved_count)
+                SELECT field_worker_id, COUNT(*), SUM(CASE WHEN resolved_at IS NOT NULL THEN 1 ELSE 0 END)
+                FROM assignments
+                GROUP BY field_worker_id
+            ''')
+
+    def rebuild(self) -> Dict:
+        """
+        Recompute every rollup from complaints and assignments
+
+        Returns:
+            Dictionary with success status and the new total
+        """
+        try:
+            with self.db_pool.transaction() as conn:
+                self._rebuild(conn)
+            logger.info("Dashboard rollups rebuilt")
+            return {'success': True, 'total': self.get_total()}
+
+        except Exception as e:
+            logger.error(f"Error rebuilding dashboard rollups: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    def get_counts(self, dimension: str) -> Dict[Optional[str], int]:
+        """
+        Counts of one dimension, largest first
+
+        Args:
+            dimension: One of DIMENSIONS
+
+        Returns:
+            Dictionary of key (None for missing values) to count
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT key, count FROM complaint_rollups
+            WHERE dimension = ? AND count > 0
+            ORDER BY count DESC
+        ''', (dimension,))
+        return {(row[0] or None): row[1] for row in cursor.fetchall()}
+
+    def get_total(self) -> int:
+        """Total number of complaints"""
+        return self.get_counts('total').get(None, 0)
+
+    def get_status_counts(self) -> Dict[Optional[str], int]:
+        """Complaint counts by status"""
+        return self.get_counts('status')
+
+    def get_category_counts(self) -> Dict[Optional[str], int]:
+        """Complaint counts by category, largest first"""
+        return self.get_counts('category')
+
+    def get_duplicate_count(self) -> int:
+        """Number of complaints flagged as duplicates"""
+        return self.get_counts('duplicate').get(None, 0)
+
+    def get_daily_counts(self, days: Optional[int] = None) -> Dict[str, int]:
+        """
+        Complaints per day, oldest first
+
+        Args:
+            days: Only the most recent days (all if None)
+
+        Returns:
+            Dictionary of 'YYYY-MM-DD' to count
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT key, count FROM complaint_rollups
+            WHERE dimension = 'day' AND count > 0
+            ORDER BY key DESC
+            LIMIT ?
+        ''', (days if days else -1,))
+        return dict(reversed(cursor.fetchall()))
+
+    def get_worker_performance(self) -> List[Dict]:
+        """
+        Assigned and resolved counts per field worker, most resolved first
+
+        Returns:
+            List of dictionaries with id, name, area, assigned_count, resolved_count
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT
+                fw.id, fw.name, fw.area,
+                COALESCE(wr.assigned_count, 0) as assigned_count,
+                COALESCE(wr.resolved_count, 0) as resolved_count
+            FROM field_workers fw
+            LEFT JOIN worker_rollups wr ON fw.id = wr.field_worker_id
+            ORDER BY resolved_count DESC
+        ''')
+        return [
+            {'id': row[0], 'name': row[1], 'area': row[2], 'assigned_count': row[3], 'resolved_count': row[4]}
+            for row in cursor.fetchall()
+        ]
+
+# Singleton instance
+_dashboard_rollups_instance = None
+
+def get_dashboard_rollups() -> DashboardRollups:
+    """
+    Get singleton instance of DashboardRollups
+
+    Returns:
+        DashboardRollups instance
+    """
+    global _dashboard_rollups_instance
+
+    if _dashboard_rollups_instance is None:
+        _dashboard_rollups_instance = DashboardRollups()
+
+    return _dashboard_rollups_instance
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GramSetu dashboard rollups')
+    parser.add_argument('--rebuild', action='store_true', help='recompute all rollups from the base tables')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    rollups = get_dashboard_rollups()
+    if args.rebuild:
+        print(rollups.rebuild())
+    print({dimension: rollups.get_counts(dimension) for dimension in DashboardRollups.DIMENSIONS})
@@ -0,0 +1,492 @@
+"""
+GramSetu AI - Complaint Embedding Store
+Persistent sentence embeddings for duplicate detection
+
+Features:
+- One MiniLM embedding per complaint, computed once at insert time
+- Rows tagged with model and inference backend, so ONNX and PyTorch vectors
+  are never compared with each other
+- float32 BLOBs in a sidecar table (complaint_embeddings)
+- Vectorized duplicate check: one dot product against the citizen's matrix
+- prepare() encodes new complaints and backfills history before the ingest
+  transaction, so no forward pass runs under the write lock
+- Resumable backfill job for complaints stored before the sidecar existed
+
+Usage (backfill):
+    python -m services.embedding_store --batch-size 256
+"""
+
+import argparse
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.db_pool import get_db_pool
+
+# NumPy is optional - without it the store reports itself unavailable
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Model loader signature: () -> SentenceTransformer or None
+ModelLoader = Callable[[], Optional[object]]
+
+
+class EmbeddingStore:
+    """
+    Sidecar store of normalized complaint embeddings
+    """
+
+    MODEL_NAME = 'all-MiniLM-L6-v2'
+    DIMENSION = 384
+
+    # Cosine similarity above which two complaints are duplicates
+    DUPLICATE_THRESHOLD = 0.9
+    DUPLICATE_CHECK_DAYS = 30
+
+    ENCODE_BATCH_SIZE = 32
+    BACKFILL_BATCH_SIZE = 256
+
+    # Recently encoded texts, so the duplicate check and the insert hook
+    # share one forward pass per complaint
+    ENCODE_MEMO_SIZE = 512
+
+    def __init__(self, model_loader: Optional[ModelLoader] = None):
+        """
+        Initialize the embedding store
+
+        Args:
+            model_loader: Callable returning the sentence model (app.py passes its
+                          lazy loader so the model is shared). Defaults to loading
+                          MODEL_NAME on first use.
+        """
+        logger.info("Initializing EmbeddingStore")
+        self.db_pool = get_db_pool(DB_PATH)
+        self.model_loader = model_loader or self._load_default_model
+        self._model = None
+        self._memo: 'OrderedDict[str, object]' = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the embedding sidecar table exists"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS complaint_embeddings (
+                        complaint_id INTEGER PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        embedding BLOB NOT NULL,  -- little-endian float32, L2-normalized
+                        seq INTEGER,  -- write order, lets derived indexes sync incrementally
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+
+                # Tables created before the seq column existed
+                cursor.execute('PRAGMA table_info(complaint_embeddings)')
+                if 'seq' not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute('ALTER TABLE complaint_embeddings ADD COLUMN seq INTEGER')
+                    cursor.execute('UPDATE complaint_embeddings SET seq = complaint_id')
+
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_seq ON complaint_embeddings(seq)')
+            logger.info("Embedding tables ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring embedding tables: {str(e)}")
+            raise
+
+    def _load_default_model(self):
+        """Load the sentence model when no loader was supplied"""
+        if self._model is None:
+            try:
+                from services.onnx_backend import onnx_enabled, load_sentence_encoder
+                if onnx_enabled():
+                    self._model = load_sentence_encoder(self.MODEL_NAME)
+                else:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.MODEL_NAME)
+            except Exception as e:
+                logger.warning(f"Sentence model not available: {str(e)}")
+        return self._model
+
+    def model_tag(self) -> str:
+        """
+        Tag stored with each embedding: the model name, plus the backend when
+        it is not PyTorch (rows written before backends were tagged are torch)
+        """
+        from services.onnx_backend import backend_tag
+
+        backend = backend_tag(self.model_loader())
+        return self.MODEL_NAME if backend == 'torch' else f"{self.MODEL_NAME}:{backend}"
+
+    def is_available(self) -> bool:
+        """Whether embeddings can be computed in this process"""
+        return np is not None and self.model_loader() is not None
+
+    def encode(self, texts: List[str]):
+        """
+        Encode texts into normalized float32 vectors
+
+        Args:
+            texts: Texts to encode
+
+        Returns:
+            (len(texts), DIMENSION) array, or None if no model is available
+        """
+        model = self.model_loader()
+        if model is None or np is None:
+            return None
+        if not texts:
+            return np.zeros((0, self.DIMENSION), dtype=np.float32)
+
+        with self._memo_lock:
+            known = {text: self._memo[text] for text in texts if text in self._memo}
+        missing = list(dict.fromkeys(text for text in texts if text not in known))
+
+        if missing:
+            vectors = model.encode(missing, batch_size=self.ENCODE_BATCH_SIZE,
+                                   normalize_embeddings=True, convert_to_numpy=True)
+            vectors = np.asarray(vectors, dtype=np.float32)
+            known.update(zip(missing, vectors))
+            with self._memo_lock:
+                for text, vector in zip(missing, vectors):
+                    self._memo[text] = vector
+                while len(self._memo) > self.ENCODE_MEMO_SIZE:
+                    self._memo.popitem(last=False)
+
+        return np.stack([known[text] for text in texts])
+
+    def store(self, conn: sqlite3.Connection, complaint_ids: List[int], vectors):
+        """
+        Write embeddings for complaints (inside the caller's transaction)
+
+        Args:
+            conn: Connection with an open transaction
+            complaint_ids: Complaint IDs
+            vectors: Matching (n, DIMENSION) array
+        """
+        model_tag = self.model_tag()
+        conn.executemany('''
+            INSERT OR REPLACE INTO complaint_embeddings (complaint_id, model, embedding, seq)
+            VALUES (?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM complaint_embeddings))
+        ''', [(complaint_id, model_tag, self._to_blob(vector))
+              for complaint_id, vector in zip(complaint_ids, vectors)])
+
+    def on_complaints_inserted(self, conn: sqlite3.Connection, complaints: List[Dict]):
+        """
+        ComplaintIngestor insert hook: embed and store new complaints
+
+        Uses the vectors computed by prepare() before the transaction; encodes
+        only if the ingestor had no encoder. Failures are logged rather than
+        raised, the complaint itself is kept and the backfill job (or the next
+        duplicate check) fills the gap.
+        """
+        try:
+            if all(complaint.get('vector') is not None for complaint in complaints):
+                vectors = [complaint['vector'] for complaint in complaints]
+            else:
+                vectors = self.encode([complaint['text'] for complaint in complaints])
+            if vectors is None:
+                return
+            self.store(conn, [complaint['id'] for complaint in complaints], vectors)
+        except Exception as e:
+            logger.warning(f"Embedding insert hook error: {str(e)}")
+
+    def prepare(self, texts: List[str], citizen_ids: List[str]):
+        """
+        ComplaintIngestor encoder: everything that needs the model, run before
+        the ingest transaction
+
+        Encodes the new texts and backfills the citizens' recent complaints
+        that have no embedding yet (in its own short transaction).
+
+        Args:
+            texts: New complaint texts
+            citizen_ids: Citizen ID for each text
+
+        Returns:
+            (len(texts), DIMENSION) array, or None if no model is available
+        """
+        vectors = self.encode(texts)
+        if vectors is not None:
+            self.backfill_citizens(citizen_ids)
+        return vectors
+
+    def backfill_citizens(self, citizen_ids: List[str], days: Optional[int] = None) -> int:
+        """
+        Encode and store the citizens' recent complaints that have no embedding
+
+        Args:
+            citizen_ids: Citizen IDs
+            days: Lookback window (defaults to DUPLICATE_CHECK_DAYS)
+
+        Returns:
+            Number of complaints embedded
+        """
+        days = days or self.DUPLICATE_CHECK_DAYS
+        citizen_ids = list(set(citizen_ids))
+        if not citizen_ids:
+            return 0
+
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute(f'''
+            SELECT c.id, c.text
+            FROM complaints c
+            LEFT JOIN complaint_embeddings e
+                ON e.complaint_id = c.id AND e.model = ?
+            WHERE c.timestamp > datetime('now', '-{int(days)} days')
+            AND c.citizen_id IN ({', '.join('?' * len(citizen_ids))})
+            AND e.complaint_id IS NULL
+        ''', [self.model_tag()] + citizen_ids)
+        missing = cursor.fetchall()
+        if not missing:
+            return 0
+
+        vectors = self.encode([row[1] for row in missing])
+        if vectors is None:
+            return 0
+        with self.db_pool.transaction() as conn:
+            self.store(conn, [row[0] for row in missing], vectors)
+        return len(missing)
+
+    def citizen_matrices(self, citizen_ids: List[str], days: Optional[int] = None,
+                         encode_missing: bool = True) -> Dict[str, Tuple[List[int], object]]:
+        """
+        Load the recent embedding matrix of each citizen with one query
+
+        Recent complaints that have no stored embedding yet are encoded and
+        stored on the way (lazy backfill), unless encode_missing is False
+        (prepare() already backfilled them; rows inserted since are skipped).
+
+        Args:
+            citizen_ids: Citizen IDs
+            days: Lookback window (defaults to DUPLICATE_CHECK_DAYS)
+            encode_missing: Encode complaints without a stored embedding
+
+        Returns:
+            Dictionary of citizen_id -> (complaint_ids, (n, DIMENSION) matrix)
+        """
+        days = days or self.DUPLICATE_CHECK_DAYS
+        citizen_ids = list(set(citizen_ids))
+        if not citizen_ids:
+            return {}
+
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute(f'''
+            SELECT c.id, c.citizen_id, c.text, e.embedding
+            FROM complaints c
+            LEFT JOIN complaint_embeddings e
+                ON e.complaint_id = c.id AND e.model = ?
+            WHERE c.timestamp > datetime('now', '-{int(days)} days')
+            AND c.citizen_id IN ({', '.join('?' * len(citizen_ids))})
+            ORDER BY c.id
+        ''', [self.model_tag()] + citizen_ids)
+        rows = cursor.fetchall()
+
+        if not encode_missing:
+            rows = [row for row in rows if row[3] is not None]
+
+        missing = [row for row in rows if row[3] is None]
+        missing_vectors = {}
+        if missing:
+            vectors = self.encode([row[2] for row in missing])
+            with self.db_pool.transaction() as conn:
+                self.store(conn, [row[0] for row in missing], vectors)
+            missing_vectors = {row[0]: vector for row, vector in zip(missing, vectors)}
+
+        grouped: Dict[str, Tuple[List[int], List]] = {}
+        for complaint_id, citizen_id, _, blob in rows:
+            ids, vectors = grouped.setdefault(citizen_id, ([], []))
+            ids.append(complaint_id)
+            vectors.append(self._from_blob(blob) if blob is not None else missing_vectors[complaint_id])
+
+        return {
+            citizen_id: (ids, np.vstack(vectors))
+            for citizen_id, (ids, vectors) in grouped.items()
+        }
+
+    def find_duplicate(self, text: str, citizen_id: str,
+                       vector: Optional[object] = None) -> Optional[Tuple[bool, Optional[int]]]:
+        """
+        Check a complaint against the citizen's stored embeddings
+
+        Args:
+            text: Complaint text
+            citizen_id: Citizen ID
+            vector: Embedding from prepare() (encoded here if None)
+
+        Returns:
+            (is_duplicate, duplicate_id), or None if no model is available
+        """
+        matches = self.find_duplicates_batch([text], [citizen_id], [vector] if vector is not None else None)
+        if matches is None:
+            return None
+        match = matches[0]
+        return (True, match[1]) if match else (False, None)
+
+    def find_duplicates_batch(self, texts: List[str], citizen_ids: List[str],
+                              vectors: Optional[List] = None) -> Optional[List[Optional[Tuple[str, int]]]]:
+        """
+        Check a batch of complaints against stored embeddings and each other
+
+        With vectors from prepare() this runs no model inference, so it is
+        safe inside the ingest transaction.
+
+        Args:
+            texts: Complaint texts
+            citizen_ids: Citizen ID for each text
+            vectors: Embeddings from prepare() (encoded here if None)
+
+        Returns:
+            One match per item: None, ('complaint', id) or ('batch', index);
+            None if no model is available
+        """
+        if vectors is not None and np is not None:
+            query = np.asarray(vectors, dtype=np.float32)
+        else:
+            query = self.encode(texts)
+        if query is None:
+            return None
+
+        history = {
+            citizen_id: ([('complaint', complaint_id) for complaint_id in ids], [matrix])
+            for citizen_id, (ids, matrix) in self.citizen_matrices(
+                citizen_ids, encode_missing=vectors is None).items()
+        }
+
+        matches = []
+        for i, citizen_id in enumerate(citizen_ids):
+            match = None
+            refs, blocks = history.setdefault(citizen_id, ([], []))
+            if refs:
+                if len(blocks) > 1:
+                    blocks[:] = [np.vstack(blocks)]
+                similarities = blocks[0] @ query[i]
+                best = int(np.argmax(similarities))
+                if similarities[best] > self.DUPLICATE_THRESHOLD:
+                    match = refs[best]
+            matches.append(match)
+
+            # Later items of the batch are also checked against this one
+            refs.append(('batch', i))
+            blocks.append(query[i:i + 1])
+
+        return matches
+
+    def backfill(self, batch_size: Optional[int] = None, after_id: int = 0,
+                 max_batches: Optional[int] = None) -> Dict:
+        """
+        Embed stored complaints that have no embedding for the current model
+
+        Each batch commits on its own, so the job can be stopped at any point
+        and re-run; already embedded rows are skipped.
+
+        Args:
+            batch_size: Complaints per batch (defaults to BACKFILL_BATCH_SIZE)
+            after_id: Resume after this complaint ID
+            max_batches: Stop after this many batches
+
+        Returns:
+            Dictionary with backfill progress
+        """
+        batch_size = batch_size or self.BACKFILL_BATCH_SIZE
+        embedded = 0
+        batches = 0
+        last_id = after_id
+
+        try:
+            if not self.is_available():
+                return {
+                    'success': False,
+                    'error': 'Sentence model or NumPy not available'
+                }
+
+            cursor = self.db_pool.connection().cursor()
+            while max_batches is None or batches < max_batches:
+                cursor.execute('''
+                    SELECT c.id, c.text
+                    FROM complaints c
+                    LEFT JOIN complaint_embeddings e
+                        ON e.complaint_id = c.id AND e.model = ?
+                    WHERE c.id > ? AND e.complaint_id IS NULL
+                    ORDER BY c.id
+                    LIMIT ?
+                ''', (self.model_tag(), last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                vectors = self.encode([row[1] for row in rows])
+                with self.db_pool.transaction() as conn:
+                    self.store(conn, [row[0] for row in rows], vectors)
+
+                embedded += len(rows)
+                batches += 1
+                last_id = rows[-1][0]
+                logger.info(f"Embedding backfill: {embedded} complaints embedded (last ID {last_id})")
+
+            return {
+                'success': True,
+                'embedded': embedded,
+                'batches': batches,
+                'last_id': last_id
+            }
+
+        except Exception as e:
+            logger.error(f"Embedding backfill error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'embedded': embedded,
+                'last_id': last_id
+            }
+
+    def _to_blob(self, vector) -> bytes:
+        """Serialize a vector as little-endian float32"""
+        return np.asarray(vector, dtype='<f4').tobytes()
+
+    def _from_blob(self, blob: bytes):
+        """Deserialize a little-endian float32 vector"""
+        return np.frombuffer(blob, dtype='<f4')
+
+# Singleton instance
+_embedding_store_instance = None
+
+def get_embedding_store(model_loader: Optional[ModelLoader] = None) -> EmbeddingStore:
+    """
+    Get singleton instance of EmbeddingStore
+
+    Args:
+        model_loader: Optional model loader to install on the shared instance
+
+    Returns:
+        EmbeddingStore instance
+    """
+    global _embedding_store_instance
+
+    if _embedding_store_instance is None:
+        _embedding_store_instance = EmbeddingStore(model_loader)
+    elif model_loader is not None:
+        _embedding_store_instance.model_loader = model_loader
+
+    return _embedding_store_instance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill complaint embeddings')
+    parser.add_argument('--batch-size', type=int, default=EmbeddingStore.BACKFILL_BATCH_SIZE)
+    parser.add_argument('--after-id', type=int, default=0, help='Resume after this complaint ID')
+    parser.add_argument('--max-batches', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    result = get_embedding_store().backfill(args.batch_size, args.after_id, args.max_batches)
+    print(result)
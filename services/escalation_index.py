@@ -0,0 +1,233 @@
+"""
+GramSetu AI - Escalation Index
+Open complaints ordered by SLA deadline
+
+Features:
+- Partial expression index on open complaints by normalized timestamp
+  (datetime(timestamp)): overdue lookups and "next SLA breach" are index
+  range scans instead of full scans, for both 'T'- and space-separated rows
+- The database is the only source of truth, so every process sees
+  complaints written by every other worker
+- sweep() flags breaches in sla_breaches straight from the index
+  (idempotent; run by the scheduler process every ESCALATION_SWEEP_SECONDS)
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Escalation settings (overridable through the environment)
+ESCALATION_SLA_HOURS = float(os.environ.get('ESCALATION_SLA_HOURS', 72))
+ESCALATION_SWEEP_SECONDS = float(os.environ.get('ESCALATION_SWEEP_SECONDS', 60))
+
+# Statuses that close a complaint (must match the partial index predicate)
+CLOSED_STATUSES = ('Resolved', 'Invalid', 'Duplicate')
+OPEN_PREDICATE = "status NOT IN ('Resolved', 'Invalid', 'Duplicate')"
+
+# Timestamps are stored both as datetime.now().isoformat() ('T' separated)
+# and as CURRENT_TIMESTAMP (space separated); datetime() maps both to one
+# sortable form. Queries must use this exact expression to hit the index.
+DUE_EXPRESSION = 'datetime(timestamp)'
+
+
+class EscalationIndex:
+    """
+    Priority queries over open complaints
+    """
+
+    def __init__(self, sla_hours: float = ESCALATION_SLA_HOURS):
+        """
+        Initialize the index
+
+        Args:
+            sla_hours: Hours an open complaint may wait before it is escalated
+        """
+        logger.info("Initializing EscalationIndex")
+        self.sla_seconds = sla_hours * 3600
+        self.db_pool = get_db_pool(DB_PATH)
+
+        self._loaded = False
+
+        self._ensure_tables_exist()
+
+    @property
+    def _sla_modifier(self) -> str:
+        """datetime() modifier for the SLA"""
+        return f'{self.sla_seconds:+.0f} seconds'
+
+    def _ensure_tables_exist(self):
+        """Ensure the breach table exists"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS sla_breaches (
+                        complaint_id INTEGER PRIMARY KEY,
+                        due_at TIMESTAMP NOT NULL,
+                        flagged_at TIMESTAMP NOT NULL
+                    )
+                ''')
+            logger.info("SLA breach table ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring SLA breach table: {str(e)}")
+
+    def load(self) -> bool:
+        """
+        Create the partial index once the complaints table exists
+
+        Returns:
+            True if the index is in place
+        """
+        if self._loaded:
+            return True
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'complaints'")
+                if cursor.fetchone() is None:
+                    return False
+
+                # Replaced by the normalized index below (raw strings sort
+                # 'T' after ' ' on the same day)
+                cursor.execute('DROP INDEX IF EXISTS idx_complaints_open_timestamp')
+                cursor.execute(f'''
+                    CREATE INDEX IF NOT EXISTS idx_complaints_open_due
+                    ON complaints({DUE_EXPRESSION}) WHERE {OPEN_PREDICATE}
+                ''')
+
+        except Exception as e:
+            logger.error(f"Error loading escalation index: {str(e)}")
+            return False
+
+        self._loaded = True
+        logger.info("Escalation index ready")
+        return True
+
+    def next_breach(self) -> Optional[Dict]:
+        """
+        Open complaint whose SLA runs out next (one index seek)
+
+        Complaints already past their SLA are not included; they are breaches
+        already, flagged by the next sweep.
+
+        Returns:
+            Dictionary with complaint_id and due_at, or None if nothing is pending
+        """
+        if not self.load():
+            return None
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute(f'''
+            SELECT id, datetime({DUE_EXPRESSION}, ?) AS due_at
+            FROM complaints
+            WHERE {OPEN_PREDICATE} AND {DUE_EXPRESSION} >= datetime('now', 'localtime', ?)
+            ORDER BY {DUE_EXPRESSION} ASC
+            LIMIT 1
+        ''', (self._sla_modifier, f'{-self.sla_seconds:+.0f} seconds'))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {'complaint_id': row['id'], 'due_at': row['due_at']}
+
+    def get_overdue(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Open complaints past their SLA, oldest first (partial index range scan)
+
+        Args:
+            limit: Maximum rows (all if None)
+
+        Returns:
+            List of dictionaries with id, text, category, status, timestamp
+        """
+        if not self.load():
+            return []
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute(f'''
+            SELECT id, text, category, status, timestamp
+            FROM complaints
+            WHERE {OPEN_PREDICATE} AND {DUE_EXPRESSION} < datetime('now', 'localtime', ?)
+            ORDER BY {DUE_EXPRESSION} ASC
+            LIMIT ?
+        ''', (f'{-self.sla_seconds:+.0f} seconds', limit if limit else -1))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def sweep(self, on_breach: Optional[Callable] = None) -> int:
+        """
+        Flag every open complaint whose SLA has run out
+
+        One INSERT ... SELECT over the overdue range of the partial index,
+        skipping complaints flagged earlier, so it sees complaints written
+        by every process and running it twice flags nothing new.
+
+        Args:
+            on_breach: Called with (conn) inside the flagging transaction when
+                       anything was flagged
+
+        Returns:
+            Number of complaints flagged
+        """
+        if not self.load():
+            return 0
+
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO sla_breaches (complaint_id, due_at, flagged_at)
+                    SELECT id, datetime({DUE_EXPRESSION}, ?), ?
+                    FROM complaints
+                    WHERE {OPEN_PREDICATE} AND {DUE_EXPRESSION} < datetime('now', 'localtime', ?)
+                      AND id NOT IN (SELECT complaint_id FROM sla_breaches)
+                ''', (self._sla_modifier, datetime.now().isoformat(), f'{-self.sla_seconds:+.0f} seconds'))
+                flagged = cursor.rowcount
+                if flagged and on_breach is not None:
+                    on_breach(conn)
+
+        except Exception as e:
+            logger.error(f"Escalation sweep error: {str(e)}")
+            return 0
+
+        if flagged:
+            logger.warning(f"SLA breached: {flagged} complaint(s) escalated")
+        return flagged
+
+    def get_stats(self) -> Dict:
+        """
+        Index statistics
+
+        Returns:
+            Dictionary with index state, flagged breaches and next breach
+        """
+        stats = {'loaded': self.load(), 'sla_hours': self.sla_seconds / 3600}
+        try:
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute('SELECT COUNT(*) FROM sla_breaches')
+            stats['flagged'] = cursor.fetchone()[0]
+        except Exception:
+            stats['flagged'] = None
+        stats['next_breach'] = self.next_breach()
+        return stats
+
+# Singleton instance
+_escalation_index_instance = None
+
+def get_escalation_index() -> EscalationIndex:
+    """
+    Get singleton instance of EscalationIndex
+
+    Returns:
+        EscalationIndex instance
+    """
+    global _escalation_index_instance
+
+    if _escalation_index_instance is None:
+        _escalation_index_instance = EscalationIndex()
+
+    return _escalation_index_instance
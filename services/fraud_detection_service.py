@@ -9,12 +9,16 @@ Features:
 - Spam detection using NLP classifiers
 - Cross-checking citizen identity
 - Historical matching and clustering
+- Cross-citizen and historical matching over an ANN vector index
+  (MinHash/LSH buckets when the sentence model is not available)
 """
 
 import logging
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
+from utils.db_pool import get_db_pool
+from services.vector_index import get_vector_index
+from services.minhash_index import get_minhash_index
 import re
 from collections import Counter
 import hashlib
@@ -103,6 +107,9 @@ class FraudDetectionService:
     def __init__(self):
         """Initialize the fraud detection service"""
         logger.info("Initializing FraudDetectionService")
+        self.db_pool = get_db_pool(DB_PATH)
+        self.vector_index = get_vector_index()
+        self.minhash_index = get_minhash_index()
         self.isolation_forest = None
         self.tfidf_vectorizer = None
         self._initialize_ml_models()
@@ -242,11 +249,20 @@ class FraudDetectionService:
             
             is_duplicate = len(duplicates) > 0
             
+            # Same issue reported by other citizens (e.g. one broken pipe, many reports)
+            cross_citizen_duplicates = []
+            for match in self._find_nearest_complaints(complaint_text, complaint_data.get('category'),
+                                                        k=20, threshold=0.85, jaccard_threshold=0.7) or []:
+                if match['citizen_id'] != citizen_id and match['status'] not in ('Resolved', 'Invalid'):
+                    cross_citizen_duplicates.append(match)
+            
             return {
                 'success': True,
                 'is_duplicate': is_duplicate,
                 'duplicates': duplicates,
-                'duplicate_count': len(duplicates)
+                'duplicate_count': len(duplicates),
+                'cross_citizen_duplicates': cross_citizen_duplicates,
+                'cross_citizen_count': len(cross_citizen_duplicates)
             }
             
         except Exception as e:
@@ -345,7 +361,27 @@ class FraudDetectionService:
                     'error': 'Missing complaint text'
                 }
             
-            # Get resolved historical grievances
+            # Nearest neighbours over every stored complaint, filtered to resolved cases
+            matches = self._find_nearest_complaints(complaint_text, category, k=200,
+                                                    threshold=0.75, jaccard_threshold=0.5)
+            if matches is not None:
+                similar_cases = [{
+                    'grievance_id': match['complaint_id'],
+                    'similarity': match['similarity'],
+                    'text': match['text'],
+                    'resolution': '',
+                    'timestamp': match['timestamp']
+                } for match in matches if match['status'] == 'Resolved']
+                self._add_resolutions(similar_cases)
+                
+                return {
+                    'success': True,
+                    'similar_cases': similar_cases,
+                    'similar_cases_count': len(similar_cases),
+                    'should_reopen': len(similar_cases) > 0
+                }
+            
+            # Fallback: compare against the latest resolved grievances
             historical_grievances = self._get_resolved_grievances(category)
             
             # Find similar historical cases
@@ -357,9 +393,10 @@ class FraudDetectionService:
                         'grievance_id': grievance['id'],
                         'similarity': similarity,
                         'text': grievance['text'][:100] + '...' if len(grievance['text']) > 100 else grievance['text'],
-                        'resolution': grievance.get('resolution', ''),
+                        'resolution': '',
                         'timestamp': grievance['timestamp']
                     })
+            self._add_resolutions(similar_cases)
             
             return {
                 'success': True,
@@ -477,7 +514,7 @@ class FraudDetectionService:
             return {'score': 0, 'factors': []}
         
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             # Count complaints from this citizen in the last hour
@@ -499,7 +536,6 @@ class FraudDetectionService:
             ''', (citizen_id, one_day_ago.isoformat()))
             
             daily_count = cursor.fetchone()[0]
-            conn.close()
             
             if hourly_count > self.HIGH_FREQUENCY_THRESHOLD:
                 score += 40
@@ -619,6 +655,95 @@ class FraudDetectionService:
         
         return {'score': score, 'factors': factors}
     
+    def _find_nearest_complaints(self, text: str, category: Optional[str], k: int,
+                                 threshold: float, jaccard_threshold: float) -> Optional[List[Dict]]:
+        """
+        Find similar complaints across all citizens
+        
+        Uses the vector index when the sentence model is available, MinHash/LSH
+        buckets otherwise.
+        
+        Args:
+            text: Complaint text
+            category: Category to search first (all categories if nothing matches)
+            k: Number of neighbours to consider
+            threshold: Minimum cosine similarity (vector index)
+            jaccard_threshold: Minimum estimated Jaccard similarity (MinHash)
+            
+        Returns:
+            List of matching complaints (best first), or None on error or
+            when the vector index is not synced for this process's model
+        """
+        try:
+            if self.vector_index.is_available() and self.vector_index.embedding_store.is_available():
+                if not self.vector_index.is_ready():
+                    return None
+                neighbours = self.vector_index.search_text(text, category=category or None, k=k)
+                if category and not neighbours:
+                    neighbours = self.vector_index.search_text(text, k=k)
+                neighbours = [(complaint_id, score) for complaint_id, score in neighbours if score > threshold]
+            else:
+                neighbours = self.minhash_index.find_similar(text, category=category or None, k=k,
+                                                             threshold=jaccard_threshold)
+                if category and not neighbours:
+                    neighbours = self.minhash_index.find_similar(text, k=k, threshold=jaccard_threshold)
+            if not neighbours:
+                return []
+            
+            conn = self.db_pool.connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT id, text, timestamp, status, citizen_id
+                FROM complaints
+                WHERE id IN ({', '.join('?' * len(neighbours))})
+            ''', [complaint_id for complaint_id, _ in neighbours])
+            rows = {row[0]: row for row in cursor.fetchall()}
+            
+            matches = []
+            for complaint_id, score in neighbours:
+                row = rows.get(complaint_id)
+                if row is None:
+                    continue  # insert was rolled back after indexing
+                matches.append({
+                    'complaint_id': complaint_id,
+                    'similarity': float(score),
+                    'text': row[1][:100] + '...' if len(row[1]) > 100 else row[1],
+                    'timestamp': row[2],
+                    'status': row[3],
+                    'citizen_id': row[4]
+                })
+            
+            return matches
+            
+        except Exception as e:
+            logger.error(f"Vector index search error: {str(e)}")
+            return None
+    
+    def _add_resolutions(self, cases: List[Dict]):
+        """
+        Fill in the field worker's resolution notes of matched cases
+        
+        Args:
+            cases: Similar cases with grievance_id (updated in place)
+        """
+        if not cases:
+            return
+        try:
+            conn = self.db_pool.connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT complaint_id, resolution_notes
+                FROM assignments
+                WHERE complaint_id IN ({', '.join('?' * len(cases))}) AND resolution_notes IS NOT NULL
+                ORDER BY id
+            ''', [case['grievance_id'] for case in cases])
+            # Latest assignment wins when a complaint was reassigned
+            notes = {row[0]: row[1] for row in cursor.fetchall()}
+            for case in cases:
+                case['resolution'] = notes.get(case['grievance_id'], '')
+        except Exception as e:
+            logger.error(f"Error loading resolution notes: {str(e)}")
+    
     def _get_potential_duplicates(self, citizen_id: str, current_text: str) -> List[Dict]:
         """
         Get potential duplicates for comparison
@@ -631,7 +756,7 @@ class FraudDetectionService:
             List of potential duplicates
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             # Get recent complaints from same citizen (last 7 days)
@@ -653,7 +778,6 @@ class FraudDetectionService:
                     'status': row[3]
                 })
             
-            conn.close()
             return potential_duplicates
             
         except Exception as e:
@@ -726,12 +850,11 @@ class FraudDetectionService:
             Boolean indicating if citizen exists
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             cursor.execute('SELECT id FROM citizens WHERE id = ?', (citizen_id,))
             result = cursor.fetchone()
-            conn.close()
             
             return result is not None
         except Exception as e:
@@ -750,7 +873,7 @@ class FraudDetectionService:
             Number of complaints in the time window
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             time_ago = datetime.utcnow() - timedelta(hours=hours)
@@ -761,7 +884,6 @@ class FraudDetectionService:
             ''', (citizen_id, time_ago.isoformat()))
             
             count = cursor.fetchone()[0]
-            conn.close()
             
             return count
         except Exception as e:
@@ -779,7 +901,7 @@ class FraudDetectionService:
             List of resolved grievances
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = self.db_pool.connection()
             cursor = conn.cursor()
             
             if category:
@@ -808,7 +930,6 @@ class FraudDetectionService:
                     'status': row[3]
                 })
             
-            conn.close()
             return grievances
             
         except Exception as e:
@@ -0,0 +1,402 @@
+"""
+GramSetu AI - Zero-Shot Inference Server
+Dedicated local process that serves the zero-shot classifier to all web workers
+
+Features:
+- Model loaded once per host instead of once per gunicorn worker
+- Micro-batching: concurrent requests are coalesced into batched forward
+  passes, bounded by a batch size and a max-latency window; large requests
+  are split so no pass exceeds INFERENCE_MAX_BATCH texts
+- Newline-delimited JSON over a Unix domain socket
+- Client with per-thread connections and a short back-off when the server is down
+- 'info' op reports the backend the model actually loaded on, so clients
+  version cached results correctly
+
+Usage:
+    python -m services.inference_server --socket /tmp/gramsetu_inference.sock
+    INFERENCE_SOCKET=/tmp/gramsetu_inference.sock gunicorn app:app
+
+    The Procfile runs it as the 'inference' process, next to 'web' and
+    'voice_worker', which connect to it through INFERENCE_SOCKET. Without a
+    server (or without INFERENCE_SOCKET) every worker classifies in-process.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Server settings (overridable through the environment)
+INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET', '/tmp/gramsetu_inference.sock')
+INFERENCE_MODEL = os.environ.get('INFERENCE_MODEL', 'valhalla/distilbart-mnli-12-3')
+INFERENCE_MAX_BATCH = int(os.environ.get('INFERENCE_MAX_BATCH', 32))  # texts per classify call
+INFERENCE_PAIR_BATCH = int(os.environ.get('INFERENCE_PAIR_BATCH', 64))  # (text, label) pairs per forward pass
+INFERENCE_MAX_LATENCY_MS = float(os.environ.get('INFERENCE_MAX_LATENCY_MS', 10))
+INFERENCE_TIMEOUT_SECONDS = float(os.environ.get('INFERENCE_TIMEOUT_SECONDS', 30))
+
+# Batch classifier signature: (texts, labels) -> one {'labels', 'scores'} dict per text
+BatchClassifier = Callable[[List[str], List[str]], List[Dict]]
+
+
+class _PendingRequest:
+    """One client request waiting for its slice of a batch"""
+
+    def __init__(self, texts: List[str], labels: tuple):
+        self.texts = texts
+        self.labels = labels
+        self.results: Optional[List[Dict]] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent classification requests into batched calls
+
+    The batching thread takes the first waiting request, then keeps collecting
+    requests until the batch is full or the latency window since the first
+    request has passed. Requests with different label sets are run as
+    separate groups of the same batch, and every group is classified in
+    slices of at most max_batch_size texts, so one large request cannot
+    turn into one huge forward pass.
+    """
+
+    def __init__(self, classify_fn: BatchClassifier, max_batch_size: int = INFERENCE_MAX_BATCH,
+                 max_latency_ms: float = INFERENCE_MAX_LATENCY_MS):
+        """
+        Initialize the batcher
+
+        Args:
+            classify_fn: Batched classifier (called from the batching thread only)
+            max_batch_size: Maximum texts per batch
+            max_latency_ms: Maximum time the first request waits for company
+        """
+        self.classify_fn = classify_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self._queue: 'queue.Queue[_PendingRequest]' = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'texts': 0, 'batches': 0, 'errors': 0}
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str], labels: Sequence[str],
+               timeout: float = INFERENCE_TIMEOUT_SECONDS) -> List[Dict]:
+        """
+        Queue texts for classification and wait for the results
+
+        Args:
+            texts: Texts to classify
+            labels: Candidate labels
+            timeout: Seconds to wait
+
+        Returns:
+            One {'labels', 'scores'} dictionary per text
+        """
+        request = _PendingRequest(list(texts), tuple(labels))
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError('Inference request timed out')
+        if request.error is not None:
+            raise RuntimeError(request.error)
+        return request.results
+
+    def _run(self):
+        """Batching loop"""
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            size = len(first.texts)
+            deadline = time.monotonic() + self.max_latency
+
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingRequest]):
+        """Run one batch, grouped by label set, and hand results back"""
+        groups: Dict[tuple, List[_PendingRequest]] = {}
+        for request in batch:
+            groups.setdefault(request.labels, []).append(request)
+
+        for labels, requests in groups.items():
+            texts = [text for request in requests for text in request.texts]
+            calls = 0
+            try:
+                results = []
+                for start in range(0, len(texts), self.max_batch_size):
+                    results.extend(self.classify_fn(texts[start:start + self.max_batch_size], list(labels)))
+                    calls += 1
+                offset = 0
+                for request in requests:
+                    request.results = results[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                logger.error(f"Batched inference error: {str(e)}")
+                for request in requests:
+                    request.error = str(e)
+                with self._stats_lock:
+                    self.stats['errors'] += 1
+            finally:
+                for request in requests:
+                    request.done.set()
+
+            with self._stats_lock:
+                self.stats['requests'] += len(requests)
+                self.stats['texts'] += len(texts)
+                self.stats['batches'] += max(1, calls)
+
+    def get_stats(self) -> Dict:
+        """Batching counters, including the average batch size"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['avg_batch_size'] = stats['texts'] / stats['batches'] if stats['batches'] else 0.0
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One client connection: newline-delimited JSON requests and responses"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+                op = message.get('op', 'classify')
+                if op == 'classify':
+                    results = self.server.batcher.submit(message['texts'], message['labels'])
+                    response = {'ok': True, 'results': results}
+                elif op == 'info':
+                    response = {'ok': True, 'model': self.server.model_name, 'backend': self.server.backend}
+                elif op == 'stats':
+                    response = {'ok': True, 'stats': self.server.batcher.get_stats()}
+                elif op == 'ping':
+                    response = {'ok': True}
+                else:
+                    response = {'ok': False, 'error': f'Unknown op: {op}'}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server in front of a MicroBatcher
+    """
+
+    daemon_threads = True
+    # Every web worker thread keeps a connection; absorb connect bursts
+    request_queue_size = 256
+
+    def __init__(self, socket_path: str = INFERENCE_SOCKET, model_name: str = INFERENCE_MODEL,
+                 classify_fn: Optional[BatchClassifier] = None):
+        """
+        Initialize the server and load the model
+
+        Args:
+            socket_path: Unix socket path
+            model_name: Zero-shot model to load
+            classify_fn: Batched classifier to serve (defaults to the transformers pipeline)
+        """
+        logger.info(f"Initializing InferenceServer on {socket_path}")
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.backend = 'custom'
+        self.batcher = MicroBatcher(classify_fn or self._load_pipeline(model_name))
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    def _load_pipeline(self, model_name: str) -> BatchClassifier:
+        """Load the zero-shot pipeline and wrap it as a batched classifier"""
+        from transformers import pipeline
+        from services.onnx_backend import onnx_enabled, backend_tag, load_zero_shot_pipeline
+
+        logger.info(f"Loading zero-shot classifier ({model_name})...")
+        classifier = None
+        if onnx_enabled():
+            try:
+                classifier = load_zero_shot_pipeline(model_name)
+            except Exception as e:
+                logger.warning(f"ONNX backend failed, using PyTorch: {str(e)}")
+        if classifier is None:
+            classifier = pipeline("zero-shot-classification", model=model_name, device=-1)
+        self.backend = backend_tag(classifier)
+        logger.info(f"Zero-shot classifier loaded ({self.backend})")
+
+        def classify(texts: List[str], labels: List[str]) -> List[Dict]:
+            # Each text expands to one NLI pair per label; a fixed pair batch
+            # keeps activation memory bounded whatever the label count
+            results = classifier(texts, labels, batch_size=INFERENCE_PAIR_BATCH)
+            if isinstance(results, dict):
+                results = [results]
+            return [{'labels': result['labels'], 'scores': result['scores']} for result in results]
+
+        return classify
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class InferenceClient:
+    """
+    Client for the inference server
+
+    Keeps one connection per thread. When no server is listening it is
+    skipped for RETRY_AFTER_SECONDS so callers fall back without paying a
+    connect attempt on every request.
+    """
+
+    RETRY_AFTER_SECONDS = 30
+
+    def __init__(self, socket_path: str = INFERENCE_SOCKET, timeout: float = INFERENCE_TIMEOUT_SECONDS):
+        """
+        Initialize the client
+
+        Args:
+            socket_path: Unix socket path of the server
+            timeout: Socket timeout in seconds
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0.0
+        self._backend: Optional[str] = None
+
+    def _connection(self):
+        """Get the calling thread's connection, opening it if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        # The server may come back with a different backend
+        self._backend = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def _call(self, message: Dict) -> Dict:
+        """Send one request and read its response"""
+        if time.monotonic() < self._down_until:
+            raise ConnectionError('Inference server unavailable')
+
+        try:
+            sock, reader = self._connection()
+            sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            line = reader.readline()
+            if not line:
+                raise ConnectionError('Inference server closed the connection')
+        except (OSError, ConnectionError) as e:
+            self._close()
+            if isinstance(e, (FileNotFoundError, ConnectionRefusedError)):
+                # No server listening: stop trying for a while
+                self._down_until = time.monotonic() + self.RETRY_AFTER_SECONDS
+            raise ConnectionError(f'Inference server unavailable: {e}')
+
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', 'Inference failed'))
+        return response
+
+    def classify(self, texts: List[str], labels: Sequence[str]) -> List[Dict]:
+        """
+        Classify texts on the server
+
+        Args:
+            texts: Texts to classify
+            labels: Candidate labels
+
+        Returns:
+            One {'labels', 'scores'} dictionary per text
+
+        Raises:
+            ConnectionError: Server not reachable (callers should fall back)
+            RuntimeError: Server-side inference error
+        """
+        return self._call({'op': 'classify', 'texts': list(texts), 'labels': list(labels)})['results']
+
+    def get_backend(self) -> str:
+        """
+        Backend the server's model runs on (cached until the connection drops)
+
+        Raises:
+            ConnectionError: Server not reachable
+        """
+        if self._backend is None:
+            self._backend = self._call({'op': 'info'})['backend']
+        return self._backend
+
+    def get_stats(self) -> Dict:
+        """Batching statistics of the server"""
+        return self._call({'op': 'stats'})['stats']
+
+# Singleton instance
+_inference_client_instance = None
+
+def get_inference_client() -> Optional[InferenceClient]:
+    """
+    Get singleton instance of InferenceClient
+
+    Returns:
+        InferenceClient instance, or None when INFERENCE_SOCKET is not configured
+    """
+    global _inference_client_instance
+
+    if _inference_client_instance is None and os.environ.get('INFERENCE_SOCKET'):
+        _inference_client_instance = InferenceClient()
+
+    return _inference_client_instance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='GramSetu zero-shot inference server')
+    parser.add_argument('--socket', default=INFERENCE_SOCKET)
+    parser.add_argument('--model', default=INFERENCE_MODEL)
+    parser.add_argument('--max-batch', type=int, default=INFERENCE_MAX_BATCH)
+    parser.add_argument('--max-latency-ms', type=float, default=INFERENCE_MAX_LATENCY_MS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = InferenceServer(args.socket, args.model)
+    server.batcher.max_batch_size = args.max_batch
+    server.batcher.max_latency = args.max_latency_ms / 1000.0
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
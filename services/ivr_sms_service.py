@@ -13,8 +13,8 @@ import logging
 import re
 from datetime import datetime
 from typing import Dict, Optional
-import sqlite3
 from services.multilingual_classifier import get_classifier
+from services.complaint_ingestor import get_complaint_ingestor
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +30,7 @@ class IVRSMSService:
         """Initialize the IVR/SMS service"""
         logger.info("Initializing IVRSMSService")
         self.classifier = get_classifier()
+        self.ingestor = get_complaint_ingestor()
     
     def process_sms_complaint(self, sms_content: str, sender_number: str) -> Dict:
         """
@@ -284,7 +285,7 @@ class IVRSMSService:
     def _save_complaint(self, text: str, category: str, urgency: str, 
                        citizen_id: str, hash_value: str, timestamp: str) -> str:
         """
-        Save complaint to database
+        Save complaint to database through the shared ingestion pipeline
         
         Args:
             text: Complaint text
@@ -298,19 +299,15 @@ class IVRSMSService:
             Complaint ID
         """
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            
-            # Insert complaint
-            cursor.execute('''
-                INSERT INTO complaints 
-                (text, category, urgency, citizen_id, hash, timestamp, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (text, category, urgency, citizen_id, hash_value, timestamp, 'Pending'))
-            
-            complaint_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            # Duplicate check, CRS upsert and insert in one transaction
+            result = self.ingestor.ingest(
+                text, citizen_id, category, urgency,
+                timestamp=timestamp, hash_value=hash_value
+            )
+            if not result['success']:
+                raise RuntimeError(result['error'])
+            
+            complaint_id = result['complaint_id']
             
             logger.info(f"Complaint saved with ID: {complaint_id}")
             return f"GSAI-{datetime.now().year}-{str(complaint_id).zfill(4)}"
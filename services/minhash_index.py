@@ -0,0 +1,437 @@
+"""
+GramSetu AI - MinHash/LSH Near-Duplicate Index
+Model-free near-duplicate detection for the fallback (no-ML) deployment
+
+Features:
+- MinHash signature per complaint over word unigrams and bigrams
+- Banded LSH buckets stored in SQLite (WITHOUT ROWID, primary-key lookups)
+- Buckets keyed by citizen first, so a citizen's lookup never touches other
+  citizens' members of a popular bucket
+- Constant number of bucket probes per lookup, no pairwise scans
+- Catches reordered and lightly paraphrased resubmissions, not only exact copies
+- Pure Python: no NumPy, scikit-learn or sentence-transformers needed
+- Resumable backfill job for complaints stored before the index existed
+
+Usage (backfill):
+    python -m services.minhash_index --batch-size 1000
+"""
+
+import argparse
+import hashlib
+import logging
+import random
+import re
+import sqlite3
+import struct
+from typing import Dict, List, Optional, Tuple
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Mersenne prime for the universal hash family
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+
+
+class MinHashIndex:
+    """
+    MinHash signatures plus banded LSH buckets in SQLite
+    """
+
+    # 16 bands x 4 rows: candidate probability ~50% at Jaccard 0.5, ~98% at 0.8
+    NUM_PERMUTATIONS = 64
+    BANDS = 16
+    ROWS_PER_BAND = 4
+
+    # Estimated Jaccard similarity above which two complaints are duplicates
+    DUPLICATE_THRESHOLD = 0.7
+    DUPLICATE_CHECK_DAYS = 30
+
+    # Upper bound on candidates verified per lookup (keeps cost constant)
+    MAX_CANDIDATES = 200
+    BACKFILL_BATCH_SIZE = 1000
+
+    def __init__(self):
+        """Initialize the MinHash index"""
+        logger.info("Initializing MinHashIndex")
+        self.db_pool = get_db_pool(DB_PATH)
+
+        # Fixed seed: signatures must be stable across processes and restarts
+        rng = random.Random(1729)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(self.NUM_PERMUTATIONS)
+        ]
+        self._signature_format = f'<{self.NUM_PERMUTATIONS}I'
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure MinHash and LSH bucket tables exist"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS complaint_minhash (
+                        complaint_id INTEGER PRIMARY KEY,
+                        signature BLOB NOT NULL  -- NUM_PERMUTATIONS little-endian uint32
+                    )
+                ''')
+
+                # Buckets without citizen_id predate per-citizen keys; they are
+                # dropped and signatures cleared so the backfill re-signs them
+                cursor.execute('PRAGMA table_info(complaint_lsh_buckets)')
+                columns = [row[1] for row in cursor.fetchall()]
+                if columns and 'citizen_id' not in columns:
+                    logger.warning("Rebuilding LSH buckets with citizen keys; run the MinHash backfill")
+                    cursor.execute('DROP TABLE complaint_lsh_buckets')
+                    cursor.execute('DELETE FROM complaint_minhash')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS complaint_lsh_buckets (
+                        citizen_id TEXT NOT NULL,
+                        band INTEGER NOT NULL,
+                        bucket INTEGER NOT NULL,
+                        complaint_id INTEGER NOT NULL,
+                        PRIMARY KEY (citizen_id, band, bucket, complaint_id)
+                    ) WITHOUT ROWID
+                ''')
+
+                # Cross-citizen lookups (find_similar)
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_lsh_buckets_band
+                    ON complaint_lsh_buckets(band, bucket, complaint_id)
+                ''')
+
+            logger.info("MinHash tables ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring MinHash tables: {str(e)}")
+            raise
+
+    # ------------------------------------------------------------------
+    # Signatures
+    # ------------------------------------------------------------------
+
+    def _shingles(self, text: str) -> set:
+        """Word unigrams and bigrams of normalized text"""
+        # Keep Devanagari combining marks (matras) inside words
+        tokens = re.sub(r'[^\w\u0900-\u097F]+', ' ', text.lower()).split()
+        shingles = set(tokens)
+        shingles.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return shingles
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """
+        Compute the MinHash signature of a text
+
+        Args:
+            text: Complaint text
+
+        Returns:
+            Tuple of NUM_PERMUTATIONS uint32 values, or None for empty text
+        """
+        shingles = self._shingles(text)
+        if not shingles:
+            return None
+
+        hashed = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            for shingle in shingles
+        ]
+        return tuple(
+            min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in hashed)
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+        """(band, bucket) pairs of a signature"""
+        keys = []
+        for band in range(self.BANDS):
+            start = band * self.ROWS_PER_BAND
+            rows = struct.pack(f'<{self.ROWS_PER_BAND}I', *signature[start:start + self.ROWS_PER_BAND])
+            bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), 'little', signed=True)
+            keys.append((band, bucket))
+        return keys
+
+    def similarity(self, signature1: Tuple[int, ...], signature2: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        same = sum(1 for a, b in zip(signature1, signature2) if a == b)
+        return same / self.NUM_PERMUTATIONS
+
+    def _pack(self, signature: Tuple[int, ...]) -> bytes:
+        return struct.pack(self._signature_format, *signature)
+
+    def _unpack(self, blob: bytes) -> Tuple[int, ...]:
+        return struct.unpack(self._signature_format, blob)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def store(self, conn: sqlite3.Connection,
+              complaints: List[Tuple[int, str, str]]) -> Dict[int, Tuple[int, ...]]:
+        """
+        Sign complaints and write signatures and buckets (inside the caller's transaction)
+
+        Args:
+            conn: Connection with an open transaction
+            complaints: (complaint_id, citizen_id, text) triples
+
+        Returns:
+            Dictionary of complaint_id -> signature for the signed complaints
+        """
+        signatures = {}
+        citizens = {}
+        for complaint_id, citizen_id, text in complaints:
+            signature = self.signature(text)
+            if signature is not None:
+                signatures[complaint_id] = signature
+                citizens[complaint_id] = citizen_id
+
+        conn.executemany(
+            'INSERT OR REPLACE INTO complaint_minhash (complaint_id, signature) VALUES (?, ?)',
+            [(complaint_id, self._pack(signature)) for complaint_id, signature in signatures.items()]
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO complaint_lsh_buckets (citizen_id, band, bucket, complaint_id) '
+            'VALUES (?, ?, ?, ?)',
+            [(citizens[complaint_id], band, bucket, complaint_id)
+             for complaint_id, signature in signatures.items()
+             for band, bucket in self._band_keys(signature)]
+        )
+        return signatures
+
+    def on_complaints_inserted(self, conn: sqlite3.Connection, complaints: List[Dict]):
+        """
+        ComplaintIngestor insert hook: sign and bucket new complaints
+
+        Failures are logged rather than raised; the backfill job fills the gap.
+        """
+        try:
+            self.store(conn, [(complaint['id'], complaint['citizen_id'], complaint['text'])
+                              for complaint in complaints])
+        except Exception as e:
+            logger.warning(f"MinHash insert hook error: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _candidates(self, signature: Tuple[int, ...], citizen_id: Optional[str] = None,
+                    days: Optional[int] = None, category: Optional[str] = None) -> List[Tuple]:
+        """Complaints sharing at least one LSH bucket with a signature"""
+        keys = self._band_keys(signature)
+
+        # With a citizen, each probe is a primary-key range within that citizen
+        if citizen_id is not None:
+            probe = '(citizen_id = ? AND band = ? AND bucket = ?)'
+            params: List = [value for band, bucket in keys for value in (citizen_id, band, bucket)]
+        else:
+            probe = '(band = ? AND bucket = ?)'
+            params = [value for key in keys for value in key]
+
+        filters = ''
+        if days is not None:
+            filters += f" AND c.timestamp > datetime('now', '-{int(days)} days')"
+        if category:
+            filters += ' AND c.category = ?'
+            params.append(category)
+        params.append(self.MAX_CANDIDATES)
+
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute(f'''
+            SELECT c.id, c.citizen_id, m.signature
+            FROM (
+                SELECT DISTINCT complaint_id FROM complaint_lsh_buckets
+                WHERE {' OR '.join([probe] * len(keys))}
+            ) b
+            JOIN complaints c ON c.id = b.complaint_id
+            JOIN complaint_minhash m ON m.complaint_id = b.complaint_id
+            WHERE 1 = 1{filters}
+            ORDER BY b.complaint_id DESC
+            LIMIT ?
+        ''', params)
+        return cursor.fetchall()
+
+    def find_duplicate(self, text: str, citizen_id: str) -> Tuple[bool, Optional[int]]:
+        """
+        Find a near-duplicate among the citizen's recent complaints
+
+        Args:
+            text: Complaint text
+            citizen_id: Citizen ID
+
+        Returns:
+            Tuple of (is_duplicate, duplicate_id)
+        """
+        match = self.find_duplicates_batch([text], [citizen_id])[0]
+        return (True, match[1]) if match else (False, None)
+
+    def find_duplicates_batch(self, texts: List[str], citizen_ids: List[str]) -> List[Optional[Tuple[str, int]]]:
+        """
+        Find near-duplicates for a batch, against stored complaints and each other
+
+        Only signed complaints are matched: new ones are signed by the insert
+        hook, older ones by the backfill job.
+
+        Args:
+            texts: Complaint texts
+            citizen_ids: Citizen ID for each text
+
+        Returns:
+            One match per item: None, ('complaint', id) or ('batch', index)
+        """
+        # Buckets of earlier batch items, per citizen
+        batch_buckets: Dict[Tuple[str, int, int], List[int]] = {}
+        signatures: List[Optional[Tuple[int, ...]]] = []
+
+        matches = []
+        for i, (text, citizen_id) in enumerate(zip(texts, citizen_ids)):
+            signature = self.signature(text)
+            signatures.append(signature)
+            if signature is None:
+                matches.append(None)
+                continue
+
+            match = None
+            best = self.DUPLICATE_THRESHOLD
+            for complaint_id, _, blob in self._candidates(signature, citizen_id, self.DUPLICATE_CHECK_DAYS):
+                score = self.similarity(signature, self._unpack(blob))
+                if score >= best:
+                    match, best = ('complaint', complaint_id), score
+
+            keys = self._band_keys(signature)
+            if match is None:
+                earlier = {j for band, bucket in keys for j in batch_buckets.get((citizen_id, band, bucket), [])}
+                for j in sorted(earlier):
+                    score = self.similarity(signature, signatures[j])
+                    if score >= best:
+                        match, best = ('batch', j), score
+
+            for band, bucket in keys:
+                batch_buckets.setdefault((citizen_id, band, bucket), []).append(i)
+            matches.append(match)
+
+        return matches
+
+    def find_similar(self, text: str, category: Optional[str] = None, k: int = 20,
+                     threshold: float = 0.5) -> List[Tuple[int, float]]:
+        """
+        Find similar complaints across all citizens
+
+        Args:
+            text: Complaint text
+            category: Optional category filter
+            k: Maximum number of results
+            threshold: Minimum estimated Jaccard similarity
+
+        Returns:
+            List of (complaint_id, similarity), best first
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return []
+
+        scored = []
+        for complaint_id, _, blob in self._candidates(signature, category=category):
+            score = self.similarity(signature, self._unpack(blob))
+            if score >= threshold:
+                scored.append((complaint_id, score))
+
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+    # ------------------------------------------------------------------
+    # Backfill
+    # ------------------------------------------------------------------
+
+    def backfill(self, batch_size: Optional[int] = None, after_id: int = 0,
+                 max_batches: Optional[int] = None) -> Dict:
+        """
+        Sign stored complaints that have no MinHash signature yet
+
+        Each batch commits on its own, so the job can be stopped and re-run.
+
+        Args:
+            batch_size: Complaints per batch (defaults to BACKFILL_BATCH_SIZE)
+            after_id: Resume after this complaint ID
+            max_batches: Stop after this many batches
+
+        Returns:
+            Dictionary with backfill progress
+        """
+        batch_size = batch_size or self.BACKFILL_BATCH_SIZE
+        signed = 0
+        batches = 0
+        last_id = after_id
+
+        try:
+            cursor = self.db_pool.connection().cursor()
+            while max_batches is None or batches < max_batches:
+                cursor.execute('''
+                    SELECT c.id, c.citizen_id, c.text
+                    FROM complaints c
+                    LEFT JOIN complaint_minhash m ON m.complaint_id = c.id
+                    WHERE c.id > ? AND m.complaint_id IS NULL
+                    ORDER BY c.id
+                    LIMIT ?
+                ''', (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                with self.db_pool.transaction() as conn:
+                    self.store(conn, [(row[0], row[1], row[2]) for row in rows])
+
+                signed += len(rows)
+                batches += 1
+                last_id = rows[-1][0]
+                logger.info(f"MinHash backfill: {signed} complaints signed (last ID {last_id})")
+
+            return {
+                'success': True,
+                'signed': signed,
+                'batches': batches,
+                'last_id': last_id
+            }
+
+        except Exception as e:
+            logger.error(f"MinHash backfill error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'signed': signed,
+                'last_id': last_id
+            }
+
+# Singleton instance
+_minhash_index_instance = None
+
+def get_minhash_index() -> MinHashIndex:
+    """
+    Get singleton instance of MinHashIndex
+
+    Returns:
+        MinHashIndex instance
+    """
+    global _minhash_index_instance
+
+    if _minhash_index_instance is None:
+        _minhash_index_instance = MinHashIndex()
+
+    return _minhash_index_instance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill complaint MinHash signatures')
+    parser.add_argument('--batch-size', type=int, default=MinHashIndex.BACKFILL_BATCH_SIZE)
+    parser.add_argument('--after-id', type=int, default=0, help='Resume after this complaint ID')
+    parser.add_argument('--max-batches', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(get_minhash_index().backfill(args.batch_size, args.after_id, args.max_batches))
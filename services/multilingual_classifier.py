@@ -7,12 +7,16 @@ Features:
 - Category classification for governance issues
 - Urgency detection
 - Translation to English for unified processing
+- Zero-shot results cached by normalized text (see classification_cache)
+- Optional quantized ONNX Runtime backend (INFERENCE_BACKEND=onnx)
 """
 
 import logging
 from typing import Dict, List, Optional
 from transformers import pipeline, MarianMTModel, MarianTokenizer
 import re
+from services.classification_cache import get_classification_cache
+from services.onnx_backend import onnx_enabled, backend_tag, load_zero_shot_pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +63,9 @@ class MultilingualComplaintClassifier:
         'Other': []
     }
     
+    # Zero-shot model; model_version (set once it loads) keys cached classification results
+    ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+    
     # Urgency keywords (multilingual)
     URGENT_KEYWORDS = {
         'en': ['urgent', 'emergency', 'immediate', 'critical', 'help', 'asap'],
@@ -77,7 +84,9 @@ class MultilingualComplaintClassifier:
         """
         self.use_translation = use_translation
         self.zero_shot_classifier = None
+        self.model_version = None
         self.translator_models = {}
+        self.cache = get_classification_cache()
         
         logger.info("Initializing MultilingualComplaintClassifier")
         self._load_models()
@@ -87,10 +96,19 @@ class MultilingualComplaintClassifier:
         try:
             # Load zero-shot classifier
             logger.info("Loading zero-shot classification model")
-            self.zero_shot_classifier = pipeline(
-                "zero-shot-classification",
-                model="facebook/bart-large-mnli"
-            )
+            if onnx_enabled():
+                try:
+                    self.zero_shot_classifier = load_zero_shot_pipeline(self.ZERO_SHOT_MODEL)
+                    logger.info("Zero-shot model loaded on ONNX Runtime (int8)")
+                except Exception as e:
+                    logger.warning(f"ONNX backend failed, using PyTorch: {str(e)}")
+            if self.zero_shot_classifier is None:
+                self.zero_shot_classifier = pipeline(
+                    "zero-shot-classification",
+                    model=self.ZERO_SHOT_MODEL
+                )
+            self.model_version = (f"{self.ZERO_SHOT_MODEL}:{backend_tag(self.zero_shot_classifier)}:"
+                                  f"{'|'.join(self.CATEGORIES)}")
             
             logger.info("Multilingual classifier loaded successfully!")
             
@@ -154,11 +172,12 @@ class MultilingualComplaintClassifier:
             
             # If no keywords match, use zero-shot classification on English text
             if category_scores[max_category] == 0:
-                result = self.zero_shot_classifier(
+                result = self.cache.get_or_compute(
                     english_text,
-                    list(self.CATEGORIES.keys())
+                    self.model_version,
+                    lambda text: {'category': self.zero_shot_classifier(text, list(self.CATEGORIES.keys()))['labels'][0]}
                 )
-                max_category = result['labels'][0]
+                max_category = result['category']
             
             logger.info(f"Classified complaint as: {max_category}")
             return max_category
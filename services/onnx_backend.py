@@ -0,0 +1,426 @@
+"""
+GramSetu AI - ONNX Runtime Inference Backend
+Quantized ONNX versions of the zero-shot (NLI) and sentence (MiniLM) models
+
+Features:
+- Export to ONNX with dynamic int8 quantization at deploy time (CLI), never
+  on the request path; a model that was not exported falls back to PyTorch
+- Each export goes to its own versioned directory and is published with an
+  atomic symlink swap, under a cross-process file lock
+- Drop-in zero-shot pipeline and SentenceTransformer-compatible encoder
+- Selected with INFERENCE_BACKEND=onnx; falls back to PyTorch when
+  ONNX Runtime / optimum are not installed or loading fails
+- Accuracy parity check against the PyTorch outputs on a fixed sample
+
+Usage:
+    python -m services.onnx_backend export-all    # models in ONNX_EXPORT_MODELS (Procfile)
+    python -m services.onnx_backend export --kind zero-shot --model valhalla/distilbart-mnli-12-3
+    python -m services.onnx_backend export --kind sentence --model all-MiniLM-L6-v2
+    python -m services.onnx_backend parity --kind zero-shot --model valhalla/distilbart-mnli-12-3
+"""
+
+import argparse
+import fcntl
+import glob
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+# ONNX Runtime (through optimum) is optional - without it the PyTorch backend is used
+try:
+    import numpy as np
+    from transformers import AutoTokenizer, pipeline
+    from optimum.onnxruntime import (
+        ORTModelForFeatureExtraction,
+        ORTModelForSequenceClassification,
+        ORTQuantizer,
+    )
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    ONNX_AVAILABLE = True
+except ImportError:
+    np = None
+    ONNX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Backend settings (overridable through the environment)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch').lower()  # 'torch' or 'onnx'
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', 'models/onnx')
+# kind:model pairs exported by export-all (the models app.py, the
+# multilingual classifier and the embedding store load)
+ONNX_EXPORT_MODELS = os.environ.get(
+    'ONNX_EXPORT_MODELS',
+    'zero-shot:valhalla/distilbart-mnli-12-3,zero-shot:facebook/bart-large-mnli,sentence:all-MiniLM-L6-v2'
+)
+
+QUANTIZED_FILE_NAME = 'model_quantized.onnx'
+KIND_ZERO_SHOT = 'zero-shot'
+KIND_SENTENCE = 'sentence'
+
+# Parity thresholds: quantized outputs must stay this close to PyTorch
+PARITY_MIN_LABEL_AGREEMENT = 0.95
+PARITY_MAX_SCORE_DIFF = 0.1
+PARITY_MIN_COSINE = 0.98
+
+PARITY_LABELS = [
+    "Water supply issues",
+    "Health and medical services",
+    "Electricity and power problems",
+    "Road and infrastructure",
+    "Other government services"
+]
+
+# Fixed sample for the parity check (kept stable so runs are comparable)
+PARITY_SAMPLE = [
+    "No water supply in our village for the last 5 days",
+    "The hand pump near the school is broken and water is dirty",
+    "Street lights are not working and there is a power cut every night",
+    "Transformer burnt in ward 3, no electricity since yesterday",
+    "Big potholes on the main road to the market, accidents happening",
+    "The bridge over the canal is damaged and unsafe for buses",
+    "Primary health centre has no doctor and medicines are out of stock",
+    "Ambulance did not come for a pregnant woman, urgent help needed",
+    "Pension has not been credited for three months",
+    "Ration card application pending at the panchayat office",
+    "Paani nahi aa raha hai gaon mein, tanki khali hai",
+    "Bijli ka khamba gir gaya hai, bahut khatra hai",
+    "Sadak toot gayi hai, barish mein chalna mushkil hai",
+    "Aspatal mein dawai nahi mil rahi",
+    "Garbage is not collected and drains are overflowing",
+    "Teacher absent at the government school for two weeks",
+]
+
+
+_warned_unavailable = False
+
+
+def onnx_enabled() -> bool:
+    """Whether the ONNX backend is selected and importable"""
+    global _warned_unavailable
+
+    if INFERENCE_BACKEND != 'onnx':
+        return False
+    if not ONNX_AVAILABLE:
+        if not _warned_unavailable:
+            logger.warning("INFERENCE_BACKEND=onnx but optimum[onnxruntime] is not installed - using PyTorch")
+            _warned_unavailable = True
+        return False
+    return True
+
+
+def backend_tag(model=None) -> str:
+    """
+    Short backend identifier, used to version cached model outputs
+
+    With a loaded model (pipeline or encoder), reports the backend it actually
+    runs on, so a load that fell back to PyTorch reports 'torch'. Without
+    one, reports the configured backend.
+    """
+    if model is None:
+        return 'onnx-int8' if onnx_enabled() else 'torch'
+    return 'onnx-int8' if is_onnx_model(model) else 'torch'
+
+
+def is_onnx_model(model) -> bool:
+    """Whether a loaded pipeline or sentence encoder runs on ONNX Runtime"""
+    if isinstance(model, OnnxSentenceEncoder):
+        return True
+    inner = getattr(model, 'model', model)
+    return type(inner).__module__.startswith('optimum.onnxruntime')
+
+
+def _hub_name(model_name: str, kind: str) -> str:
+    """Hub id for a model (SentenceTransformer accepts bare names)"""
+    if kind == KIND_SENTENCE and '/' not in model_name:
+        return f'sentence-transformers/{model_name}'
+    return model_name
+
+
+def model_dir(model_name: str) -> str:
+    """Path of the exported, quantized model (a symlink to its current version)"""
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace('/', '__'))
+
+
+def export_models() -> List[Tuple[str, str]]:
+    """(kind, model name) pairs listed in ONNX_EXPORT_MODELS"""
+    pairs = []
+    for entry in ONNX_EXPORT_MODELS.split(','):
+        kind, _, model_name = entry.strip().partition(':')
+        if model_name:
+            pairs.append((kind, model_name))
+    return pairs
+
+
+def _quantization_config():
+    """Dynamic int8 quantization config for the host CPU"""
+    if platform.machine().lower() in ('arm64', 'aarch64'):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+def _publish(target: str, version_dir: str):
+    """Point the model symlink at a new version atomically and drop old versions"""
+    if os.path.isdir(target) and not os.path.islink(target):
+        shutil.rmtree(target)  # plain directory from before versioned exports
+    link = f'{target}.link-{os.getpid()}'
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version_dir), link)
+    os.replace(link, target)
+
+    # Keep the previous version for processes that are still loading it
+    versions = sorted(glob.glob(f'{glob.escape(target)}@*'), key=os.path.getmtime)
+    for old in [path for path in versions if path != version_dir][:-1]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def export_quantized(model_name: str, kind: str, force: bool = False) -> Dict:
+    """
+    Export a model to ONNX and quantize it (int8, dynamic)
+
+    Runs at deploy time (CLI). Processes exporting the same model take turns
+    on a file lock; each export is written to a new versioned directory and
+    published by swapping the model symlink, so loaders never see a
+    half-written or half-removed model.
+
+    Args:
+        model_name: Model name as used by the PyTorch backend
+        kind: KIND_ZERO_SHOT or KIND_SENTENCE
+        force: Re-export even if a quantized model exists
+
+    Returns:
+        Dictionary with export result
+    """
+    if not ONNX_AVAILABLE:
+        return {'success': False, 'error': 'optimum[onnxruntime] is not installed'}
+
+    target = model_dir(model_name)
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+    with open(f'{target}.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not force and os.path.exists(os.path.join(target, QUANTIZED_FILE_NAME)):
+            return {'success': True, 'path': target, 'exported': False}
+
+        model_class = ORTModelForSequenceClassification if kind == KIND_ZERO_SHOT else ORTModelForFeatureExtraction
+        hub_name = _hub_name(model_name, kind)
+        staging = tempfile.mkdtemp(prefix='.export-', dir=ONNX_MODEL_DIR)
+
+        try:
+            logger.info(f"Exporting {hub_name} to ONNX...")
+            fp32_dir = os.path.join(staging, 'fp32')
+            model = model_class.from_pretrained(hub_name, export=True)
+            model.save_pretrained(fp32_dir)
+            tokenizer = AutoTokenizer.from_pretrained(hub_name)
+
+            logger.info(f"Quantizing {hub_name} (dynamic int8)...")
+            quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+            quantized_dir = os.path.join(staging, 'int8')
+            quantizer.quantize(save_dir=quantized_dir, quantization_config=_quantization_config())
+            tokenizer.save_pretrained(quantized_dir)
+            # The quantized directory needs the model config alongside the graph
+            model.config.save_pretrained(quantized_dir)
+
+            version_dir = f'{target}@{time.strftime("%Y%m%d%H%M%S")}-{os.getpid()}'
+            os.replace(quantized_dir, version_dir)
+            _publish(target, version_dir)
+            logger.info(f"Quantized model saved to {version_dir}")
+            return {'success': True, 'path': target, 'exported': True}
+
+        except Exception as e:
+            logger.error(f"ONNX export error for {model_name}: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def _load(model_name: str, kind: str):
+    """Load the exported quantized model and its tokenizer"""
+    path = model_dir(model_name)
+    if not os.path.exists(os.path.join(path, QUANTIZED_FILE_NAME)):
+        raise RuntimeError(f"No quantized model at {path} - run "
+                           f"'python -m services.onnx_backend export --kind {kind} --model {model_name}'")
+
+    model_class = ORTModelForSequenceClassification if kind == KIND_ZERO_SHOT else ORTModelForFeatureExtraction
+    model = model_class.from_pretrained(path, file_name=QUANTIZED_FILE_NAME)
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    return model, tokenizer
+
+
+def load_zero_shot_pipeline(model_name: str):
+    """
+    Load a zero-shot classification pipeline backed by the quantized model
+
+    Args:
+        model_name: Zero-shot (NLI) model name
+
+    Returns:
+        transformers pipeline with the same call signature as the PyTorch one
+    """
+    model, tokenizer = _load(model_name, KIND_ZERO_SHOT)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+
+class OnnxSentenceEncoder:
+    """
+    SentenceTransformer-compatible encoder (mean pooling) on ONNX Runtime
+    """
+
+    MAX_SEQ_LENGTH = 256
+
+    def __init__(self, model_name: str):
+        """
+        Initialize the encoder
+
+        Args:
+            model_name: Sentence model name (e.g. 'all-MiniLM-L6-v2')
+        """
+        self.model_name = model_name
+        self.model, self.tokenizer = _load(model_name, KIND_SENTENCE)
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False,
+               convert_to_numpy: bool = True, **kwargs):
+        """
+        Encode sentences like SentenceTransformer.encode
+
+        Args:
+            sentences: A string or a list of strings
+            batch_size: Sentences per forward pass
+            normalize_embeddings: L2-normalize the vectors
+
+        Returns:
+            (n, dim) float32 array, or a single vector for a string input
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        chunks = []
+
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.MAX_SEQ_LENGTH, return_tensors='np')
+            hidden = self.model(**inputs).last_hidden_state
+            hidden = np.asarray(hidden, dtype=np.float32)
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            chunks.append(pooled)
+
+        vectors = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(vectors):
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors[0] if single else vectors
+
+
+def load_sentence_encoder(model_name: str) -> OnnxSentenceEncoder:
+    """
+    Load the quantized sentence encoder
+
+    Args:
+        model_name: Sentence model name
+
+    Returns:
+        OnnxSentenceEncoder instance
+    """
+    return OnnxSentenceEncoder(model_name)
+
+
+def parity_check(model_name: str, kind: str, sample: Optional[List[str]] = None) -> Dict:
+    """
+    Compare quantized ONNX outputs with PyTorch on a fixed sample
+
+    Zero-shot: top-label agreement and the largest score difference.
+    Sentence: lowest cosine similarity between the two embeddings of a text.
+
+    Args:
+        model_name: Model name
+        kind: KIND_ZERO_SHOT or KIND_SENTENCE
+        sample: Texts to compare (defaults to PARITY_SAMPLE)
+
+    Returns:
+        Dictionary with metrics and a 'passed' flag
+    """
+    if not ONNX_AVAILABLE:
+        return {'success': False, 'error': 'optimum[onnxruntime] is not installed'}
+
+    texts = sample or PARITY_SAMPLE
+    exported = export_quantized(model_name, kind)
+    if not exported['success']:
+        return exported
+
+    try:
+        if kind == KIND_ZERO_SHOT:
+            reference = pipeline("zero-shot-classification", model=model_name, device=-1)
+            quantized = load_zero_shot_pipeline(model_name)
+            expected = reference(texts, PARITY_LABELS)
+            actual = quantized(texts, PARITY_LABELS)
+
+            agreement = sum(e['labels'][0] == a['labels'][0] for e, a in zip(expected, actual)) / len(texts)
+            max_diff = 0.0
+            for e, a in zip(expected, actual):
+                scores = dict(zip(a['labels'], a['scores']))
+                max_diff = max(max_diff, max(abs(score - scores[label])
+                                             for label, score in zip(e['labels'], e['scores'])))
+
+            return {
+                'success': True,
+                'model': model_name,
+                'kind': kind,
+                'samples': len(texts),
+                'label_agreement': round(agreement, 4),
+                'max_score_diff': round(max_diff, 4),
+                'passed': agreement >= PARITY_MIN_LABEL_AGREEMENT and max_diff <= PARITY_MAX_SCORE_DIFF
+            }
+
+        from sentence_transformers import SentenceTransformer
+
+        expected = SentenceTransformer(model_name).encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        actual = load_sentence_encoder(model_name).encode(texts, normalize_embeddings=True)
+        cosines = (np.asarray(expected, dtype=np.float32) * actual).sum(axis=1)
+
+        return {
+            'success': True,
+            'model': model_name,
+            'kind': kind,
+            'samples': len(texts),
+            'min_cosine': round(float(cosines.min()), 4),
+            'mean_cosine': round(float(cosines.mean()), 4),
+            'passed': float(cosines.min()) >= PARITY_MIN_COSINE
+        }
+
+    except Exception as e:
+        logger.error(f"Parity check error for {model_name}: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export quantized ONNX models and check parity')
+    parser.add_argument('command', choices=['export', 'export-all', 'parity'])
+    parser.add_argument('--kind', choices=[KIND_ZERO_SHOT, KIND_SENTENCE])
+    parser.add_argument('--model')
+    parser.add_argument('--force', action='store_true', help='Re-export an existing model')
+    args = parser.parse_args()
+    if args.command != 'export-all' and not (args.kind and args.model):
+        parser.error(f'{args.command} requires --kind and --model')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'export-all':
+        # Run before the app starts; nothing to do on the PyTorch backend
+        if not onnx_enabled():
+            sys.exit(0)
+        results = {model_name: export_quantized(model_name, kind, force=args.force)
+                   for kind, model_name in export_models()}
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if all(result['success'] for result in results.values()) else 1)
+    elif args.command == 'export':
+        result = export_quantized(args.model, args.kind, force=args.force)
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result['success'] else 1)
+    else:
+        result = parity_check(args.model, args.kind)
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result.get('passed') else 1)
@@ -0,0 +1,404 @@
+"""
+GramSetu AI - Response Cache
+Bounded cache for computed API responses
+
+Features:
+- In-process LRU tier with a maximum size and per-entry TTL
+- Optional Redis tier shared by all workers (when REDIS_URL is set)
+- Single-flight: concurrent misses on a key wait for one computation
+  (across processes too, through a Redis lock)
+- Tag invalidation: entries record the version of their tags; writers bump
+  the version inside their own transaction, so every process sees it
+- Stale-while-revalidate: an expired entry is served for a grace period
+  while one background refresh recomputes it
+- Strong ETag per entry (tag versions + body digest, computed once) for
+  conditional GETs; tag versions are re-read from SQLite at most once per
+  RESPONSE_CACHE_VERSION_CHECK_SECONDS, so cache hits and 304s do no I/O
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Cache settings (overridable through the environment)
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+RESPONSE_CACHE_STALE_SECONDS = float(os.environ.get('RESPONSE_CACHE_STALE_SECONDS', 30))
+RESPONSE_CACHE_REVALIDATE_WORKERS = int(os.environ.get('RESPONSE_CACHE_REVALIDATE_WORKERS', 2))
+RESPONSE_CACHE_VERSION_CHECK_SECONDS = float(os.environ.get('RESPONSE_CACHE_VERSION_CHECK_SECONDS', 1))
+
+
+class _Flight:
+    """One in-progress computation that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class ResponseCache:
+    """
+    Two-tier TTL + LRU cache with tag invalidation
+    """
+
+    REDIS_KEY_PREFIX = 'gramsetu:response:'
+    REDIS_LOCK_PREFIX = 'gramsetu:response-lock:'
+
+    # How long a caller waits for another worker's computation before
+    # computing itself
+    FLIGHT_WAIT_SECONDS = 10
+    REDIS_POLL_SECONDS = 0.05
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, redis_client=None,
+                 stale_seconds: float = RESPONSE_CACHE_STALE_SECONDS):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum entries in the in-process tier
+            redis_client: Optional Redis client for the shared tier
+            stale_seconds: How long past its TTL an entry may be served while
+                           it is recomputed
+        """
+        logger.info("Initializing ResponseCache")
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.stale_seconds = stale_seconds
+        self.db_pool = get_db_pool(DB_PATH)
+
+        self._memory: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._refreshing = set()
+        self._versions: Dict[str, int] = {}
+        self._versions_checked_at = 0.0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stats = {
+            'memory_hits': 0, 'redis_hits': 0, 'stale_hits': 0, 'misses': 0,
+            'coalesced': 0, 'revalidations': 0, 'evictions': 0, 'invalidations': 0
+        }
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the tag version table exists"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS response_cache_tags (
+                        tag TEXT PRIMARY KEY,
+                        version INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+            logger.info("Response cache tag table ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring response cache tag table: {str(e)}")
+
+    def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        """
+        Current version of each tag (0 if never invalidated)
+
+        Versions are re-read from SQLite at most once per
+        RESPONSE_CACHE_VERSION_CHECK_SECONDS; invalidations made by this
+        process force a re-read.
+
+        Args:
+            tags: Tag names
+
+        Returns:
+            Dictionary of tag to version
+        """
+        tags = sorted(set(tags))
+        if not tags:
+            return {}
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._versions_checked_at < RESPONSE_CACHE_VERSION_CHECK_SECONDS:
+                return {tag: self._versions.get(tag, 0) for tag in tags}
+
+        try:
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute('SELECT tag, version FROM response_cache_tags')
+            versions = {row[0]: row[1] for row in cursor.fetchall()}
+            with self._lock:
+                self._versions = versions
+                self._versions_checked_at = now
+        except Exception as e:
+            logger.debug(f"Response cache tag read error: {str(e)}")
+            with self._lock:
+                versions = dict(self._versions)
+        return {tag: versions.get(tag, 0) for tag in tags}
+
+    def invalidate(self, conn, *tags: str):
+        """
+        Invalidate every entry carrying any of the tags
+
+        Call inside the writing transaction: the bump commits (and becomes
+        visible to every process) together with the data it describes.
+
+        Args:
+            conn: Connection of the writing transaction
+            tags: Tag names
+        """
+        conn.executemany('''
+            INSERT INTO response_cache_tags (tag, version) VALUES (?, 1)
+            ON CONFLICT(tag) DO UPDATE SET version = version + 1
+        ''', [(tag,) for tag in tags])
+
+        # Drop local entries now rather than on their next lookup, and re-read
+        # versions on the next request
+        with self._lock:
+            for key in [key for key, entry in self._memory.items() if set(entry['versions']) & set(tags)]:
+                del self._memory[key]
+            self._versions_checked_at = 0.0
+            self._stats['invalidations'] += 1
+
+    def on_complaints_inserted(self, conn, complaints):
+        """Insert hook for ComplaintIngestor: invalidate complaint-derived responses"""
+        self.invalidate(conn, 'complaints')
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: float,
+                       tags: Iterable[str] = (), should_cache: Optional[Callable[[Any], bool]] = None,
+                       revalidate: Optional[Callable[[Callable[[], None]], Callable[[], None]]] = None) -> Any:
+        """
+        Return the cached value or compute it (once, however many callers miss)
+
+        Args:
+            key: Cache key
+            compute: Produces a JSON-serializable value
+            ttl: Seconds the value is fresh
+            tags: Tags the value depends on
+            should_cache: Returns False for values that must not be cached
+                          (e.g. error responses)
+            revalidate: Wraps the background refresh (e.g. to carry a request context)
+
+        Returns:
+            Cached or computed value
+        """
+        return self.get_or_compute_entry(key, compute, ttl, tags, should_cache, revalidate)['value']
+
+    def get_or_compute_entry(self, key: str, compute: Callable[[], Any], ttl: float,
+                             tags: Iterable[str] = (), should_cache: Optional[Callable[[Any], bool]] = None,
+                             revalidate: Optional[Callable[[Callable[[], None]], Callable[[], None]]] = None) -> Dict:
+        """
+        Like get_or_compute, but returns the whole entry
+
+        Returns:
+            Dictionary with 'value' and 'etag' (None for uncached values)
+        """
+        versions = self.tag_versions(tags)
+        entry = self._lookup(key, versions)
+        now = time.time()
+
+        if entry is not None and now < entry['fresh_until']:
+            return entry
+
+        if entry is not None and now < entry['stale_until']:
+            with self._lock:
+                self._stats['stale_hits'] += 1
+            self._refresh_in_background(key, compute, ttl, tags, should_cache, revalidate)
+            return entry
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return self._compute_once(key, compute, ttl, tags, should_cache)
+
+    def _lookup(self, key: str, versions: Dict[str, int]) -> Optional[Dict]:
+        """Entry from the fastest tier whose tag versions are current"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry['versions'] == versions:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return entry
+                del self._memory[key]
+
+        if self.redis_client is not None:
+            try:
+                cached = self.redis_client.get(self._redis_key(key))
+                if cached:
+                    entry = json.loads(cached)
+                    if entry['versions'] == versions:
+                        self._remember(key, entry)
+                        with self._lock:
+                            self._stats['redis_hits'] += 1
+                        return entry
+            except Exception as e:
+                logger.debug(f"Response cache Redis error: {str(e)}")
+        return None
+
+    def _compute_once(self, key: str, compute: Callable[[], Any], ttl: float, tags: Iterable[str],
+                      should_cache: Optional[Callable[[Any], bool]]) -> Dict:
+        """Compute an entry, sharing it with concurrent callers of this process"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            with self._lock:
+                self._stats['coalesced'] += 1
+            if flight.done.wait(self.FLIGHT_WAIT_SECONDS) and flight.entry is not None:
+                return flight.entry
+            return {'value': compute(), 'etag': None}
+
+        try:
+            flight.entry = self._compute_shared(key, compute, ttl, tags, should_cache)
+            return flight.entry
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _compute_shared(self, key: str, compute: Callable[[], Any], ttl: float, tags: Iterable[str],
+                        should_cache: Optional[Callable[[Any], bool]]) -> Dict:
+        """Compute under the Redis lock so other processes wait for this result"""
+        lock_key = self.REDIS_LOCK_PREFIX + hashlib.sha256(key.encode('utf-8')).hexdigest()
+        locked = False
+        if self.redis_client is not None:
+            try:
+                locked = bool(self.redis_client.set(lock_key, os.getpid(), nx=True,
+                                                    px=int(self.FLIGHT_WAIT_SECONDS * 1000)))
+                if not locked:
+                    # Another worker is computing: wait for its entry
+                    deadline = time.time() + self.FLIGHT_WAIT_SECONDS
+                    while time.time() < deadline and self.redis_client.exists(lock_key):
+                        time.sleep(self.REDIS_POLL_SECONDS)
+                    entry = self._lookup(key, self.tag_versions(tags))
+                    if entry is not None:
+                        with self._lock:
+                            self._stats['coalesced'] += 1
+                        return entry
+            except Exception as e:
+                logger.debug(f"Response cache Redis lock error: {str(e)}")
+
+        try:
+            # Versions are read before computing: a write that lands meanwhile
+            # leaves the entry already outdated rather than wrongly current
+            versions = self.tag_versions(tags)
+            value = compute()
+            if should_cache is None or should_cache(value):
+                return self._store(key, value, ttl, versions)
+            return {'value': value, 'etag': None}
+        finally:
+            if locked:
+                try:
+                    self.redis_client.delete(lock_key)
+                except Exception as e:
+                    logger.debug(f"Response cache Redis lock error: {str(e)}")
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any], ttl: float, tags: Iterable[str],
+                               should_cache: Optional[Callable[[Any], bool]],
+                               revalidate: Optional[Callable[[Callable[[], None]], Callable[[], None]]]):
+        """Recompute a stale entry off the request path (one refresh per key)"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                # Created lazily so it starts after any fork
+                self._executor = ThreadPoolExecutor(max_workers=RESPONSE_CACHE_REVALIDATE_WORKERS,
+                                                    thread_name_prefix='response-cache')
+            self._stats['revalidations'] += 1
+
+        def refresh():
+            try:
+                self._compute_once(key, compute, ttl, tags, should_cache)
+            except Exception as e:
+                logger.warning(f"Response cache revalidation failed for {key}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(revalidate(refresh) if revalidate else refresh)
+
+    def _store(self, key: str, value: Any, ttl: float, versions: Dict[str, int]) -> Dict:
+        """Write an entry to every tier"""
+        now = time.time()
+        serialized = json.dumps(value, sort_keys=True)
+        entry = {
+            'value': value,
+            # Strong validator: unchanged data and unchanged body keep the same
+            # tag, even across recomputations after the TTL
+            'etag': '{}-{}'.format(
+                '.'.join(str(versions[tag]) for tag in sorted(versions)) or '0',
+                hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
+            ),
+            'fresh_until': now + ttl,
+            'stale_until': now + ttl + self.stale_seconds,
+            'versions': versions
+        }
+        self._remember(key, entry)
+
+        if self.redis_client is not None:
+            try:
+                self.redis_client.setex(self._redis_key(key), max(1, int(ttl + self.stale_seconds)),
+                                        json.dumps(entry))
+            except Exception as e:
+                logger.debug(f"Response cache Redis error: {str(e)}")
+        return entry
+
+    def _remember(self, key: str, entry: Dict):
+        """Insert into the in-process LRU tier"""
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _redis_key(self, key: str) -> str:
+        return self.REDIS_KEY_PREFIX + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def get_stats(self) -> Dict:
+        """
+        Cache counters
+
+        Returns:
+            Dictionary with hits per tier, misses, hit rate and size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['redis_hits'] + stats['stale_hits']
+        lookups = hits + stats['misses']
+        stats['hits'] = hits
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['redis'] = self.redis_client is not None
+        return stats
+
+# Singleton instance
+_response_cache_instance = None
+
+def get_response_cache(redis_client=None) -> ResponseCache:
+    """
+    Get singleton instance of ResponseCache
+
+    Args:
+        redis_client: Optional Redis client (used on first call only)
+
+    Returns:
+        ResponseCache instance
+    """
+    global _response_cache_instance
+
+    if _response_cache_instance is None:
+        _response_cache_instance = ResponseCache(redis_client=redis_client)
+
+    return _response_cache_instance
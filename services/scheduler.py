@@ -0,0 +1,164 @@
+"""
+GramSetu AI - Background Scheduler
+Periodic maintenance jobs, run in one dedicated process
+
+Features:
+- Web and voice workers start no background threads; periodic work runs here
+- Leader election with an fcntl lock: extra scheduler replicas wait on standby
+  and take over when the leader exits
+- Each job runs on its own interval; a failing job is logged and retried on
+  its next turn
+- Jobs: vector index sync and k-means training, SLA escalation sweep and
+  blockchain anchor flush
+
+Usage:
+    python -m services.scheduler
+    python -m services.scheduler --once  (run every job once and exit)
+"""
+
+import argparse
+import fcntl
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Scheduler settings (overridable through the environment)
+SCHEDULER_LOCK_PATH = os.environ.get('SCHEDULER_LOCK_PATH', 'data/scheduler.lock')
+
+
+class _Job:
+    """One periodic job"""
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.next_run = 0.0
+        self.runs = 0
+        self.errors = 0
+
+
+class Scheduler:
+    """
+    Runs registered jobs on their intervals while holding the leader lock
+    """
+
+    def __init__(self, lock_path: str = SCHEDULER_LOCK_PATH):
+        """
+        Initialize the scheduler
+
+        Args:
+            lock_path: Lock file that elects the one running scheduler
+        """
+        self.lock_path = lock_path
+        self.jobs: List[_Job] = []
+
+    def add_job(self, name: str, interval: float, fn: Callable[[], object]):
+        """
+        Register a periodic job
+
+        Args:
+            name: Job name (for logs)
+            interval: Seconds between runs
+            fn: Callable run with no arguments
+        """
+        self.jobs.append(_Job(name, interval, fn))
+
+    def run_pending(self, force: bool = False) -> Dict[str, object]:
+        """
+        Run every job that is due
+
+        Args:
+            force: Run every job regardless of its interval
+
+        Returns:
+            Dictionary of job name to its result (or error string)
+        """
+        from utils.db_pool import get_db_pool
+
+        results = {}
+        now = time.monotonic()
+        for job in self.jobs:
+            if not force and now < job.next_run:
+                continue
+            try:
+                results[job.name] = job.fn()
+                job.runs += 1
+            except Exception as e:
+                logger.error(f"Scheduled job {job.name} failed: {str(e)}")
+                results[job.name] = str(e)
+                job.errors += 1
+            finally:
+                job.next_run = time.monotonic() + job.interval
+        get_db_pool().release()
+        return results
+
+    def run_forever(self, poll_seconds: float = 1.0):
+        """
+        Become the leader (waiting while another scheduler holds the lock),
+        then run jobs until interrupted
+
+        Args:
+            poll_seconds: Sleep between checks for due jobs
+        """
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        with open(self.lock_path, 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Another scheduler is running; standing by")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            logger.info(f"Scheduler running {len(self.jobs)} job(s): {[job.name for job in self.jobs]}")
+            while True:
+                self.run_pending()
+                next_run = min((job.next_run for job in self.jobs), default=time.monotonic() + poll_seconds)
+                time.sleep(max(0.0, min(poll_seconds, next_run - time.monotonic())))
+
+
+def build_scheduler(lock_path: Optional[str] = None) -> Scheduler:
+    """
+    Scheduler with every maintenance job of the application
+
+    Returns:
+        Scheduler instance
+    """
+    from services.vector_index import VectorIndex, get_vector_index
+    from services.escalation_index import ESCALATION_SWEEP_SECONDS, get_escalation_index
+    from services.blockchain_anchor import ANCHOR_POLL_SECONDS, get_blockchain_anchor
+    from services.response_cache import get_response_cache
+
+    scheduler = Scheduler(lock_path or SCHEDULER_LOCK_PATH)
+
+    vector_index = get_vector_index()
+    if vector_index.is_available():
+        scheduler.add_job('vector_index_sync', VectorIndex.SYNC_INTERVAL_SECONDS,
+                          lambda: vector_index.sync(blocking=False))
+
+    # Flagged breaches change the dashboard; bump its cache tag in the same transaction
+    escalation_index = get_escalation_index()
+    response_cache = get_response_cache()
+    scheduler.add_job('escalation_sweep', ESCALATION_SWEEP_SECONDS,
+                      lambda: escalation_index.sweep(on_breach=lambda conn: response_cache.invalidate(conn, 'complaints')))
+
+    # Flushes on its interval, or early once a full batch is pending
+    blockchain_anchor = get_blockchain_anchor()
+    scheduler.add_job('anchor_flush', ANCHOR_POLL_SECONDS, blockchain_anchor.flush_due)
+
+    return scheduler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GramSetu background scheduler')
+    parser.add_argument('--once', action='store_true', help='run every job once and exit')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    scheduler = build_scheduler()
+    if args.once:
+        print(scheduler.run_pending(force=True))
+    else:
+        scheduler.run_forever()
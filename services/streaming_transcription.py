@@ -0,0 +1,396 @@
+"""
+GramSetu AI - Streaming Transcription
+Rolling Whisper decoding for IVR calls while the caller is still speaking
+
+Features:
+- Audio frames accepted incrementally (raw PCM or G.711 u-law, any rate)
+- Rolling decode over a sliding buffer; stable segments are committed and
+  cut from the buffer, the tail is reported as a partial transcript
+- Long stretches without words (silence, hold music) are dropped from the
+  buffer so each decode stays bounded
+- Classification starts in the background once enough text is committed;
+  it covers a prefix of the call, so callers re-classify the final transcript
+  when it has grown past analysis_text
+- Idle sessions expire; the number of live sessions is bounded
+
+Sessions live in the process that created them, so a stream's requests
+must reach the same web worker (sticky routing by stream id, or a single
+threaded worker for the IVR endpoints).
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from utils.audio_utils import SAMPLE_RATE, decode_pcm_chunk, detect_speech_regions, pcm_sample_width
+
+# NumPy is optional - without it streaming sessions cannot be created
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Streaming settings (overridable through the environment)
+STREAM_MAX_SESSIONS = int(os.environ.get('STREAM_MAX_SESSIONS', 16))
+STREAM_IDLE_TIMEOUT_SECONDS = float(os.environ.get('STREAM_IDLE_TIMEOUT_SECONDS', 60))
+STREAM_MAX_SECONDS = float(os.environ.get('STREAM_MAX_SECONDS', 300))  # same limit as uploads
+
+# Window transcriber signature: (samples, language) -> Whisper-style result
+WindowTranscriber = Callable[[object, Optional[str]], Dict]
+
+# Early classifier signature: (text, language) -> analysis dict
+TextClassifier = Callable[[str, Optional[str]], Dict]
+
+
+class StreamingSession:
+    """
+    One IVR call being transcribed as it arrives
+    """
+
+    # Decode again once this much new audio has arrived
+    STEP_SECONDS = 2.0
+    # Whisper hallucinates on very short windows
+    MIN_DECODE_SECONDS = 1.0
+    # Segments ending within this distance of the buffer end may still change
+    HOLDBACK_SECONDS = 2.0
+    # Commit everything but the last segment once the buffer gets this long
+    MAX_BUFFER_SECONDS = 25.0
+    # Start classifying once this many words are committed
+    MIN_WORDS_FOR_CLASSIFICATION = 8
+
+    def __init__(self, stream_id: str, citizen_id: str, transcribe_fn: WindowTranscriber,
+                 language: Optional[str] = None, sample_rate: int = 8000, encoding: str = 'pcm_s16le',
+                 classify_fn: Optional[TextClassifier] = None):
+        """
+        Initialize the session and start its decoding thread
+
+        Args:
+            stream_id: Session id
+            citizen_id: Caller's citizen id
+            transcribe_fn: Whisper on a 16 kHz window
+            language: Optional language code (locked after the first commit otherwise)
+            sample_rate: Sample rate of the incoming frames
+            encoding: 'pcm_s16le' or 'mulaw'
+            classify_fn: Optional early classifier for committed text
+        """
+        decode_pcm_chunk(b'', encoding, sample_rate)  # reject unsupported encodings up front
+
+        self.stream_id = stream_id
+        self.citizen_id = citizen_id
+        self.language = language
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        self.transcribe_fn = transcribe_fn
+        self.classify_fn = classify_fn
+
+        self.committed_segments: List[Dict] = []
+        self.partial_text = ''
+        self.analysis: Optional[Dict] = None
+        self.analysis_text = ''  # committed text the early analysis was computed on
+        self.error: Optional[str] = None
+        self.status = 'streaming'
+        self.created_at = time.time()
+        self.last_activity = self.created_at
+
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_offset = 0.0  # seconds of audio committed and cut from the buffer
+        self._received_samples = 0
+        self._decoded_samples = 0
+        self._remainder = b''
+        self._finished = False
+        self._classifying = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f'stream-{stream_id[:8]}', daemon=True)
+        self._thread.start()
+
+    @property
+    def audio_seconds(self) -> float:
+        return self._received_samples / SAMPLE_RATE
+
+    @property
+    def committed_text(self) -> str:
+        return ' '.join(segment['text'].strip() for segment in self.committed_segments).strip()
+
+    def add_chunk(self, data: bytes):
+        """
+        Append raw audio frames
+
+        Args:
+            data: Raw bytes in the session's encoding (may split a sample)
+        """
+        width = pcm_sample_width(self.encoding)
+        data = self._remainder + data
+        usable = len(data) - len(data) % width
+        self._remainder = data[usable:]
+        audio = decode_pcm_chunk(data[:usable], self.encoding, self.sample_rate)
+
+        with self._cond:
+            if self._finished:
+                raise ValueError('Stream already finished')
+            if (self._received_samples + len(audio)) / SAMPLE_RATE > STREAM_MAX_SECONDS:
+                raise ValueError(f'Stream exceeds {STREAM_MAX_SECONDS:.0f} seconds')
+            self._buffer = np.concatenate((self._buffer, audio))
+            self._received_samples += len(audio)
+            self.last_activity = time.time()
+            self._cond.notify()
+
+    def finish(self, timeout: float = 120.0) -> Dict:
+        """
+        Mark the end of the call and wait for the final decode
+
+        Args:
+            timeout: Seconds to wait for the decoding thread
+
+        Returns:
+            Transcription result (text, language, segments, duration)
+        """
+        with self._cond:
+            self._finished = True
+            self.last_activity = time.time()
+            self._cond.notify()
+        self._thread.join(timeout)
+
+        if self._thread.is_alive():
+            raise TimeoutError('Final transcription timed out')
+        if self.error:
+            raise RuntimeError(self.error)
+
+        return {
+            'text': self.committed_text,
+            'language': self.language or 'unknown',
+            'segments': self.committed_segments,
+            'duration': self.audio_seconds
+        }
+
+    def snapshot(self) -> Dict:
+        """Current transcript state for polling clients"""
+        with self._cond:
+            return {
+                'stream_id': self.stream_id,
+                'status': self.status,
+                'committed_text': self.committed_text,
+                'partial_text': self.partial_text,
+                'language': self.language,
+                'audio_seconds': round(self.audio_seconds, 2),
+                'analysis': self.analysis,
+                'error': self.error
+            }
+
+    def _run(self):
+        """Decoding loop: wake on new audio, decode the buffer, commit stable segments"""
+        step = int(self.STEP_SECONDS * SAMPLE_RATE)
+        try:
+            while True:
+                with self._cond:
+                    while not self._finished and self._received_samples - self._decoded_samples < step:
+                        self._cond.wait()
+                    final = self._finished
+                    buffer = self._buffer
+                    self._decoded_samples = self._received_samples
+
+                if len(buffer) >= self.MIN_DECODE_SECONDS * SAMPLE_RATE:
+                    self._decode(buffer, final)
+                if final:
+                    break
+                self._maybe_classify()
+
+            self.partial_text = ''
+            self.status = 'finished'
+
+        except Exception as e:
+            logger.error(f"Streaming transcription error ({self.stream_id}): {str(e)}")
+            self.error = str(e)
+            self.status = 'failed'
+
+    def _decode(self, buffer, final: bool):
+        """Decode the uncommitted buffer and move stable segments to the transcript"""
+        result = self.transcribe_fn(buffer, self.language)
+        segments = [segment for segment in result.get('segments', []) if segment['text'].strip()]
+        buffer_seconds = len(buffer) / SAMPLE_RATE
+
+        if final:
+            stable = segments
+        else:
+            stable = [segment for segment in segments if segment['end'] <= buffer_seconds - self.HOLDBACK_SECONDS]
+            if not stable and buffer_seconds > self.MAX_BUFFER_SECONDS:
+                stable = segments[:-1] or segments
+        # No words in a long buffer: without a cut every step re-decodes all of it
+        silent_cut = 0
+        if not final and not stable and buffer_seconds > self.MAX_BUFFER_SECONDS:
+            silent_cut = self._silent_head(buffer)
+
+        with self._cond:
+            if stable:
+                if self.language is None:
+                    # Lock the language so later windows decode faster and consistently
+                    self.language = result.get('language')
+                for segment in stable:
+                    self.committed_segments.append({
+                        'id': len(self.committed_segments),
+                        'start': segment['start'] + self._buffer_offset,
+                        'end': segment['end'] + self._buffer_offset,
+                        'text': segment['text']
+                    })
+                cut = int(stable[-1]['end'] * SAMPLE_RATE)
+            else:
+                cut = silent_cut
+
+            if cut:
+                # Audio received while decoding stays in the buffer
+                self._buffer = self._buffer[cut:]
+                self._buffer_offset += cut / SAMPLE_RATE
+
+            self.partial_text = ' '.join(segment['text'].strip() for segment in segments[len(stable):])
+
+    def _silent_head(self, buffer) -> int:
+        """
+        Samples to drop from a long buffer in which Whisper found no words
+
+        Everything before the holdback goes, except a voiced region that runs
+        into it (speech that is just starting); at most half of
+        MAX_BUFFER_SECONDS is kept so the next decode stays short.
+        """
+        cut = len(buffer) - int(self.HOLDBACK_SECONDS * SAMPLE_RATE)
+        regions = detect_speech_regions(buffer, SAMPLE_RATE)
+        if regions and regions[-1][1] > cut:
+            cut = regions[-1][0]
+        return max(cut, len(buffer) - int(self.MAX_BUFFER_SECONDS / 2 * SAMPLE_RATE))
+
+    def _maybe_classify(self):
+        """Classify committed text in the background once there is enough of it"""
+        if self.classify_fn is None or self.analysis is not None or self._classifying:
+            return
+        text = self.committed_text
+        if len(text.split()) < self.MIN_WORDS_FOR_CLASSIFICATION:
+            return
+
+        self._classifying = True
+
+        def classify():
+            try:
+                self.analysis = self.classify_fn(text, self.language)
+                self.analysis_text = text
+            except Exception as e:
+                logger.warning(f"Early classification failed ({self.stream_id}): {str(e)}")
+            finally:
+                self._classifying = False
+
+        threading.Thread(target=classify, daemon=True).start()
+
+    def wait_for_analysis(self, timeout: float = 10.0) -> Optional[Dict]:
+        """Wait for an early classification that is still running"""
+        deadline = time.time() + timeout
+        while self._classifying and time.time() < deadline:
+            time.sleep(0.05)
+        return self.analysis
+
+
+class StreamingTranscriptionManager:
+    """
+    Registry of live streaming sessions in this process
+    """
+
+    def __init__(self, transcriber_loader: Callable[[], WindowTranscriber],
+                 classify_fn: Optional[TextClassifier] = None):
+        """
+        Initialize the manager
+
+        Args:
+            transcriber_loader: Returns the window transcriber (loads Whisper lazily)
+            classify_fn: Optional early classifier for committed text
+        """
+        logger.info("Initializing StreamingTranscriptionManager")
+        self.transcriber_loader = transcriber_loader
+        self.classify_fn = classify_fn
+        self._sessions: Dict[str, StreamingSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, citizen_id: str, language: Optional[str] = None, sample_rate: int = 8000,
+               encoding: str = 'pcm_s16le') -> Dict:
+        """
+        Open a streaming session
+
+        Args:
+            citizen_id: Caller's citizen id
+            language: Optional language code
+            sample_rate: Sample rate of the frames that will be sent
+            encoding: 'pcm_s16le' or 'mulaw'
+
+        Returns:
+            Dictionary with the stream id
+        """
+        if np is None:
+            return {'success': False, 'error': 'NumPy is required for streaming transcription'}
+
+        self._expire_idle()
+        with self._lock:
+            if len(self._sessions) >= STREAM_MAX_SESSIONS:
+                return {'success': False, 'error': 'Too many active streams', 'busy': True}
+
+        try:
+            stream_id = uuid.uuid4().hex
+            session = StreamingSession(stream_id, citizen_id, self.transcriber_loader(), language,
+                                       sample_rate, encoding, self.classify_fn)
+        except Exception as e:
+            logger.error(f"Error creating stream: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+        with self._lock:
+            self._sessions[stream_id] = session
+        logger.info(f"Stream opened: {stream_id}")
+        return {'success': True, 'stream_id': stream_id}
+
+    def get(self, stream_id: str) -> Optional[StreamingSession]:
+        """Get a live session"""
+        with self._lock:
+            return self._sessions.get(stream_id)
+
+    def close(self, stream_id: str):
+        """Forget a session"""
+        with self._lock:
+            self._sessions.pop(stream_id, None)
+
+    def _expire_idle(self):
+        """Stop sessions that have not received audio for a while"""
+        now = time.time()
+        with self._lock:
+            expired = [stream_id for stream_id, session in self._sessions.items()
+                       if now - session.last_activity > STREAM_IDLE_TIMEOUT_SECONDS]
+            sessions = [self._sessions.pop(stream_id) for stream_id in expired]
+
+        for session in sessions:
+            logger.warning(f"Stream {session.stream_id} expired after {STREAM_IDLE_TIMEOUT_SECONDS:.0f}s idle")
+            with session._cond:
+                session._finished = True
+                session._cond.notify()
+
+    def get_stats(self) -> Dict:
+        """Live session count"""
+        with self._lock:
+            return {'active_streams': len(self._sessions), 'max_streams': STREAM_MAX_SESSIONS}
+
+# Singleton instance
+_streaming_manager_instance = None
+
+def get_streaming_manager(transcriber_loader: Optional[Callable[[], WindowTranscriber]] = None,
+                          classify_fn: Optional[TextClassifier] = None) -> StreamingTranscriptionManager:
+    """
+    Get singleton instance of StreamingTranscriptionManager
+
+    Args:
+        transcriber_loader: Window transcriber loader (required on first call)
+        classify_fn: Optional early classifier
+
+    Returns:
+        StreamingTranscriptionManager instance
+    """
+    global _streaming_manager_instance
+
+    if _streaming_manager_instance is None:
+        _streaming_manager_instance = StreamingTranscriptionManager(transcriber_loader, classify_fn)
+
+    return _streaming_manager_instance
@@ -0,0 +1,249 @@
+"""
+GramSetu AI - Transcription Cache
+Content-addressed cache of Whisper results
+
+Features:
+- Key: SHA-256 of the decoded 16 kHz PCM, Whisper model size and language
+  (the same recording in another container or bitrate still hits)
+- Lookups accept several model sizes, so a result from a larger model
+  serves a request routed to a smaller one
+- Persistent SQLite table shared by the web process and all voice workers
+- Eviction by age and by entry count (least recently used first)
+- Hit/miss counters
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Union
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Cache settings (overridable through the environment)
+TRANSCRIPTION_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSCRIPTION_CACHE_MAX_ENTRIES', 10000))
+TRANSCRIPTION_CACHE_MAX_AGE_DAYS = int(os.environ.get('TRANSCRIPTION_CACHE_MAX_AGE_DAYS', 30))
+
+
+class TranscriptionCache:
+    """
+    Whisper results keyed by audio content
+    """
+
+    # Run eviction after this many inserts
+    EVICT_EVERY = 50
+
+    def __init__(self, max_entries: int = TRANSCRIPTION_CACHE_MAX_ENTRIES,
+                 max_age_days: int = TRANSCRIPTION_CACHE_MAX_AGE_DAYS):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum cached transcriptions
+            max_age_days: Entries not used for this long are dropped
+        """
+        logger.info("Initializing TranscriptionCache")
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.db_pool = get_db_pool(DB_PATH)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._inserts = 0
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the cache table exists"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS transcription_cache (
+                        audio_hash TEXT NOT NULL,
+                        model_size TEXT NOT NULL,
+                        language TEXT NOT NULL,
+                        result TEXT NOT NULL,
+                        created_at TIMESTAMP NOT NULL,
+                        last_used_at TIMESTAMP NOT NULL,
+                        PRIMARY KEY (audio_hash, model_size, language)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_transcription_cache_last_used
+                    ON transcription_cache(last_used_at)
+                ''')
+            logger.info("Transcription cache table ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring transcription cache table: {str(e)}")
+
+    @staticmethod
+    def hash_audio(audio) -> str:
+        """
+        Content hash of decoded samples (or raw bytes)
+
+        Args:
+            audio: NumPy array of samples, or bytes
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        data = audio if isinstance(audio, (bytes, bytearray, memoryview)) else audio.tobytes()
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, audio_hash: str, model_sizes: Union[str, Sequence[str]],
+            language: Optional[str] = None) -> Optional[Dict]:
+        """
+        Look up a transcription
+
+        Args:
+            audio_hash: Content hash of the audio
+            model_sizes: Acceptable Whisper model size, or sizes in order of
+                         preference (the first one cached wins)
+            language: Requested language code (None for auto-detect)
+
+        Returns:
+            Cached transcription result, or None on a miss
+        """
+        if isinstance(model_sizes, str):
+            model_sizes = [model_sizes]
+        row = None
+        try:
+            # Plain read: misses must not take the write lock
+            cursor = self.db_pool.connection().cursor()
+            placeholders = ','.join('?' * len(model_sizes))
+            cursor.execute(f'''
+                SELECT model_size, result FROM transcription_cache
+                WHERE audio_hash = ? AND language = ? AND model_size IN ({placeholders})
+            ''', (audio_hash, language or '', *model_sizes))
+            cached = dict(cursor.fetchall())
+            model_size = next((size for size in model_sizes if size in cached), None)
+            if model_size is not None:
+                row = (cached[model_size],)
+
+        except Exception as e:
+            logger.warning(f"Transcription cache read error: {str(e)}")
+            row = None
+
+        if row is not None:
+            self._touch(audio_hash, model_size, language)
+        with self._lock:
+            self._stats['hits' if row is not None else 'misses'] += 1
+        return json.loads(row[0]) if row is not None else None
+
+    def _touch(self, audio_hash: str, model_size: str, language: Optional[str]):
+        """Mark an entry as used (best effort: a busy database skips it)"""
+        try:
+            with self.db_pool.transaction() as conn:
+                conn.execute('''
+                    UPDATE transcription_cache SET last_used_at = ?
+                    WHERE audio_hash = ? AND model_size = ? AND language = ?
+                ''', (datetime.utcnow().isoformat(), audio_hash, model_size, language or ''))
+        except Exception as e:
+            logger.debug(f"Transcription cache touch skipped: {str(e)}")
+
+    def set(self, audio_hash: str, model_size: str, language: Optional[str], result: Dict):
+        """
+        Store a transcription
+
+        Args:
+            audio_hash: Content hash of the audio
+            model_size: Whisper model size
+            language: Requested language code (None for auto-detect)
+            result: JSON-serializable transcription result
+        """
+        now = datetime.utcnow().isoformat()
+        try:
+            with self.db_pool.transaction() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO transcription_cache
+                    (audio_hash, model_size, language, result, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (audio_hash, model_size, language or '', json.dumps(result), now, now))
+
+        except Exception as e:
+            logger.warning(f"Transcription cache write error: {str(e)}")
+            return
+
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % self.EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop entries unused for max_age_days, then the least recently used
+        beyond max_entries
+
+        Returns:
+            Number of entries removed
+        """
+        cutoff = (datetime.utcnow() - timedelta(days=self.max_age_days)).isoformat()
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM transcription_cache WHERE last_used_at < ?', (cutoff,))
+                removed = cursor.rowcount
+
+                cursor.execute('''
+                    DELETE FROM transcription_cache WHERE rowid IN (
+                        SELECT rowid FROM transcription_cache
+                        ORDER BY last_used_at DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,))
+                removed += cursor.rowcount
+
+        except Exception as e:
+            logger.warning(f"Transcription cache eviction error: {str(e)}")
+            return 0
+
+        if removed:
+            logger.info(f"Evicted {removed} transcription cache entries")
+            with self._lock:
+                self._stats['evictions'] += removed
+        return removed
+
+    def get_stats(self) -> Dict:
+        """
+        Cache counters (this process) and size (shared table)
+
+        Returns:
+            Dictionary with hits, misses, hit rate, evictions and size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        try:
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute('SELECT COUNT(*) FROM transcription_cache')
+            stats['size'] = cursor.fetchone()[0]
+        except Exception:
+            stats['size'] = None
+        stats['max_entries'] = self.max_entries
+        stats['max_age_days'] = self.max_age_days
+        return stats
+
+# Singleton instance
+_transcription_cache_instance = None
+
+def get_transcription_cache() -> TranscriptionCache:
+    """
+    Get singleton instance of TranscriptionCache
+
+    Returns:
+        TranscriptionCache instance
+    """
+    global _transcription_cache_instance
+
+    if _transcription_cache_instance is None:
+        _transcription_cache_instance = TranscriptionCache()
+
+    return _transcription_cache_instance
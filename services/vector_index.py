@@ -0,0 +1,622 @@
+"""
+GramSetu AI - Complaint Vector Index
+Approximate nearest neighbour search over all complaint embeddings
+
+Features:
+- IVF-flat index on NumPy (spherical k-means coarse quantizer, exact re-scoring)
+- One partition per complaint category
+- Partitions persisted as raw float32/int64 files and opened with np.memmap
+- Incremental sync from complaint_embeddings (by write sequence), crash-safe
+- New complaints searchable immediately in the inserting process
+- Shared by all gunicorn workers: one writer (file lock), readers reload on change
+- Sync and k-means training run in the background scheduler, never in search()
+- Follows the model tag (model + inference backend) of the newest embeddings;
+  queries encoded on another backend are not compared against it
+
+Usage (sync / rebuild):
+    python -m services.vector_index --sync
+    python -m services.scheduler  (syncs every SYNC_INTERVAL_SECONDS)
+"""
+
+import argparse
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.db_pool import get_db_pool
+from services.embedding_store import EmbeddingStore, get_embedding_store
+
+# NumPy is optional - without it the index reports itself unavailable
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Index directory (overridable through the environment)
+VECTOR_INDEX_DIR = os.environ.get('VECTOR_INDEX_DIR', 'data/vector_index')
+
+
+class _Partition:
+    """In-memory view of one category partition"""
+
+    def __init__(self, category: str):
+        self.category = category
+        self.count = 0
+        self.ids = None          # memmap int64 (count,)
+        self.vectors = None      # memmap float32 (count, DIMENSION)
+        self.centroids = None    # ndarray float32 (nlist, DIMENSION) once trained
+        self.lists: List = []    # row numbers per inverted list
+        # Rows inserted by this process and not yet persisted by sync()
+        self.tail_ids: List[int] = []
+        self.tail_vectors: List = []
+
+
+class VectorIndex:
+    """
+    IVF-flat index over complaint embeddings, partitioned by category
+    """
+
+    DIMENSION = EmbeddingStore.DIMENSION
+
+    # Partitions below this size are scanned exhaustively (no training)
+    MIN_TRAIN_SIZE = 4096
+    # Retrain a partition once it has grown this much since training
+    RETRAIN_GROWTH = 4.0
+    MAX_LISTS = 4096
+    KMEANS_ITERATIONS = 10
+    KMEANS_SAMPLE_PER_LIST = 64
+
+    DEFAULT_NPROBE = 8
+    SYNC_BATCH_SIZE = 5000
+    SYNC_INTERVAL_SECONDS = 30
+    MAX_TAIL_SIZE = 50000
+
+    # Score matrix rows processed at once when assigning to lists
+    ASSIGN_CHUNK_SIZE = 65536
+
+    def __init__(self, index_dir: str = VECTOR_INDEX_DIR):
+        """
+        Initialize the vector index
+
+        Args:
+            index_dir: Directory holding the partition files
+        """
+        logger.info("Initializing VectorIndex")
+        self.db_pool = get_db_pool(DB_PATH)
+        self.embedding_store = get_embedding_store()
+        self.index_dir = index_dir
+        self._partitions: Dict[str, _Partition] = {}
+        self._meta_mtime = None
+        self._model_tag = EmbeddingStore.MODEL_NAME
+        self._lock = threading.RLock()
+
+    def is_available(self) -> bool:
+        """Whether the index can be used in this process"""
+        return np is not None
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, vector, category: Optional[str] = None, k: int = 10,
+               nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Find the nearest complaints to a normalized embedding
+
+        Args:
+            vector: Query embedding (DIMENSION,)
+            category: Restrict to one category partition (all partitions if None)
+            k: Number of neighbours
+            nprobe: Inverted lists scanned per partition
+
+        Returns:
+            List of (complaint_id, cosine_similarity), best first
+        """
+        if np is None:
+            return []
+
+        # Cheap stat of meta.json; syncing is the scheduler's job
+        self._maybe_reload()
+
+        query = np.asarray(vector, dtype=np.float32)
+        nprobe = nprobe or self.DEFAULT_NPROBE
+
+        with self._lock:
+            if category is not None:
+                partitions = [self._partitions[category]] if category in self._partitions else []
+            else:
+                partitions = list(self._partitions.values())
+
+            candidate_ids = []
+            candidate_scores = []
+            for partition in partitions:
+                ids, scores = self._search_partition(partition, query, k, nprobe)
+                candidate_ids.append(ids)
+                candidate_scores.append(scores)
+
+        if not candidate_ids:
+            return []
+
+        ids = np.concatenate(candidate_ids)
+        scores = np.concatenate(candidate_scores)
+
+        # A complaint re-embedded after a model change can appear twice
+        best: Dict[int, float] = {}
+        for complaint_id, score in zip(ids.tolist(), scores.tolist()):
+            if score > best.get(complaint_id, -2.0):
+                best[complaint_id] = score
+
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def search_text(self, text: str, category: Optional[str] = None, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Encode a text and search the index
+
+        Args:
+            text: Query text
+            category: Restrict to one category partition
+            k: Number of neighbours
+
+        Returns:
+            List of (complaint_id, cosine_similarity), empty if no model is available
+        """
+        vectors = self.embedding_store.encode([text])
+        if vectors is None or not self._matches_model():
+            return []
+        return self.search(vectors[0], category=category, k=k)
+
+    def is_ready(self) -> bool:
+        """Whether the index has been synced with the model this process encodes with"""
+        if np is None:
+            return False
+        self._maybe_reload()
+        return self._meta_mtime is not None and self.embedding_store.model_tag() == self._model_tag
+
+    def _matches_model(self) -> bool:
+        """Whether this process encodes with the model and backend the index holds"""
+        self._maybe_reload()
+        return self.embedding_store.model_tag() == self._model_tag
+
+    def _search_partition(self, partition: _Partition, query, k: int, nprobe: int):
+        """Top-k candidates of one partition (persisted rows plus in-process tail)"""
+        ids_parts = []
+        score_parts = []
+
+        if partition.count:
+            if partition.centroids is None:
+                rows = None  # small partition: exhaustive scan
+            else:
+                centroid_scores = partition.centroids @ query
+                probe = min(nprobe, len(centroid_scores))
+                lists = np.argpartition(-centroid_scores, probe - 1)[:probe]
+                rows = np.concatenate([partition.lists[l] for l in lists])
+                rows.sort()  # sequential memmap access
+
+            if rows is None:
+                ids_parts.append(np.asarray(partition.ids[:partition.count]))
+                score_parts.append(partition.vectors[:partition.count] @ query)
+            elif len(rows):
+                ids_parts.append(partition.ids[rows])
+                score_parts.append(partition.vectors[rows] @ query)
+
+        if partition.tail_ids:
+            ids_parts.append(np.asarray(partition.tail_ids, dtype=np.int64))
+            score_parts.append(np.vstack(partition.tail_vectors) @ query)
+
+        if not ids_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        ids = np.concatenate(ids_parts)
+        scores = np.concatenate(score_parts)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        return ids, scores
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def on_complaints_inserted(self, conn: sqlite3.Connection, complaints: List[Dict]):
+        """
+        ComplaintIngestor insert hook: make new complaints searchable right away
+
+        Vectors come from the ingestor's encoder (or the embedding store's
+        memo). They are persisted by the next sync(), which reads
+        complaint_embeddings.
+        """
+        if np is None:
+            return
+        try:
+            if all(complaint.get('vector') is not None for complaint in complaints):
+                vectors = [complaint['vector'] for complaint in complaints]
+            else:
+                vectors = self.embedding_store.encode([complaint['text'] for complaint in complaints])
+            if vectors is None or not self._matches_model():
+                return
+            with self._lock:
+                for complaint, vector in zip(complaints, vectors):
+                    category = complaint['category'] or ''
+                    partition = self._partitions.get(category)
+                    if partition is None:
+                        partition = self._partitions[category] = _Partition(category)
+                    if len(partition.tail_ids) < self.MAX_TAIL_SIZE:
+                        partition.tail_ids.append(complaint['id'])
+                        partition.tail_vectors.append(vector[None, :])
+        except Exception as e:
+            logger.warning(f"Vector index insert hook error: {str(e)}")
+
+    def sync(self, blocking: bool = True, batch_size: Optional[int] = None) -> Dict:
+        """
+        Append embeddings written since the last sync and retrain grown partitions
+
+        Only one process syncs at a time; partition files are truncated to the
+        committed row count first, so an interrupted sync is simply redone.
+
+        Args:
+            blocking: Wait for another process's sync instead of skipping
+            batch_size: Embeddings read per batch
+
+        Returns:
+            Dictionary with sync results
+        """
+        if np is None:
+            return {'success': False, 'error': 'NumPy not available'}
+
+        batch_size = batch_size or self.SYNC_BATCH_SIZE
+        added = 0
+        retrained = []
+
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with self._file_lock(blocking) as locked:
+                if not locked:
+                    return {'success': True, 'skipped': True}
+
+                meta = self._read_meta()
+                cursor = self.db_pool.connection().cursor()
+                model_tag = self._latest_model_tag(cursor, meta.get('model'))
+                if meta.get('model') != model_tag:
+                    # Different embedding model or backend: start over
+                    self._remove_partition_files(meta)
+                    meta = {'model': model_tag, 'high_water': 0, 'partitions': {}}
+
+                for info in meta['partitions'].values():
+                    self._truncate_partition_files(info)
+                    # Left behind if a crash followed a retrain's meta commit
+                    self._remove_stale_generations(info)
+
+                while True:
+                    cursor.execute('''
+                        SELECT e.seq, e.complaint_id, COALESCE(c.category, ''), e.embedding
+                        FROM complaint_embeddings e
+                        JOIN complaints c ON c.id = e.complaint_id
+                        WHERE e.model = ? AND e.seq > ?
+                        ORDER BY e.seq
+                        LIMIT ?
+                    ''', (model_tag, meta['high_water'], batch_size))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+
+                    grouped: Dict[str, Tuple[List[int], List[bytes]]] = {}
+                    for _, complaint_id, category, blob in rows:
+                        ids, blobs = grouped.setdefault(category, ([], []))
+                        ids.append(complaint_id)
+                        blobs.append(blob)
+
+                    for category, (ids, blobs) in grouped.items():
+                        info = meta['partitions'].get(category)
+                        if info is None:
+                            info = meta['partitions'][category] = {
+                                'slug': self._slug(category, meta['partitions']),
+                                'count': 0,
+                                'generation': 0,
+                                'trained_count': 0,
+                                'nlist': 0
+                            }
+                        vectors = np.frombuffer(b''.join(blobs), dtype='<f4').reshape(-1, self.DIMENSION)
+                        self._append_rows(info, np.asarray(ids, dtype=np.int64), vectors)
+
+                    added += len(rows)
+                    meta['high_water'] = rows[-1][0]
+
+                    # Commit progress so a crash only repeats the current batch
+                    self._write_meta(meta)
+
+                for category, info in meta['partitions'].items():
+                    if self._needs_training(info):
+                        self._train_partition(info)
+                        retrained.append(category)
+                        self._write_meta(meta)
+                        # Only now does no committed meta point at the old generation
+                        self._remove_stale_generations(info)
+
+            self._maybe_reload(force=True)
+            if added or retrained:
+                logger.info(f"Vector index synced: {added} rows added, retrained {retrained}")
+
+            return {
+                'success': True,
+                'added': added,
+                'retrained': retrained,
+                'high_water': meta['high_water']
+            }
+
+        except Exception as e:
+            logger.error(f"Vector index sync error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def _append_rows(self, info: Dict, ids, vectors):
+        """Append rows to a partition's files, assigning them to inverted lists"""
+        if info['nlist']:
+            centroids = np.load(self._path(info, 'centroids.npy', generation=True))
+            assign = self._assign(vectors, centroids)
+        else:
+            assign = np.zeros(len(ids), dtype=np.int32)
+
+        with open(self._path(info, 'ids'), 'ab') as f:
+            f.write(ids.astype('<i8').tobytes())
+        with open(self._path(info, 'vec'), 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+        with open(self._path(info, 'list', generation=True), 'ab') as f:
+            f.write(assign.astype('<i4').tobytes())
+
+        info['count'] += len(ids)
+
+    def _needs_training(self, info: Dict) -> bool:
+        """Whether a partition should be (re)trained"""
+        if info['count'] < self.MIN_TRAIN_SIZE:
+            return False
+        if not info['nlist']:
+            return True
+        return info['count'] >= info['trained_count'] * self.RETRAIN_GROWTH
+
+    def _train_partition(self, info: Dict):
+        """
+        Train the coarse quantizer of a partition and reassign every row
+
+        Vectors and IDs are untouched; new centroids and list assignments are
+        written under a new generation so readers never mix generations. The
+        old generation stays on disk until the caller has committed the meta.
+        """
+        count = info['count']
+        vectors = np.memmap(self._path(info, 'vec'), dtype='<f4', mode='r', shape=(count, self.DIMENSION))
+
+        nlist = int(min(self.MAX_LISTS, max(1, math.sqrt(count))))
+        rng = np.random.default_rng(42)
+        sample_size = min(count, nlist * self.KMEANS_SAMPLE_PER_LIST)
+        sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))])
+
+        # Spherical k-means: vectors are normalized, similarity is a dot product
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.KMEANS_ITERATIONS):
+            assign = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        info['generation'] += 1
+        np.save(self._path(info, 'centroids.npy', generation=True), centroids)
+        with open(self._path(info, 'list', generation=True), 'wb') as f:
+            for start in range(0, count, self.ASSIGN_CHUNK_SIZE):
+                chunk = np.asarray(vectors[start:start + self.ASSIGN_CHUNK_SIZE])
+                f.write(self._assign(chunk, centroids).astype('<i4').tobytes())
+
+        info['nlist'] = nlist
+        info['trained_count'] = count
+        del vectors
+
+    def _remove_stale_generations(self, info: Dict):
+        """Delete list and centroid files of generations other than the committed one"""
+        pattern = re.compile(rf"^{re.escape(info['slug'])}\.(\d+)\.(list|centroids\.npy)$")
+        for name in os.listdir(self.index_dir):
+            match = pattern.match(name)
+            if match and int(match.group(1)) != info['generation']:
+                os.remove(os.path.join(self.index_dir, name))
+
+    def _assign(self, vectors, centroids):
+        """Nearest centroid of each vector"""
+        assign = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), self.ASSIGN_CHUNK_SIZE):
+            chunk = vectors[start:start + self.ASSIGN_CHUNK_SIZE]
+            assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return assign
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _maybe_reload(self, force: bool = False):
+        """Reopen partition files when another process (or sync) changed them"""
+        meta_path = os.path.join(self.index_dir, 'meta.json')
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if not force and mtime == self._meta_mtime:
+            return
+
+        try:
+            meta = self._read_meta()
+            partitions = {}
+            for category, info in meta['partitions'].items():
+                partitions[category] = self._load_partition(category, info)
+        except (OSError, ValueError) as e:
+            # Files of an older generation were replaced mid-read; retry next time
+            logger.warning(f"Vector index reload deferred: {str(e)}")
+            return
+
+        with self._lock:
+            for category, partition in partitions.items():
+                old = self._partitions.get(category)
+                if old is not None and old.tail_ids:
+                    # Keep tail rows that the persisted partition does not have yet
+                    if partition.count:
+                        persisted = np.isin(np.asarray(old.tail_ids, dtype=np.int64), partition.ids)
+                    else:
+                        persisted = [False] * len(old.tail_ids)
+                    for complaint_id, vector, done in zip(old.tail_ids, old.tail_vectors, persisted):
+                        if not done:
+                            partition.tail_ids.append(complaint_id)
+                            partition.tail_vectors.append(vector)
+            for category, old in self._partitions.items():
+                if category not in partitions:
+                    partitions[category] = old
+            self._partitions = partitions
+            self._meta_mtime = mtime
+            self._model_tag = meta.get('model', EmbeddingStore.MODEL_NAME)
+
+    def _load_partition(self, category: str, info: Dict) -> _Partition:
+        """Open one partition's files"""
+        partition = _Partition(category)
+        count = info['count']
+        partition.count = count
+        if not count:
+            return partition
+
+        partition.ids = np.memmap(self._path(info, 'ids'), dtype='<i8', mode='r', shape=(count,))
+        partition.vectors = np.memmap(self._path(info, 'vec'), dtype='<f4', mode='r',
+                                      shape=(count, self.DIMENSION))
+
+        if info['nlist']:
+            partition.centroids = np.load(self._path(info, 'centroids.npy', generation=True))
+            assign = np.fromfile(self._path(info, 'list', generation=True), dtype='<i4', count=count)
+            order = np.argsort(assign, kind='stable')
+            bounds = np.searchsorted(assign[order], np.arange(info['nlist'] + 1))
+            partition.lists = [order[bounds[l]:bounds[l + 1]] for l in range(info['nlist'])]
+
+        return partition
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self, blocking: bool) -> Iterator[bool]:
+        """Exclusive cross-process lock for writers"""
+        with open(os.path.join(self.index_dir, '.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _latest_model_tag(self, cursor, default: Optional[str]) -> str:
+        """Model tag of the most recently written embedding (default when there are none)"""
+        cursor.execute('SELECT model FROM complaint_embeddings ORDER BY seq DESC LIMIT 1')
+        row = cursor.fetchone()
+        return row[0] if row is not None else (default or EmbeddingStore.MODEL_NAME)
+
+    def _read_meta(self) -> Dict:
+        """Read the index metadata"""
+        try:
+            with open(os.path.join(self.index_dir, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'model': EmbeddingStore.MODEL_NAME, 'high_water': 0, 'partitions': {}}
+
+    def _write_meta(self, meta: Dict):
+        """Atomically replace the index metadata"""
+        path = os.path.join(self.index_dir, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _truncate_partition_files(self, info: Dict):
+        """Drop bytes written after the last committed row count"""
+        sizes = {
+            'ids': info['count'] * 8,
+            'vec': info['count'] * self.DIMENSION * 4,
+        }
+        for suffix, size in sizes.items():
+            self._truncate(self._path(info, suffix), size)
+        self._truncate(self._path(info, 'list', generation=True), info['count'] * 4)
+
+    def _truncate(self, path: str, size: int):
+        """Truncate a file to size, creating it if missing"""
+        with open(path, 'ab') as f:
+            if f.tell() > size:
+                f.truncate(size)
+
+    def _remove_partition_files(self, meta: Dict):
+        """Delete every partition file listed in the metadata"""
+        for info in meta.get('partitions', {}).values():
+            for path in (self._path(info, 'ids'), self._path(info, 'vec'),
+                         self._path(info, 'list', generation=True),
+                         self._path(info, 'centroids.npy', generation=True)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _path(self, info: Dict, suffix: str, generation=None) -> str:
+        """Path of a partition file; list and centroid files are versioned"""
+        if generation is True:
+            generation = info['generation']
+        if generation is not None and generation is not False:
+            return os.path.join(self.index_dir, f"{info['slug']}.{generation}.{suffix}")
+        return os.path.join(self.index_dir, f"{info['slug']}.{suffix}")
+
+    def _slug(self, category: str, partitions: Dict) -> str:
+        """Unique filesystem-safe name for a category"""
+        base = re.sub(r'[^a-z0-9]+', '_', category.lower()).strip('_') or 'uncategorized'
+        taken = {info['slug'] for info in partitions.values()}
+        slug = base
+        n = 2
+        while slug in taken:
+            slug = f"{base}_{n}"
+            n += 1
+        return slug
+
+# Singleton instance
+_vector_index_instance = None
+
+def get_vector_index() -> VectorIndex:
+    """
+    Get singleton instance of VectorIndex
+
+    Returns:
+        VectorIndex instance
+    """
+    global _vector_index_instance
+
+    if _vector_index_instance is None:
+        _vector_index_instance = VectorIndex()
+
+    return _vector_index_instance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sync the complaint vector index')
+    parser.add_argument('--sync', action='store_true', help='Append new embeddings and retrain grown partitions')
+    parser.add_argument('--batch-size', type=int, default=VectorIndex.SYNC_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.sync:
+        print(get_vector_index().sync(blocking=True, batch_size=args.batch_size))
+    else:
+        parser.print_help()
@@ -5,29 +5,74 @@ ASR (Automatic Speech Recognition) and Voice Processing Module
 Features:
 - Multi-language ASR using OpenAI Whisper
 - Support for Indian languages (Hindi, Tamil, Gujarati, Bengali, Telugu, etc.)
-- Audio file validation and preprocessing
+- Single in-memory decode to 16 kHz mono float32 (no temp files)
+- Validation, normalization and silence trimming on the decoded array
+- Energy-based VAD: only speech regions are transcribed, in parallel
+  across a process pool for long recordings (one model tier, counted
+  against the Whisper memory budget)
+- Whisper size routed per clip (see whisper_model_pool)
+- Results cached by decoded-audio hash, model size and language; a
+  result from the routed tier or any larger one is reused
+  (see transcription_cache)
 - Integration with complaint classification system
 - Secure API key management
 """
 
 import os
 import logging
-import tempfile
+import multiprocessing
+import threading
+import time
 import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import Dict, Tuple, Optional
+from typing import BinaryIO, Dict, List, Tuple, Optional, Union
 from pathlib import Path
 
 # Audio processing
+import numpy as np
 import whisper
-from pydub import AudioSegment
 import speech_recognition as sr
+from services.whisper_model_pool import get_whisper_model_pool
+from services.transcription_cache import get_transcription_cache
+from utils.audio_utils import (
+    SAMPLE_RATE, decode_audio, audio_duration, normalize_peak, trim_silence, detect_speech_regions
+)
 
 # Language detection
 from langdetect import detect, DetectError
 
 logger = logging.getLogger(__name__)
 
+# Parallel segment transcription (overridable through the environment); by
+# default the cores are shared between the voice job workers
+VOICE_SEGMENT_WORKERS = int(os.environ.get(
+    'VOICE_SEGMENT_WORKERS',
+    max(1, (os.cpu_count() or 1) // int(os.environ.get('VOICE_WORKERS', 1)))
+))
+VAD_MIN_PARALLEL_SECONDS = float(os.environ.get('VAD_MIN_PARALLEL_SECONDS', 30))
+# Model size segment workers load (default: the fastest routed tier)
+VOICE_SEGMENT_MODEL = os.environ.get('VOICE_SEGMENT_MODEL', '')
+
+# Whisper model of a segment worker process (a worker serves a single size)
+_segment_model = None
+
+
+def _init_segment_worker(threads: int):
+    """Share the cores between segment workers"""
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _transcribe_segment(audio: np.ndarray, options: Dict, model_size: str) -> Dict:
+    """Transcribe one speech region in a segment worker (the model is loaded once)"""
+    global _segment_model
+    if _segment_model is None:
+        _segment_model = whisper.load_model(model_size)
+    return _segment_model.transcribe(audio, **options)
+
 
 class VoiceComplaintService:
     """
@@ -55,29 +100,42 @@ class VoiceComplaintService:
     # Max file size (10 MB)
     MAX_FILE_SIZE = 10 * 1024 * 1024
     
-    def __init__(self, model_size: str = 'base'):
+    # Duration limits (seconds)
+    MIN_DURATION = 1
+    MAX_DURATION = 300  # 5 minutes
+    
+    def __init__(self, model_size: Optional[str] = None):
         """
         Initialize the voice complaint service
         
         Args:
-            model_size: Whisper model size ('tiny', 'base', 'small', 'medium', 'large')
+            model_size: Largest Whisper model size to route to ('tiny', 'base',
+                        'small', 'medium', 'large'); None allows every tier
+                        of the model pool
                        - 'tiny': Fastest, least accurate
-                       - 'base': Good balance (recommended for production)
+                       - 'base': Good balance
                        - 'medium': Better accuracy, slower
                        - 'large': Best accuracy, requires GPU
         """
-        self.model_size = model_size
-        self.whisper_model = None
+        self.model_pool = get_whisper_model_pool()
+        self.tiers = self.model_pool.tiers_up_to(model_size)
+        self.model_size = self.tiers[-1]
+        self.transcription_cache = get_transcription_cache()
         self.speech_recognizer = sr.Recognizer()
+        self.segment_model_size = (VOICE_SEGMENT_MODEL if VOICE_SEGMENT_MODEL in self.tiers
+                                   else self.tiers[0])
+        self._segment_pool = None
+        self._segment_workers = 0
+        self._segment_pool_lock = threading.Lock()
         
-        logger.info(f"Initializing VoiceComplaintService with model size: {model_size}")
+        logger.info(f"Initializing VoiceComplaintService with model tiers: {self.tiers}")
         self._load_model()
     
     def _load_model(self):
-        """Load Whisper ASR model"""
+        """Warm the fastest Whisper model; larger tiers load on first use"""
         try:
-            logger.info(f"Loading Whisper model: {self.model_size}")
-            self.whisper_model = whisper.load_model(self.model_size)
+            with self.model_pool.model(self.tiers[0]):
+                pass
             logger.info("Whisper model loaded successfully!")
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {str(e)}")
@@ -85,7 +143,7 @@ class VoiceComplaintService:
     
     def validate_audio_file(self, file_path: str) -> Tuple[bool, str]:
         """
-        Validate audio file format and size
+        Validate audio file format and size (without decoding it)
         
         Args:
             file_path: Path to the audio file
@@ -111,134 +169,159 @@ class VoiceComplaintService:
             if file_extension not in self.SUPPORTED_FORMATS:
                 return False, f"Unsupported format. Supported formats: {', '.join(self.SUPPORTED_FORMATS)}"
             
-            # Try to load audio file
-            try:
-                audio = AudioSegment.from_file(file_path)
-                
-                # Check duration (min 1 second, max 5 minutes)
-                duration_seconds = len(audio) / 1000
-                if duration_seconds < 1:
-                    return False, "Audio too short (minimum 1 second)"
-                if duration_seconds > 300:  # 5 minutes
-                    return False, "Audio too long (maximum 5 minutes)"
-                
-            except Exception as e:
-                return False, f"Invalid audio file: {str(e)}"
-            
             return True, "Valid audio file"
             
         except Exception as e:
             return False, f"Validation error: {str(e)}"
     
-    def preprocess_audio(self, file_path: str) -> str:
+    def load_audio(self, source: Union[str, bytes, BinaryIO]) -> np.ndarray:
         """
-        Preprocess audio file for better ASR results
+        Decode an upload once into a 16 kHz mono float32 array
         
         Args:
-            file_path: Path to the audio file
+            source: File path, raw bytes or readable stream (e.g. the request upload)
         
         Returns:
-            Path to the preprocessed audio file
+            Decoded samples
         """
-        try:
-            logger.info(f"Preprocessing audio file: {file_path}")
-            
-            # Load audio
-            audio = AudioSegment.from_file(file_path)
-            
-            # Normalize audio
-            # Convert to mono
-            if audio.channels > 1:
-                audio = audio.set_channels(1)
-            
-            # Set sample rate to 16kHz (optimal for Whisper)
-            audio = audio.set_frame_rate(16000)
-            
-            # Normalize volume
-            audio = audio.normalize()
-            
-            # Remove silence from start and end
-            audio = audio.strip_silence(silence_thresh=-40, padding=100)
-            
-            # Create temporary file for preprocessed audio
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            temp_path = temp_file.name
-            temp_file.close()
-            
-            # Export preprocessed audio
-            audio.export(temp_path, format='wav')
-            
-            logger.info(f"Audio preprocessed successfully: {temp_path}")
-            return temp_path
-            
-        except Exception as e:
-            logger.error(f"Audio preprocessing error: {str(e)}")
-            raise
+        if isinstance(source, str):
+            is_valid, validation_message = self.validate_audio_file(source)
+            if not is_valid:
+                raise ValueError(validation_message)
+        
+        return decode_audio(source, SAMPLE_RATE, max_bytes=self.MAX_FILE_SIZE)
     
-    def transcribe_audio(self, file_path: str, language: Optional[str] = None) -> Dict:
+    def validate_audio(self, audio: np.ndarray) -> Tuple[bool, str]:
         """
-        Transcribe audio file to text using Whisper
+        Validate decoded audio (emptiness and duration)
         
         Args:
-            file_path: Path to the audio file
+            audio: Decoded samples
+        
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if not len(audio) or not np.any(audio):
+            return False, "Audio is empty"
+        
+        # Check duration (min 1 second, max 5 minutes)
+        duration_seconds = audio_duration(audio, SAMPLE_RATE)
+        if duration_seconds < self.MIN_DURATION:
+            return False, "Audio too short (minimum 1 second)"
+        if duration_seconds > self.MAX_DURATION:
+            return False, "Audio too long (maximum 5 minutes)"
+        
+        return True, "Valid audio"
+    
+    def preprocess_audio(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Preprocess decoded audio for better ASR results
+        
+        Args:
+            audio: Decoded 16 kHz mono samples
+        
+        Returns:
+            Normalized samples with leading/trailing silence removed
+        """
+        # Normalize volume
+        audio = normalize_peak(audio)
+        
+        # Remove silence from start and end
+        return trim_silence(audio, SAMPLE_RATE, silence_thresh_db=-40, padding_ms=100)
+    
+    def transcribe_audio(self, source: Union[str, bytes, BinaryIO, np.ndarray],
+                         language: Optional[str] = None, urgent: bool = False,
+                         queue_depth: int = 0) -> Dict:
+        """
+        Transcribe audio to text using Whisper
+        
+        Args:
+            source: Decoded samples, or a path / bytes / stream to decode
             language: Optional language code (auto-detect if None)
+            urgent: Route to the fastest model
+            queue_depth: Jobs waiting behind this one (large backlogs use faster models)
         
         Returns:
             Dictionary with transcription results
         """
         try:
-            logger.info(f"Transcribing audio: {file_path}")
+            logger.info("Transcribing audio")
+            
+            # Decode once; everything below works on the array
+            audio = source if isinstance(source, np.ndarray) else self.load_audio(source)
             
-            # Validate audio file
-            is_valid, validation_message = self.validate_audio_file(file_path)
+            # Hash the decoded PCM: a re-encoded copy of a recording still matches
+            audio_hash = self.transcription_cache.hash_audio(audio)
+            
+            # Validate audio
+            is_valid, validation_message = self.validate_audio(audio)
             if not is_valid:
                 raise ValueError(validation_message)
             
             # Preprocess audio
-            preprocessed_path = self.preprocess_audio(file_path)
+            audio = self.preprocess_audio(audio)
+            
+            # Skip silence and hold music between utterances
+            regions = detect_speech_regions(audio, SAMPLE_RATE)
+            if not regions:
+                raise ValueError("No speech detected in audio")
             
+            # Transcribe using Whisper
+            transcribe_options = {
+                'fp16': False,  # Use FP32 for CPU compatibility
+                'verbose': False
+            }
+            
+            if language and language in self.SUPPORTED_LANGUAGES:
+                transcribe_options['language'] = language
+            
+            # Pick the model by speech length and backlog
+            speech_seconds = sum(end - start for start, end in regions) / SAMPLE_RATE
+            model_size = self.model_pool.select_size(speech_seconds, urgent, queue_depth, self.model_size)
+            
+            # A result from the routed model or any larger one is good enough
+            sizes = self.model_pool.MODEL_MEMORY_MB
+            acceptable = sorted((size for size in sizes if sizes[size] >= sizes[model_size]),
+                                key=sizes.get, reverse=True)
+            cached = self.transcription_cache.get(audio_hash, acceptable, transcribe_options.get('language'))
+            if cached is not None:
+                logger.info(f"Transcription cache hit: {audio_hash[:12]} "
+                            f"({cached.get('model_size')} for {model_size})")
+                return dict(cached, cached=True)
+            
+            started = time.monotonic()
+            result = self._transcribe_regions(audio, regions, transcribe_options, model_size)
+            self.model_pool.observe(model_size, time.monotonic() - started, speech_seconds)
+            
+            # Extract transcription results
+            text = result['text'].strip()
+            detected_language = result.get('language', 'unknown')
+            
+            # Detect language if not provided
             try:
-                # Transcribe using Whisper
-                transcribe_options = {
-                    'fp16': False,  # Use FP32 for CPU compatibility
-                    'verbose': False
-                }
-                
-                if language and language in self.SUPPORTED_LANGUAGES:
-                    transcribe_options['language'] = language
-                
-                result = self.whisper_model.transcribe(preprocessed_path, **transcribe_options)
-                
-                # Extract transcription results
-                text = result['text'].strip()
-                detected_language = result.get('language', 'unknown')
-                
-                # Detect language if not provided
-                try:
-                    if not language:
-                        detected_lang_code = detect(text)
-                        detected_language = self.SUPPORTED_LANGUAGES.get(
-                            detected_lang_code, 
-                            detected_language
-                        )
-                except DetectError:
-                    logger.warning("Language detection failed, using Whisper's detection")
-                
-                logger.info(f"Transcription successful: {len(text)} characters, Language: {detected_language}")
-                
-                return {
-                    'success': True,
-                    'text': text,
-                    'language': detected_language,
-                    'language_code': result.get('language', 'unknown'),
-                    'segments': result.get('segments', []),
-                    'duration': sum(seg['end'] - seg['start'] for seg in result.get('segments', []))
-                }
-                
-            finally:
-                # Clean up preprocessed file
-                if os.path.exists(preprocessed_path):
-                    os.remove(preprocessed_path)
+                if not language:
+                    detected_lang_code = detect(text)
+                    detected_language = self.SUPPORTED_LANGUAGES.get(
+                        detected_lang_code, 
+                        detected_language
+                    )
+            except DetectError:
+                logger.warning("Language detection failed, using Whisper's detection")
+            
+            logger.info(f"Transcription successful: {len(text)} characters, Language: {detected_language}")
+            
+            transcription = {
+                'success': True,
+                'text': text,
+                'language': detected_language,
+                'language_code': result.get('language', 'unknown'),
+                'segments': result.get('segments', []),
+                'duration': sum(seg['end'] - seg['start'] for seg in result.get('segments', [])),
+                'model_size': model_size,
+                'audio_hash': audio_hash
+            }
+            self.transcription_cache.set(audio_hash, model_size, transcribe_options.get('language'), transcription)
+            return dict(transcription, cached=False)
             
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
@@ -249,19 +332,156 @@ class VoiceComplaintService:
                 'language': 'unknown'
             }
     
+    def transcribe_window(self, audio: np.ndarray, language: Optional[str] = None) -> Dict:
+        """
+        Run Whisper directly on a decoded window (used for streaming partials)
+        
+        No validation, preprocessing or VAD; the caller owns the buffer.
+        
+        Args:
+            audio: 16 kHz mono float32 samples
+            language: Optional language code
+        
+        Returns:
+            Raw Whisper result (text, segments, language)
+        """
+        options = {
+            'fp16': False,
+            'verbose': False,
+            # Each window is decoded from scratch; earlier text is already committed
+            'condition_on_previous_text': False
+        }
+        if language and language in self.SUPPORTED_LANGUAGES:
+            options['language'] = language
+        
+        # Partials are latency-bound: always the fastest tier
+        with self.model_pool.model(self.tiers[0]) as model:
+            return model.transcribe(audio, **options)
+    
+    def _get_segment_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Lazily start the segment worker pool
+
+        Every worker holds its own copy of the segment model, so the copies
+        are reserved against the model pool's memory budget, leaving room for
+        the largest routed tier in this process. Only as many workers start
+        as fit.
+
+        Returns:
+            The pool, or None when parallelism is disabled or does not fit
+        """
+        if VOICE_SEGMENT_WORKERS <= 1:
+            return None
+
+        with self._segment_pool_lock:
+            if self._segment_pool is None:
+                size = self.segment_model_size
+                workers = self.model_pool.reserve(
+                    size, VOICE_SEGMENT_WORKERS,
+                    keep_free_mb=self.model_pool.MODEL_MEMORY_MB[self.model_size]
+                )
+                if workers <= 1:
+                    self.model_pool.unreserve(size, workers)
+                    logger.warning(f"No memory budget for {VOICE_SEGMENT_WORKERS} segment workers "
+                                   f"({size}); transcribing segments in-process")
+                    return None
+
+                threads = max(1, (os.cpu_count() or 1) // workers)
+                logger.info(f"Starting {workers} segment transcription workers ({size})")
+                self._segment_workers = workers
+                self._segment_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_segment_worker,
+                    initargs=(threads,)
+                )
+            return self._segment_pool
+
+    def _discard_segment_pool(self):
+        """Drop a broken segment pool and return its reservation to the budget"""
+        with self._segment_pool_lock:
+            self._segment_pool = None
+            self.model_pool.unreserve(self.segment_model_size, self._segment_workers)
+            self._segment_workers = 0
+
+    def _transcribe_regions(self, audio: np.ndarray, regions: List[Tuple[int, int]], options: Dict,
+                            model_size: str) -> Dict:
+        """
+        Transcribe speech regions and stitch them into one Whisper-style result
+        
+        Long recordings with several regions are spread over the segment
+        worker pool when they are routed to the segment model; everything
+        else is transcribed in-process through the model pool.
+        
+        Args:
+            audio: Preprocessed samples
+            regions: (start_sample, end_sample) speech regions
+            options: Whisper transcribe options
+            model_size: Whisper model size to use
+        
+        Returns:
+            Dictionary with text, language and segments (timestamps relative to audio)
+        """
+        chunks = [audio[start:end] for start, end in regions]
+        results = None
+        
+        speech_seconds = sum(len(chunk) for chunk in chunks) / SAMPLE_RATE
+        if (len(chunks) > 1 and speech_seconds >= VAD_MIN_PARALLEL_SECONDS
+                and model_size == self.segment_model_size):
+            pool = self._get_segment_pool()
+            if pool is not None:
+                try:
+                    results = list(pool.map(_transcribe_segment, chunks, [options] * len(chunks),
+                                            [model_size] * len(chunks)))
+                except BrokenProcessPool as e:
+                    logger.error(f"Segment worker pool failed, transcribing in-process: {str(e)}")
+                    self._discard_segment_pool()
+        
+        if results is None:
+            with self.model_pool.model(model_size) as model:
+                results = [model.transcribe(chunk, **options) for chunk in chunks]
+        
+        # Shift segment timestamps back onto the original timeline
+        segments = []
+        texts = []
+        language_seconds = defaultdict(float)
+        for (start, end), result in zip(regions, results):
+            offset = start / SAMPLE_RATE
+            texts.append(result['text'].strip())
+            language_seconds[result.get('language', 'unknown')] += (end - start) / SAMPLE_RATE
+            for segment in result.get('segments', []):
+                segment = dict(segment)
+                segment['id'] = len(segments)
+                segment['start'] += offset
+                segment['end'] += offset
+                if 'seek' in segment:
+                    segment['seek'] += int(offset * 100)  # mel frames (10 ms)
+                segments.append(segment)
+        
+        return {
+            'text': ' '.join(text for text in texts if text),
+            # Regions are detected independently; the longest-spoken language wins
+            'language': max(language_seconds, key=language_seconds.get),
+            'segments': segments
+        }
+    
     def process_voice_complaint(
         self, 
-        file_path: str, 
+        audio_source: Union[str, bytes, BinaryIO, np.ndarray], 
         citizen_id: str,
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        urgent: bool = False,
+        queue_depth: int = 0
     ) -> Dict:
         """
         Process complete voice complaint workflow
         
         Args:
-            file_path: Path to the audio file
+            audio_source: Audio file path, bytes, upload stream or decoded samples
             citizen_id: ID of the citizen filing the complaint
             language: Optional language code
+            urgent: Route to the fastest model
+            queue_depth: Jobs waiting behind this one
         
         Returns:
             Complete complaint data with transcription and metadata
@@ -270,7 +490,7 @@ class VoiceComplaintService:
             logger.info(f"Processing voice complaint for citizen: {citizen_id}")
             
             # Transcribe audio
-            transcription_result = self.transcribe_audio(file_path, language)
+            transcription_result = self.transcribe_audio(audio_source, language, urgent, queue_depth)
             
             if not transcription_result['success']:
                 return {
@@ -295,6 +515,9 @@ class VoiceComplaintService:
                 'timestamp': timestamp,
                 'source': 'voice',
                 'audio_duration': transcription_result.get('duration', 0),
+                'model_size': transcription_result.get('model_size'),
+                'audio_hash': transcription_result.get('audio_hash'),
+                'transcription_cached': transcription_result.get('cached', False),
                 'segments': transcription_result.get('segments', [])
             }
             
@@ -332,12 +555,12 @@ class VoiceComplaintService:
 # Singleton instance (optional, for better performance)
 _voice_service_instance = None
 
-def get_voice_service(model_size: str = 'base') -> VoiceComplaintService:
+def get_voice_service(model_size: Optional[str] = None) -> VoiceComplaintService:
     """
     Get singleton instance of VoiceComplaintService
     
     Args:
-        model_size: Whisper model size
+        model_size: Largest Whisper model size (None for all pool tiers)
     
     Returns:
         VoiceComplaintService instance
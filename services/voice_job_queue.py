@@ -0,0 +1,521 @@
+"""
+GramSetu AI - Voice Transcription Job Queue
+Durable SQLite queue that moves Whisper transcription out of the HTTP request
+
+Features:
+- Uploads are enqueued and acknowledged immediately (202 + job id)
+- Pool of worker processes, each loading the voice service once
+- Jobs are claimed under a lease that a heartbeat renews while the handler
+  runs; jobs of a crashed worker are picked up again
+- Completion and failure are recorded only by the worker holding the claim
+- Failed jobs are retried up to MAX_ATTEMPTS times
+- Re-uploads of the same recording (same content hash) join the original job
+- Job status and result are pollable by id
+
+Usage:
+    python -m services.voice_job_queue --workers 2 --handler app:process_voice_job
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Worker settings (overridable through the environment)
+VOICE_WORKERS = int(os.environ.get('VOICE_WORKERS', 2))
+VOICE_MODEL_SIZE = os.environ.get('VOICE_MODEL_SIZE')  # largest Whisper tier; None for all
+VOICE_JOB_HANDLER = os.environ.get('VOICE_JOB_HANDLER', 'app:process_voice_job')
+VOICE_JOB_DEDUPE_HOURS = float(os.environ.get('VOICE_JOB_DEDUPE_HOURS', 24))
+
+# Job handler signature: (job) -> JSON-serializable result; raises on failure
+JobHandler = Callable[[Dict], Dict]
+
+
+class VoiceJobQueue:
+    """
+    Durable queue of voice transcription jobs
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    MAX_ATTEMPTS = 3
+    # A job whose lease is not renewed for this long is assumed lost with its worker
+    LEASE_SECONDS = 120
+    HEARTBEAT_SECONDS = 30
+
+    def __init__(self):
+        """Initialize the queue"""
+        logger.info("Initializing VoiceJobQueue")
+        self.db_pool = get_db_pool(DB_PATH)
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the job table exists"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS voice_jobs (
+                        id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL DEFAULT 'queued',
+                        citizen_id TEXT NOT NULL,
+                        language TEXT,
+                        audio_path TEXT NOT NULL,
+                        audio_hash TEXT,
+                        urgent INTEGER NOT NULL DEFAULT 0,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        worker TEXT,
+                        result TEXT,
+                        error TEXT,
+                        created_at TIMESTAMP NOT NULL,
+                        started_at TIMESTAMP,
+                        finished_at TIMESTAMP,
+                        lease_expires TIMESTAMP
+                    )
+                ''')
+
+                # Tables created before urgent jobs were routed separately
+                cursor.execute('PRAGMA table_info(voice_jobs)')
+                columns = [row[1] for row in cursor.fetchall()]
+                if 'urgent' not in columns:
+                    cursor.execute('ALTER TABLE voice_jobs ADD COLUMN urgent INTEGER NOT NULL DEFAULT 0')
+                # ... and before uploads were deduplicated by content
+                if 'audio_hash' not in columns:
+                    cursor.execute('ALTER TABLE voice_jobs ADD COLUMN audio_hash TEXT')
+
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_voice_jobs_status
+                    ON voice_jobs(status, created_at)
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_voice_jobs_audio_hash
+                    ON voice_jobs(audio_hash, citizen_id)
+                ''')
+            logger.info("Voice job table ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring voice job table: {str(e)}")
+
+    def enqueue(self, audio_path: str, citizen_id: str, language: Optional[str] = None,
+                urgent: bool = False, audio_hash: Optional[str] = None) -> Dict:
+        """
+        Add a transcription job
+
+        A job of the same citizen with the same audio hash and language that
+        has not failed within VOICE_JOB_DEDUPE_HOURS is returned instead of
+        queueing a new one; the caller then still owns audio_path.
+
+        Args:
+            audio_path: Path of the saved upload (owned by the job from now on)
+            citizen_id: Citizen filing the complaint
+            language: Optional language code
+            urgent: Claim before older non-urgent jobs and use the fastest model
+            audio_hash: Content hash of the upload, for deduplicating retries
+
+        Returns:
+            Dictionary with the job id ('duplicate' and 'status' set when an
+            existing job was returned)
+        """
+        try:
+            now = datetime.utcnow()
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                if audio_hash:
+                    cursor.execute('''
+                        SELECT id, status FROM voice_jobs
+                        WHERE audio_hash = ? AND citizen_id = ? AND language IS ?
+                          AND status != ? AND created_at >= ?
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    ''', (audio_hash, citizen_id, language, self.STATUS_FAILED,
+                          (now - timedelta(hours=VOICE_JOB_DEDUPE_HOURS)).isoformat()))
+                    row = cursor.fetchone()
+                    if row is not None:
+                        logger.info(f"Re-upload joined existing voice job: {row[0]}")
+                        return {'success': True, 'job_id': row[0], 'status': row[1], 'duplicate': True}
+
+                job_id = uuid.uuid4().hex
+                cursor.execute('''
+                    INSERT INTO voice_jobs
+                    (id, status, citizen_id, language, audio_path, audio_hash, urgent, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (job_id, self.STATUS_QUEUED, citizen_id, language, audio_path, audio_hash,
+                      int(urgent), now.isoformat()))
+
+            logger.info(f"Voice job queued: {job_id}")
+            return {'success': True, 'job_id': job_id}
+
+        except Exception as e:
+            logger.error(f"Error queueing voice job: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Take the next runnable job (queued, or processing with an expired lease); urgent jobs first
+
+        A job whose lease expired MAX_ATTEMPTS times (it keeps killing its
+        worker) is marked failed instead of being claimed again.
+
+        Args:
+            worker: Identifier of the claiming worker
+
+        Returns:
+            Job dictionary, or None if the queue is empty
+        """
+        now = datetime.utcnow()
+        with self.db_pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, audio_path FROM voice_jobs
+                WHERE status = ? AND lease_expires < ? AND attempts >= ?
+            ''', (self.STATUS_PROCESSING, now.isoformat(), self.MAX_ATTEMPTS))
+            abandoned = cursor.fetchall()
+            if abandoned:
+                cursor.executemany('''
+                    UPDATE voice_jobs SET status = ?, error = ?, finished_at = ?, lease_expires = NULL
+                    WHERE id = ?
+                ''', [(self.STATUS_FAILED, f"Worker lost the job {self.MAX_ATTEMPTS} times (lease expired)",
+                       now.isoformat(), job_id) for job_id, _ in abandoned])
+
+            cursor.execute('''
+                SELECT id, citizen_id, language, audio_path, attempts, urgent FROM voice_jobs
+                WHERE status = ? OR (status = ? AND lease_expires < ? AND attempts < ?)
+                ORDER BY urgent DESC, created_at
+                LIMIT 1
+            ''', (self.STATUS_QUEUED, self.STATUS_PROCESSING, now.isoformat(), self.MAX_ATTEMPTS))
+            row = cursor.fetchone()
+            if row is not None:
+                cursor.execute('''
+                    UPDATE voice_jobs
+                    SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, lease_expires = ?
+                    WHERE id = ?
+                ''', (self.STATUS_PROCESSING, worker, now.isoformat(),
+                      (now + timedelta(seconds=self.LEASE_SECONDS)).isoformat(), row[0]))
+
+        for job_id, audio_path in abandoned:
+            logger.error(f"Voice job {job_id} failed: lease expired after {self.MAX_ATTEMPTS} attempts")
+            if audio_path and os.path.exists(audio_path):
+                try:
+                    os.remove(audio_path)
+                except OSError as e:
+                    logger.warning(f"Failed to remove audio file: {e}")
+
+        if row is None:
+            return None
+
+        return {
+            'id': row[0],
+            'citizen_id': row[1],
+            'language': row[2],
+            'audio_path': row[3],
+            'attempts': row[4] + 1,
+            'urgent': bool(row[5])
+        }
+
+    def renew(self, job_id: str, worker: str, attempts: int) -> bool:
+        """
+        Extend the lease of a claimed job
+
+        Args:
+            job_id: Job id
+            worker: Worker holding the claim
+            attempts: Attempt number of the claim
+
+        Returns:
+            False if the claim was lost (the lease expired and another worker took the job)
+        """
+        with self.db_pool.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE voice_jobs SET lease_expires = ?
+                WHERE id = ? AND worker = ? AND attempts = ? AND status = ?
+            ''', ((datetime.utcnow() + timedelta(seconds=self.LEASE_SECONDS)).isoformat(),
+                  job_id, worker, attempts, self.STATUS_PROCESSING))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, result: Dict, worker: str, attempts: int) -> bool:
+        """
+        Mark a claimed job done and store its result
+
+        Args:
+            job_id: Job id
+            result: Handler result
+            worker: Worker holding the claim
+            attempts: Attempt number of the claim
+
+        Returns:
+            False if the claim was lost; the result is dropped
+        """
+        with self.db_pool.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE voice_jobs SET status = ?, result = ?, error = NULL, finished_at = ?, lease_expires = NULL
+                WHERE id = ? AND worker = ? AND attempts = ? AND status = ?
+            ''', (self.STATUS_DONE, json.dumps(result), datetime.utcnow().isoformat(),
+                  job_id, worker, attempts, self.STATUS_PROCESSING))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, error: str, worker: str, attempts: int) -> Optional[bool]:
+        """
+        Record a failed attempt; the job is re-queued until MAX_ATTEMPTS
+
+        Args:
+            job_id: Job id
+            error: Error message
+            worker: Worker holding the claim
+            attempts: Attempts made so far
+
+        Returns:
+            True if the job failed permanently, False if it was re-queued,
+            None if the claim was lost (nothing is recorded)
+        """
+        final = attempts >= self.MAX_ATTEMPTS
+        with self.db_pool.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE voice_jobs SET status = ?, error = ?, finished_at = ?, lease_expires = NULL
+                WHERE id = ? AND worker = ? AND attempts = ? AND status = ?
+            ''', (self.STATUS_FAILED if final else self.STATUS_QUEUED, error,
+                  datetime.utcnow().isoformat() if final else None,
+                  job_id, worker, attempts, self.STATUS_PROCESSING))
+            if cursor.rowcount != 1:
+                return None
+        return final
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Get the status (and result, once done) of a job
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Job dictionary, or None if unknown
+        """
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('''
+            SELECT id, status, attempts, result, error, created_at, started_at, finished_at
+            FROM voice_jobs WHERE id = ?
+        ''', (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row[0],
+            'status': row[1],
+            'attempts': row[2],
+            'created_at': row[5],
+            'started_at': row[6],
+            'finished_at': row[7]
+        }
+        if row[1] == self.STATUS_DONE:
+            job['result'] = json.loads(row[3])
+        if row[4]:
+            job['error'] = row[4]
+        return job
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting to be claimed"""
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('SELECT COUNT(*) FROM voice_jobs WHERE status = ?', (self.STATUS_QUEUED,))
+        return cursor.fetchone()[0]
+
+    def get_stats(self) -> Dict:
+        """Job counts per status"""
+        cursor = self.db_pool.connection().cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM voice_jobs GROUP BY status')
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def _resolve_handler(spec: str) -> JobHandler:
+    """Import a handler given as 'module:function'"""
+    module_name, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class VoiceJobWorker:
+    """
+    One transcription worker: loads the voice service once, then drains the queue
+    """
+
+    POLL_INTERVAL_SECONDS = 0.5
+
+    def __init__(self, handler: JobHandler, name: Optional[str] = None):
+        """
+        Initialize the worker
+
+        Args:
+            handler: Called with each claimed job, returns its result
+            name: Worker identifier (defaults to host pid)
+        """
+        self.handler = handler
+        self.name = name or f"{os.uname().nodename}:{os.getpid()}"
+        self.queue = get_voice_job_queue()
+        self._stopping = False
+
+    def stop(self, *args):
+        """Finish the current job, then exit"""
+        self._stopping = True
+
+    def run_once(self) -> bool:
+        """
+        Process one job if available
+
+        Returns:
+            True if a job was processed
+        """
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+
+        logger.info(f"Worker {self.name} processing voice job {job['id']} (attempt {job['attempts']})")
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop_heartbeat),
+                                     name='voice-job-heartbeat', daemon=True)
+        heartbeat.start()
+
+        final = True
+        try:
+            result = self.handler(job)
+            stop_heartbeat.set()
+            if self.queue.complete(job['id'], result, self.name, job['attempts']):
+                logger.info(f"Voice job done: {job['id']}")
+            else:
+                logger.warning(f"Voice job {job['id']} was re-claimed by another worker; result dropped")
+                final = False
+        except Exception as e:
+            stop_heartbeat.set()
+            logger.error(f"Voice job {job['id']} failed: {str(e)}")
+            final = self.queue.fail(job['id'], str(e), self.name, job['attempts'])
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+            # Leave no read transaction open between jobs
+            self.queue.db_pool.release()
+
+        # A re-claimed job still needs its audio
+        if final and os.path.exists(job['audio_path']):
+            try:
+                os.remove(job['audio_path'])
+            except OSError as e:
+                logger.warning(f"Failed to remove audio file: {e}")
+        return True
+
+    def _heartbeat(self, job: Dict, stop: threading.Event):
+        """Renew the job's lease until the handler returns"""
+        try:
+            while not stop.wait(self.queue.HEARTBEAT_SECONDS):
+                try:
+                    if not self.queue.renew(job['id'], self.name, job['attempts']):
+                        logger.warning(f"Lost the lease on voice job {job['id']}")
+                        return
+                except Exception as e:
+                    logger.warning(f"Voice job heartbeat error: {str(e)}")
+        finally:
+            # One heartbeat thread per job; do not leave its connection behind
+            self.queue.db_pool.close()
+
+    def run(self):
+        """Poll the queue until stopped"""
+        while not self._stopping:
+            if not self.run_once():
+                time.sleep(self.POLL_INTERVAL_SECONDS)
+
+
+def _worker_main(handler_spec: str, model_size: Optional[str]):
+    """Entry point of one worker process"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Load the voice service (and the fastest Whisper tier) before the first job arrives
+    from services.voice_complaint_service import get_voice_service
+    get_voice_service(model_size=model_size)
+
+    worker = VoiceJobWorker(_resolve_handler(handler_spec))
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+def run_worker_pool(num_workers: int = VOICE_WORKERS, handler_spec: str = VOICE_JOB_HANDLER,
+                    model_size: Optional[str] = VOICE_MODEL_SIZE):
+    """
+    Start worker processes and supervise them, restarting any that die
+
+    Args:
+        num_workers: Number of worker processes
+        handler_spec: Job handler as 'module:function'
+        model_size: Largest Whisper model size to route to (None for all tiers)
+    """
+    # spawn: never inherit model state or SQLite handles from the supervisor
+    context = multiprocessing.get_context('spawn')
+    stopping = False
+
+    def start_worker():
+        process = context.Process(target=_worker_main, args=(handler_spec, model_size), daemon=False)
+        process.start()
+        return process
+
+    def handle_stop(*args):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    workers = [start_worker() for _ in range(num_workers)]
+    logger.info(f"Started {num_workers} voice transcription workers")
+
+    while not stopping:
+        time.sleep(1)
+        for i, process in enumerate(workers):
+            if not process.is_alive():
+                logger.warning(f"Voice worker {process.pid} exited ({process.exitcode}), restarting")
+                workers[i] = start_worker()
+
+    for process in workers:
+        process.terminate()
+    for process in workers:
+        process.join()
+
+# Singleton instance
+_voice_job_queue_instance = None
+
+def get_voice_job_queue() -> VoiceJobQueue:
+    """
+    Get singleton instance of VoiceJobQueue
+
+    Returns:
+        VoiceJobQueue instance
+    """
+    global _voice_job_queue_instance
+
+    if _voice_job_queue_instance is None:
+        _voice_job_queue_instance = VoiceJobQueue()
+
+    return _voice_job_queue_instance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='GramSetu voice transcription workers')
+    parser.add_argument('--workers', type=int, default=VOICE_WORKERS)
+    parser.add_argument('--handler', default=VOICE_JOB_HANDLER, help="Job handler as 'module:function'")
+    parser.add_argument('--model-size', default=VOICE_MODEL_SIZE, help='Largest Whisper tier (default: all)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_worker_pool(args.workers, args.handler, args.model_size)
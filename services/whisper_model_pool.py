@@ -0,0 +1,350 @@
+"""
+GramSetu AI - Whisper Model Pool
+Size-tiered Whisper models with routing by clip length and backlog
+
+Features:
+- 'tiny', 'base' and 'medium' (configurable) loaded lazily, on first use
+- Memory budget: least recently used idle models are unloaded to make room;
+  copies held by other processes (segment workers) are reserved against it
+- Routing: short or urgent clips go to the fastest tier; long clips go to
+  the most accurate tier, stepping down as the job backlog grows
+- Per-model latency histograms, shared by all processes through SQLite
+"""
+
+import gc
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from utils.db_pool import get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Pool settings (overridable through the environment)
+WHISPER_MODEL_TIERS = os.environ.get('WHISPER_MODEL_TIERS', 'tiny,base,medium').split(',')
+WHISPER_MEMORY_BUDGET_MB = int(os.environ.get('WHISPER_MEMORY_BUDGET_MB', 4096))
+WHISPER_SHORT_CLIP_SECONDS = float(os.environ.get('WHISPER_SHORT_CLIP_SECONDS', 10))
+WHISPER_QUEUE_DEPTH_STEP = int(os.environ.get('WHISPER_QUEUE_DEPTH_STEP', 10))  # queued jobs per tier step-down
+
+
+class WhisperModelPool:
+    """
+    Lazily loaded Whisper models under a memory budget
+    """
+
+    # Approximate resident memory of a loaded fp32 model on CPU
+    MODEL_MEMORY_MB = {
+        'tiny': 200,
+        'base': 400,
+        'small': 1200,
+        'medium': 3500,
+        'large': 7000
+    }
+
+    # Upper bounds (seconds) of the latency histogram buckets
+    LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+    def __init__(self, tiers: Optional[List[str]] = None, memory_budget_mb: int = WHISPER_MEMORY_BUDGET_MB):
+        """
+        Initialize the pool
+
+        Args:
+            tiers: Model sizes to route between (fastest to most accurate)
+            memory_budget_mb: Memory the loaded models may use together
+        """
+        tiers = [size.strip() for size in (tiers or WHISPER_MODEL_TIERS) if size.strip() in self.MODEL_MEMORY_MB]
+        if not tiers:
+            raise ValueError(f"No valid Whisper model tiers; choose from {list(self.MODEL_MEMORY_MB)}")
+
+        logger.info(f"Initializing WhisperModelPool (tiers: {tiers}, budget: {memory_budget_mb} MB)")
+        self.tiers = sorted(set(tiers), key=self.MODEL_MEMORY_MB.get)
+        self.memory_budget_mb = memory_budget_mb
+        self.db_pool = get_db_pool(DB_PATH)
+
+        self._models: 'OrderedDict[str, object]' = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        self._loading = set()
+        self._reserved_mb = 0
+        self._cond = threading.Condition()
+        # One forward pass per model at a time within a process
+        self._model_locks = {size: threading.Lock() for size in self.MODEL_MEMORY_MB}
+
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Ensure the latency histogram table exists"""
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS whisper_latency (
+                        model_size TEXT PRIMARY KEY,
+                        count INTEGER NOT NULL DEFAULT 0,
+                        sum_seconds REAL NOT NULL DEFAULT 0,
+                        audio_seconds REAL NOT NULL DEFAULT 0,
+                        buckets TEXT NOT NULL
+                    )
+                ''')
+            logger.info("Whisper latency table ensured")
+
+        except Exception as e:
+            logger.error(f"Error ensuring whisper latency table: {str(e)}")
+
+    def tiers_up_to(self, max_size: Optional[str] = None) -> List[str]:
+        """
+        Tiers no larger than max_size (all tiers if None)
+
+        Args:
+            max_size: Largest model size allowed
+
+        Returns:
+            Model sizes, fastest first
+        """
+        if max_size is None:
+            return list(self.tiers)
+        limit = self.MODEL_MEMORY_MB.get(max_size, self.MODEL_MEMORY_MB[self.tiers[-1]])
+        return [size for size in self.tiers if self.MODEL_MEMORY_MB[size] <= limit] or [self.tiers[0]]
+
+    def select_size(self, duration: float, urgent: bool = False, queue_depth: int = 0,
+                    max_size: Optional[str] = None) -> str:
+        """
+        Route a clip to a model size
+
+        Args:
+            duration: Seconds of speech to transcribe
+            urgent: Whether the caller needs the result as fast as possible
+            queue_depth: Jobs waiting behind this one
+            max_size: Largest model size allowed
+
+        Returns:
+            Model size
+        """
+        tiers = self.tiers_up_to(max_size)
+        if urgent or duration <= WHISPER_SHORT_CLIP_SECONDS:
+            return tiers[0]
+
+        # Each QUEUE_DEPTH_STEP waiting jobs moves long clips one tier faster
+        steps = queue_depth // max(1, WHISPER_QUEUE_DEPTH_STEP)
+        return tiers[max(0, len(tiers) - 1 - steps)]
+
+    @contextmanager
+    def model(self, size: str) -> Iterator[object]:
+        """
+        Use a model, loading it first if needed
+
+        The model cannot be evicted while the block runs, and other threads
+        of this process wait for their turn on the same model.
+
+        Args:
+            size: Model size
+
+        Yields:
+            Loaded Whisper model
+        """
+        model = self._acquire(size)
+        try:
+            with self._model_locks[size]:
+                yield model
+        finally:
+            with self._cond:
+                self._in_use[size] -= 1
+                self._cond.notify_all()
+
+    def _acquire(self, size: str):
+        """Get a loaded model and mark it in use"""
+        if size not in self.MODEL_MEMORY_MB:
+            raise ValueError(f"Unknown Whisper model size: {size}")
+
+        with self._cond:
+            while size in self._loading:
+                self._cond.wait()
+            if size in self._models:
+                self._models.move_to_end(size)
+                self._in_use[size] = self._in_use.get(size, 0) + 1
+                return self._models[size]
+
+            self._loading.add(size)
+            evicted = self._evict_for(size)
+
+        if evicted:
+            gc.collect()
+
+        try:
+            import whisper
+
+            logger.info(f"Loading Whisper model: {size}")
+            started = time.monotonic()
+            model = whisper.load_model(size)
+            logger.info(f"Whisper model {size} loaded in {time.monotonic() - started:.1f}s")
+        except Exception:
+            with self._cond:
+                self._loading.discard(size)
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._models[size] = model
+            self._loading.discard(size)
+            self._in_use[size] = self._in_use.get(size, 0) + 1
+            self._cond.notify_all()
+        return model
+
+    def _evict_for(self, size: str) -> List[str]:
+        """Unload idle models, least recently used first, until size fits (lock held)"""
+        needed = self.MODEL_MEMORY_MB[size]
+        used = sum(self.MODEL_MEMORY_MB[loaded] for loaded in self._models)
+        used += sum(self.MODEL_MEMORY_MB[loading] for loading in self._loading if loading != size)
+        used += self._reserved_mb
+
+        evicted = []
+        for loaded in list(self._models):
+            if used + needed <= self.memory_budget_mb:
+                break
+            if self._in_use.get(loaded):
+                continue
+            del self._models[loaded]
+            used -= self.MODEL_MEMORY_MB[loaded]
+            evicted.append(loaded)
+            logger.info(f"Unloaded Whisper model {loaded} to stay within the memory budget")
+
+        if used + needed > self.memory_budget_mb:
+            logger.warning(f"Loading Whisper model {size} exceeds the memory budget "
+                           f"({used + needed} MB > {self.memory_budget_mb} MB)")
+        return evicted
+
+    def reserve(self, size: str, count: int, keep_free_mb: int = 0) -> int:
+        """
+        Count copies of a model loaded by other processes against the budget
+
+        Only as many copies are reserved as fit while keep_free_mb stays
+        available to this process.
+
+        Args:
+            size: Model size the other processes load
+            count: Copies wanted
+            keep_free_mb: Budget that must remain for this process's models
+
+        Returns:
+            Number of copies reserved
+        """
+        per_model = self.MODEL_MEMORY_MB[size]
+        with self._cond:
+            available = self.memory_budget_mb - self._reserved_mb - keep_free_mb
+            count = max(0, min(count, available // per_model))
+            self._reserved_mb += count * per_model
+        return count
+
+    def unreserve(self, size: str, count: int):
+        """
+        Return copies reserved with reserve() to the budget
+
+        Args:
+            size: Model size
+            count: Copies to release
+        """
+        with self._cond:
+            self._reserved_mb = max(0, self._reserved_mb - count * self.MODEL_MEMORY_MB[size])
+            self._cond.notify_all()
+
+    def observe(self, size: str, seconds: float, audio_seconds: float = 0.0):
+        """
+        Record one transcription latency
+
+        Args:
+            size: Model size used
+            seconds: Wall-clock transcription time
+            audio_seconds: Seconds of audio transcribed
+        """
+        try:
+            with self.db_pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT buckets FROM whisper_latency WHERE model_size = ?', (size,))
+                row = cursor.fetchone()
+                buckets = json.loads(row[0]) if row else [0] * (len(self.LATENCY_BUCKETS) + 1)
+
+                index = next((i for i, bound in enumerate(self.LATENCY_BUCKETS) if seconds <= bound),
+                             len(self.LATENCY_BUCKETS))
+                buckets[index] += 1
+
+                cursor.execute('''
+                    INSERT INTO whisper_latency (model_size, count, sum_seconds, audio_seconds, buckets)
+                    VALUES (?, 1, ?, ?, ?)
+                    ON CONFLICT(model_size) DO UPDATE SET
+                        count = count + 1,
+                        sum_seconds = sum_seconds + excluded.sum_seconds,
+                        audio_seconds = audio_seconds + excluded.audio_seconds,
+                        buckets = excluded.buckets
+                ''', (size, seconds, audio_seconds, json.dumps(buckets)))
+
+        except Exception as e:
+            logger.warning(f"Error recording whisper latency: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """
+        Routing configuration, models loaded in this process and latency histograms
+
+        Returns:
+            Dictionary with pool statistics; histogram buckets are cumulative
+            ('le' upper bounds, Prometheus style)
+        """
+        with self._cond:
+            loaded = list(self._models)
+            in_use = {size: count for size, count in self._in_use.items() if count}
+            reserved_mb = self._reserved_mb
+
+        latency = {}
+        try:
+            cursor = self.db_pool.connection().cursor()
+            cursor.execute('SELECT model_size, count, sum_seconds, audio_seconds, buckets FROM whisper_latency')
+            for size, count, sum_seconds, audio_seconds, buckets in cursor.fetchall():
+                cumulative = 0
+                histogram = {}
+                for bound, bucket_count in zip(list(self.LATENCY_BUCKETS) + ['+Inf'], json.loads(buckets)):
+                    cumulative += bucket_count
+                    histogram[str(bound)] = cumulative
+                latency[size] = {
+                    'count': count,
+                    'sum_seconds': round(sum_seconds, 3),
+                    'mean_seconds': round(sum_seconds / count, 3) if count else 0.0,
+                    # Processing time per second of audio (below 1 is faster than real time)
+                    'real_time_factor': round(sum_seconds / audio_seconds, 3) if audio_seconds else None,
+                    'buckets': histogram
+                }
+        except Exception as e:
+            logger.warning(f"Error reading whisper latency: {str(e)}")
+
+        return {
+            'tiers': self.tiers,
+            'loaded': loaded,
+            'in_use': in_use,
+            'memory_budget_mb': self.memory_budget_mb,
+            'memory_used_mb': sum(self.MODEL_MEMORY_MB[size] for size in loaded),
+            'memory_reserved_mb': reserved_mb,
+            'short_clip_seconds': WHISPER_SHORT_CLIP_SECONDS,
+            'queue_depth_step': WHISPER_QUEUE_DEPTH_STEP,
+            'latency': latency
+        }
+
+# Singleton instance
+_whisper_model_pool_instance = None
+
+def get_whisper_model_pool() -> WhisperModelPool:
+    """
+    Get singleton instance of WhisperModelPool
+
+    Returns:
+        WhisperModelPool instance
+    """
+    global _whisper_model_pool_instance
+
+    if _whisper_model_pool_instance is None:
+        _whisper_model_pool_instance = WhisperModelPool()
+
+    return _whisper_model_pool_instance
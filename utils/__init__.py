@@ -7,13 +7,30 @@ from .audio_utils import (
     get_audio_info,
     convert_to_wav,
     estimate_transcription_time,
-    cleanup_temp_files
+    cleanup_temp_files,
+    decode_audio,
+    audio_duration,
+    normalize_peak,
+    trim_silence,
+    detect_speech_regions,
+    decode_pcm_chunk,
+    pcm_sample_width
 )
+from .db_pool import SQLiteConnectionPool, get_db_pool
 
 __all__ = [
     'validate_audio_format',
     'get_audio_info',
     'convert_to_wav',
     'estimate_transcription_time',
-    'cleanup_temp_files'
+    'cleanup_temp_files',
+    'decode_audio',
+    'audio_duration',
+    'normalize_peak',
+    'trim_silence',
+    'detect_speech_regions',
+    'decode_pcm_chunk',
+    'pcm_sample_width',
+    'SQLiteConnectionPool',
+    'get_db_pool'
 ]
@@ -5,12 +5,24 @@ Helper functions for audio file handling and validation
 
 import os
 import mimetypes
+import shutil
+import subprocess
+import tempfile
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import BinaryIO, Tuple, Optional, Union
 import logging
 
+# NumPy is optional - only the in-memory decode helpers need it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 logger = logging.getLogger(__name__)
 
+# Whisper's native input format: 16 kHz mono float32 in [-1, 1]
+SAMPLE_RATE = 16000
+
 
 def validate_audio_format(file_path: str) -> Tuple[bool, str]:
     """
@@ -165,3 +177,344 @@ def cleanup_temp_files(directory: str, max_age_hours: int = 24):
         
     except Exception as e:
         logger.error(f"Cleanup error: {str(e)}")
+
+
+# Containers whose index (e.g. the MP4 moov atom) may sit at the end of the
+# file; ffmpeg has to seek to demux them, which a pipe cannot do
+SEEKABLE_CONTAINER_BRANDS = (b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip')
+
+# Stream copy chunk size
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _needs_seekable_input(head: bytes) -> bool:
+    """Whether the first bytes of an upload look like an MP4/M4A/MOV container"""
+    return len(head) >= 8 and head[4:8] in SEEKABLE_CONTAINER_BRANDS
+
+
+def _size_error(max_bytes: int) -> ValueError:
+    """Error raised for uploads over the size limit"""
+    return ValueError(f"File size exceeds maximum limit of {max_bytes / (1024 * 1024):.1f} MB")
+
+
+def _read_bounded(stream: BinaryIO, max_bytes: Optional[int], head: bytes = b'') -> bytes:
+    """
+    Read a stream to the end without ever holding more than max_bytes + 1
+    
+    Args:
+        stream: Readable binary stream
+        max_bytes: Size limit (None for unbounded)
+        head: Bytes already read from the stream
+    
+    Returns:
+        The full contents
+    """
+    chunks = [head]
+    size = len(head)
+    while max_bytes is None or size <= max_bytes:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    if max_bytes is not None and size > max_bytes:
+        raise _size_error(max_bytes)
+    return b''.join(chunks)
+
+
+def _spool_bounded(stream: BinaryIO, target: BinaryIO, max_bytes: Optional[int],
+                   head: bytes = b'') -> int:
+    """
+    Copy a stream into a file, stopping as soon as it exceeds max_bytes
+    
+    Args:
+        stream: Readable binary stream
+        target: Writable binary file
+        max_bytes: Size limit (None for unbounded)
+        head: Bytes already read from the stream
+    
+    Returns:
+        Number of bytes written
+    """
+    target.write(head)
+    size = len(head)
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise _size_error(max_bytes)
+        target.write(chunk)
+    target.flush()
+    return size
+
+
+def decode_audio(source: Union[str, bytes, BinaryIO], sample_rate: int = SAMPLE_RATE,
+                 max_bytes: Optional[int] = None):
+    """
+    Decode audio once to a mono float32 array
+    
+    ffmpeg reads a path directly, or bytes / a file-like object (e.g. the
+    request stream) through stdin, and writes raw PCM to stdout. Streams are
+    read in chunks and rejected as soon as they pass max_bytes. MP4/M4A
+    containers can keep their index at the end of the file and cannot be
+    demuxed from a pipe, so they are spooled to a temporary file first.
+    
+    Args:
+        source: File path, raw bytes or readable binary stream
+        sample_rate: Output sample rate
+        max_bytes: Reject input larger than this
+    
+    Returns:
+        1-D float32 NumPy array
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for in-memory audio decoding")
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg is not installed")
+    
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        if max_bytes is not None and size > max_bytes:
+            raise _size_error(max_bytes)
+        if size == 0:
+            raise ValueError("File is empty")
+        return _run_ffmpeg(os.fspath(source), None, sample_rate)
+    
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+        if max_bytes is not None and len(data) > max_bytes:
+            raise _size_error(max_bytes)
+        stream, head = None, data[:8]
+    else:
+        data = None
+        stream, head = source, source.read(8)
+    
+    if not head:
+        raise ValueError("File is empty")
+    
+    if _needs_seekable_input(head):
+        with tempfile.NamedTemporaryFile(suffix='.m4a') as spooled:
+            if stream is None:
+                spooled.write(data)
+                spooled.flush()
+            else:
+                _spool_bounded(stream, spooled, max_bytes, head)
+            return _run_ffmpeg(spooled.name, None, sample_rate)
+    
+    if data is None:
+        data = _read_bounded(stream, max_bytes, head)
+    return _run_ffmpeg('pipe:0', data, sample_rate)
+
+
+def _run_ffmpeg(path: str, data: Optional[bytes], sample_rate: int):
+    """Decode a path (or stdin when data is given) to float32 PCM"""
+    cmd = [
+        'ffmpeg', '-nostdin' if data is None else '-hide_banner', '-threads', '0',
+        '-i', path,
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+        '-loglevel', 'error', '-'
+    ]
+    process = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        raise ValueError(f"Invalid audio file: {process.stderr.decode(errors='ignore').strip()}")
+    
+    return np.frombuffer(process.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def audio_duration(audio, sample_rate: int = SAMPLE_RATE) -> float:
+    """
+    Duration of a decoded array in seconds
+    
+    Args:
+        audio: 1-D sample array
+        sample_rate: Sample rate of the array
+    
+    Returns:
+        Duration in seconds
+    """
+    return len(audio) / sample_rate
+
+
+def normalize_peak(audio, headroom_db: float = 0.1):
+    """
+    Scale audio so its peak sits headroom_db below full scale
+    
+    Args:
+        audio: 1-D float32 array
+        headroom_db: Headroom below 0 dBFS
+    
+    Returns:
+        Normalized array (the input if it is silent)
+    """
+    peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+    if peak == 0.0:
+        return audio
+    target = 10 ** (-headroom_db / 20)
+    return (audio * (target / peak)).astype(np.float32)
+
+
+def frame_energy_db(audio, sample_rate: int = SAMPLE_RATE, frame_ms: int = 10):
+    """
+    RMS level of consecutive frames in dBFS
+    
+    Args:
+        audio: 1-D float32 array
+        sample_rate: Sample rate of the array
+        frame_ms: Frame length in milliseconds
+    
+    Returns:
+        Array with one dBFS value per (complete or trailing) frame
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    count = -(-len(audio) // frame)
+    padded = np.zeros(count * frame, dtype=np.float32)
+    padded[:len(audio)] = audio
+    rms = np.sqrt(np.mean(padded.reshape(count, frame) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def trim_silence(audio, sample_rate: int = SAMPLE_RATE, silence_thresh_db: float = -40.0,
+                 padding_ms: int = 100, frame_ms: int = 10):
+    """
+    Remove leading and trailing silence
+    
+    Args:
+        audio: 1-D float32 array
+        sample_rate: Sample rate of the array
+        silence_thresh_db: Frames quieter than this (dBFS) are silence
+        padding_ms: Audio kept around the voiced part
+        frame_ms: Analysis frame length
+    
+    Returns:
+        Trimmed array (the input if it is all silence)
+    """
+    if not len(audio):
+        return audio
+    
+    voiced = np.flatnonzero(frame_energy_db(audio, sample_rate, frame_ms) > silence_thresh_db)
+    if not len(voiced):
+        return audio
+    
+    frame = max(1, sample_rate * frame_ms // 1000)
+    padding = sample_rate * padding_ms // 1000
+    start = max(0, voiced[0] * frame - padding)
+    end = min(len(audio), (voiced[-1] + 1) * frame + padding)
+    return audio[start:end]
+
+
+def detect_speech_regions(audio, sample_rate: int = SAMPLE_RATE, threshold_db: float = -40.0,
+                          floor_margin_db: float = 10.0, frame_ms: int = 30, min_speech_ms: int = 250,
+                          min_silence_ms: int = 600, padding_ms: int = 200, max_region_s: float = 30.0):
+    """
+    Energy-based voice activity detection
+    
+    A frame is voiced when it is louder than both threshold_db and the
+    estimated noise floor plus floor_margin_db. Voiced runs separated by
+    less than min_silence_ms are merged, runs shorter than min_speech_ms
+    are dropped, and regions longer than max_region_s are split at their
+    quietest frame so each fits one Whisper window.
+    
+    Args:
+        audio: 1-D float32 array
+        sample_rate: Sample rate of the array
+        threshold_db: Absolute level (dBFS) below which a frame is silence
+        floor_margin_db: Required level above the noise floor
+        frame_ms: Analysis frame length
+        min_speech_ms: Shortest region kept
+        min_silence_ms: Shortest pause that separates two regions
+        padding_ms: Audio kept on both sides of a region
+        max_region_s: Longest region returned
+    
+    Returns:
+        List of (start_sample, end_sample) tuples in order
+    """
+    if not len(audio):
+        return []
+    
+    frame = max(1, sample_rate * frame_ms // 1000)
+    energy = frame_energy_db(audio, sample_rate, frame_ms)
+    noise_floor = float(np.percentile(energy, 10))
+    voiced = energy > max(threshold_db, noise_floor + floor_margin_db)
+    
+    # Voiced runs as [start_frame, end_frame)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    runs = [[int(start), int(end)] for start, end in zip(edges[::2], edges[1::2])]
+    
+    merged = []
+    min_gap = max(1, min_silence_ms // frame_ms)
+    for run in runs:
+        if merged and run[0] - merged[-1][1] < min_gap:
+            merged[-1][1] = run[1]
+        else:
+            merged.append(run)
+    
+    min_frames = max(1, min_speech_ms // frame_ms)
+    max_frames = max(1, int(max_region_s * 1000) // frame_ms)
+    pad_frames = padding_ms // frame_ms
+    
+    regions = []
+    for start, end in merged:
+        if end - start < min_frames:
+            continue
+        start = max(0, start - pad_frames)
+        end = min(len(energy), end + pad_frames)
+        
+        # Split over-long regions at the quietest frame of the last third of each window
+        while end - start > max_frames:
+            window_start = start + (2 * max_frames) // 3
+            cut = window_start + int(np.argmin(energy[window_start:start + max_frames]))
+            regions.append((start, cut))
+            start = cut
+        regions.append((start, end))
+    
+    # Padding can make neighbours overlap; keep regions disjoint
+    result = []
+    for start, end in regions:
+        if result and start < result[-1][1]:
+            start = result[-1][1]
+        if end > start:
+            result.append((start, end))
+    
+    return [(start * frame, min(len(audio), end * frame)) for start, end in result]
+
+
+def decode_pcm_chunk(data: bytes, encoding: str = 'pcm_s16le', sample_rate: int = 8000,
+                     target_rate: int = SAMPLE_RATE):
+    """
+    Convert a raw telephony audio chunk to float32 at the target rate
+    
+    Args:
+        data: Raw bytes (complete samples only)
+        encoding: 'pcm_s16le' (linear 16-bit) or 'mulaw' (G.711 u-law, 8-bit)
+        sample_rate: Sample rate of the chunk
+        target_rate: Output sample rate
+    
+    Returns:
+        1-D float32 NumPy array
+    """
+    if encoding == 'pcm_s16le':
+        audio = np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+    elif encoding == 'mulaw':
+        codes = ~np.frombuffer(data, np.uint8).astype(np.int16) & 0xFF
+        sign = codes & 0x80
+        exponent = (codes >> 4) & 0x07
+        mantissa = codes & 0x0F
+        magnitude = ((mantissa << 3) + 0x84) << exponent
+        audio = np.where(sign, 0x84 - magnitude, magnitude - 0x84).astype(np.float32) / 32768.0
+    else:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    
+    if sample_rate == target_rate or not len(audio):
+        return audio
+    
+    # Linear interpolation is enough for narrow-band telephone audio
+    count = int(round(len(audio) * target_rate / sample_rate))
+    positions = np.arange(count, dtype=np.float64) * (sample_rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def pcm_sample_width(encoding: str) -> int:
+    """Bytes per sample of a raw encoding accepted by decode_pcm_chunk"""
+    return 2 if encoding == 'pcm_s16le' else 1
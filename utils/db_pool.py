@@ -0,0 +1,220 @@
+"""
+GramSetu AI - SQLite Connection Pool
+Shared, thread-safe connection management for app.py and all services
+
+Features:
+- One long-lived connection per thread (no connect/close per query)
+- WAL journal mode so readers never block the single writer
+- synchronous=NORMAL, busy_timeout, mmap_size and cache_size tuning
+- Nestable transactions: inner blocks run in a SAVEPOINT of the outer one,
+  one commit per request
+- Fork-safe: connections inherited from a gunicorn master are discarded
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Database path (should match app.py)
+DB_PATH = 'gramsetu_ai.db'
+
+# Connection tuning (overridable through the environment)
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # 256 MB
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))  # 64 MB
+
+
+class SQLiteConnectionPool:
+    """
+    Per-thread SQLite connection pool
+
+    Every thread gets exactly one connection, created lazily on first use and
+    kept open for the life of the thread. Rows are returned as sqlite3.Row so
+    callers can use either index or column-name access.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        """
+        Initialize the pool
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self._generation = 0
+        self._pid = os.getpid()
+
+    def _configure(self, conn: sqlite3.Connection):
+        """Apply WAL mode and performance pragmas to a new connection"""
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {SQLITE_MMAP_SIZE}')
+        # Negative cache_size is expressed in KiB rather than pages
+        conn.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+
+    def _reset_after_fork(self):
+        """Drop connections inherited from a parent process"""
+        with self._lock:
+            self._connections = {}
+            self._local = threading.local()
+            self._generation += 1
+            self._pid = os.getpid()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's connection, opening it if needed
+
+        Returns:
+            sqlite3.Connection bound to the current thread
+        """
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.generation != self._generation:
+            # Closed by close_all() from another thread
+            conn = None
+        if conn is None:
+            # close_all() may close this connection from another thread
+            conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                                   check_same_thread=False)
+            self._configure(conn)
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.generation = self._generation
+            with self._lock:
+                self._connections[threading.get_ident()] = conn
+            logger.debug(f"Opened SQLite connection for thread {threading.get_ident()}")
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        Run a block inside a single transaction
+
+        Nested calls on the same thread run inside a SAVEPOINT of the
+        outermost transaction, so helpers can open their own block without
+        adding extra commits. A failing inner block is rolled back to its
+        savepoint even when the caller catches the exception.
+
+        Args:
+            immediate: Take the write lock up front (BEGIN IMMEDIATE)
+
+        Yields:
+            The thread's connection
+        """
+        conn = self.connection()
+        outermost = self._local.depth == 0
+        savepoint = None
+
+        if outermost and not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        elif not outermost:
+            savepoint = f'sp_{self._local.depth}'
+            conn.execute(f'SAVEPOINT {savepoint}')
+
+        self._local.depth += 1
+        try:
+            yield conn
+        except Exception:
+            self._local.depth -= 1
+            if savepoint is not None:
+                conn.execute(f'ROLLBACK TO {savepoint}')
+                conn.execute(f'RELEASE {savepoint}')
+            elif outermost and conn.in_transaction:
+                conn.rollback()
+            raise
+        else:
+            self._local.depth -= 1
+            if savepoint is not None:
+                conn.execute(f'RELEASE {savepoint}')
+            elif outermost and conn.in_transaction:
+                conn.commit()
+
+    def release(self, exception: Optional[BaseException] = None):
+        """
+        End-of-request hook: roll back anything left uncommitted
+
+        Work done through transaction() is already committed; an implicit
+        transaction still open here belongs to a handler that failed or never
+        committed, so it is discarded even when the request itself returned
+        normally (e.g. a handler that caught its own error and sent a 500).
+        The connection itself stays open for the next request on this thread.
+
+        Args:
+            exception: Exception raised by the request, if any
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or os.getpid() != self._pid or self._local.generation != self._generation:
+            return
+
+        self._local.depth = 0
+        if conn.in_transaction:
+            logger.warning("Rolling back a transaction left open at end of request"
+                           + (f" ({str(exception)})" if exception is not None else ''))
+            conn.rollback()
+
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        self._local.conn = None
+        self._local.depth = 0
+        conn.close()
+
+    def close_all(self):
+        """
+        Close every connection opened by this pool, on any thread
+
+        Threads that still hold a closed connection open a new one on their
+        next connection() call.
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections = {}
+            self._generation += 1
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing SQLite connection: {str(e)}")
+
+
+# Pools are shared per database file
+_pool_instances: Dict[str, SQLiteConnectionPool] = {}
+_pool_instances_lock = threading.Lock()
+
+def get_db_pool(db_path: str = DB_PATH) -> SQLiteConnectionPool:
+    """
+    Get the shared SQLiteConnectionPool for a database file
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        SQLiteConnectionPool instance
+    """
+    pool = _pool_instances.get(db_path)
+    if pool is None:
+        with _pool_instances_lock:
+            pool = _pool_instances.get(db_path)
+            if pool is None:
+                pool = SQLiteConnectionPool(db_path)
+                _pool_instances[db_path] = pool
+    return pool